@@ -27,7 +27,7 @@ class reader:
     def open(self, filename, chunk):
         self._data = open(filename, 'rb')        
         self.mode = struct.unpack('<B', self._data.read(hl2ss._SIZEOF.BYTE))[0]
-        self._unpacker = hl2ss._unpacker()
+        self._unpacker = hl2ss._unpacker_arena()
         self._eof = False
         self._unpacker.reset(self.mode)
         self.chunk = chunk
@@ -38,9 +38,10 @@ class reader:
                 return self._unpacker.get()
             if (self._eof):
                 return None
-            chunk = self._data.read(self.chunk)
-            self._eof = len(chunk) < self.chunk
-            self._unpacker.extend(chunk)
+            buffer = self._unpacker.reserve(self.chunk)
+            count = self._data.readinto(buffer)
+            self._eof = count < len(buffer)
+            self._unpacker.commit(count)
 
     def close(self):
         self._data.close()
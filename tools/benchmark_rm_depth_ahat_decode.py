@@ -0,0 +1,66 @@
+
+import argparse
+
+parser = argparse.ArgumentParser(description='HL2SS RM Depth AHAT decode benchmark. Compares the per-frame cost of the h26x Z/AB unpacking kernel against the previous implementation at the AHAT frame rate.')
+parser.add_argument('--frames', type=int, default=2000, help='Number of frames to unpack')
+args = parser.parse_args()
+
+import sys
+
+sys.path.append('../viewer')
+
+import time
+import numpy as np
+import hl2ss
+
+H = hl2ss.Parameters_RM_DEPTH_AHAT.HEIGHT
+W = hl2ss.Parameters_RM_DEPTH_AHAT.WIDTH
+
+# Decoded yuv420p frame as returned by to_ndarray
+rng = np.random.default_rng(0)
+yuv = rng.integers(0, 256, ((H * 3) // 2, W), dtype=np.uint8)
+y = yuv[:H, :]
+u = yuv[H:(H + H // 4), :].reshape((H // 2, -1))
+v = yuv[(H + H // 4):, :].reshape((H // 2, -1))
+
+
+def unpack_reference(y, u, v):
+    u = u.reshape((H, -1))
+    v = v.reshape((H, -1))
+    depth = np.multiply(y, 4, dtype=np.uint16)
+    ab    = np.empty((H, W), dtype=np.uint16)
+    u = np.square(u, dtype=np.uint16)
+    v = np.square(v, dtype=np.uint16)
+    ab[:, 0::4] = u
+    ab[:, 1::4] = u
+    ab[:, 2::4] = v
+    ab[:, 3::4] = v
+    return depth, ab
+
+
+codec = hl2ss._decode_rm_depth_ahat_z_ab_h26x(hl2ss.VideoProfile.H265_MAIN)
+depth = np.empty((H, W), dtype=np.uint16)
+ab    = np.empty((H, W), dtype=np.uint16)
+
+depth_reference, ab_reference = unpack_reference(y, u, v)
+codec.unpack(y, u, v, depth, ab)
+
+if ((not np.array_equal(depth, depth_reference)) or (not np.array_equal(ab, ab_reference))):
+    print('Mismatch between reference and unpacking kernel')
+    quit()
+
+frame_time = 1 / hl2ss.Parameters_RM_DEPTH_AHAT.FPS
+
+start = time.perf_counter()
+for _ in range(args.frames):
+    unpack_reference(y, u, v)
+reference = (time.perf_counter() - start) / args.frames
+
+start = time.perf_counter()
+for _ in range(args.frames):
+    codec.unpack(y, u, v, depth, ab)
+kernel = (time.perf_counter() - start) / args.frames
+
+print(f'reference: {reference * 1e6:.1f} us/frame ({100 * reference / frame_time:.2f}% of frame time at {hl2ss.Parameters_RM_DEPTH_AHAT.FPS} FPS)')
+print(f'kernel:    {kernel * 1e6:.1f} us/frame ({100 * kernel / frame_time:.2f}% of frame time at {hl2ss.Parameters_RM_DEPTH_AHAT.FPS} FPS)')
+print(f'speedup:   {reference / kernel:.2f}x')
@@ -0,0 +1,141 @@
+import argparse
+
+parser = argparse.ArgumentParser(description='HL2SS RM Depth Long Throw to PV reprojection benchmark. Compares the per-frame cost of the vectorised z-buffer splatting in hl2ss_3dcv against the per-point Python loop it replaced at the Long Throw frame rate.')
+parser.add_argument('--frames', type=int, default=20, help='Number of frames to reproject')
+parser.add_argument('--pv_width', type=int, default=640, help='PV image width')
+parser.add_argument('--pv_height', type=int, default=360, help='PV image height')
+args = parser.parse_args()
+
+import sys
+
+sys.path.append('../viewer')
+
+import time
+import numpy as np
+import hl2ss
+import hl2ss_3dcv
+
+H = hl2ss.Parameters_RM_DEPTH_LONGTHROW.HEIGHT
+W = hl2ss.Parameters_RM_DEPTH_LONGTHROW.WIDTH
+
+# Synthetic scene: wall at 2.5 m with a box at 1 m, seen by a pinhole Long
+# Throw camera and a PV camera 5 cm to the side
+lt_intrinsics = np.array([[180, 0, 0, 0], [0, 180, 0, 0], [W / 2, H / 2, 1, 0], [0, 0, 0, 1]], dtype=np.float32)
+xy1 = hl2ss_3dcv.to_homogeneous(hl2ss_3dcv.compute_uv2xy(lt_intrinsics, W, H))
+
+z = np.full((H, W, 1), 2.5, dtype=np.float32)
+z[H // 3:(2 * H) // 3, W // 3:(2 * W) // 3, :] = 1.0
+z[:8, :, :] = 0
+
+pv_intrinsics = np.array([[500, 0, 0, 0], [0, 500, 0, 0], [args.pv_width / 2, args.pv_height / 2, 1, 0], [0, 0, 0, 1]], dtype=np.float32)
+lt_to_world = np.eye(4, dtype=np.float32)
+world_to_pv = np.eye(4, dtype=np.float32)
+world_to_pv[3, 0] = 0.05
+
+
+# Per-point loop previously in sample_integrator_pv_depth_lt.py, the last
+# point written wins where blocks overlap
+def reproject_original(rays, depth, depth_to_world, world_to_camera, intrinsics, width, height, far_to_near=False):
+    xy1_o = rays[:-1, :-1, :]
+    xy1_d = rays[1:, 1:, :]
+
+    points_o = hl2ss_3dcv.transform(hl2ss_3dcv.rm_depth_to_points(xy1_o, depth[:-1, :-1, :]), depth_to_world @ world_to_camera)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        uv_o = hl2ss_3dcv.project(points_o, intrinsics)
+        uv_d = hl2ss_3dcv.project(hl2ss_3dcv.transform(hl2ss_3dcv.rm_depth_to_points(xy1_d, depth[:-1, :-1, :]), depth_to_world), world_to_camera @ intrinsics)
+
+    mask    = depth[:-1, :-1, 0].reshape((-1,)) > 0
+    pv_list = np.hstack((np.floor(hl2ss_3dcv.block_to_list(uv_o)[mask, :]), np.floor(hl2ss_3dcv.block_to_list(uv_d)[mask, :]) + 1, hl2ss_3dcv.block_to_list(points_o[:, :, 2:])[mask, :]))
+    pv_z    = np.zeros((height, width), dtype=np.float32)
+
+    if (far_to_near):
+        pv_list = pv_list[np.argsort(-pv_list[:, 4], kind='stable'), :]
+
+    for n in range(0, pv_list.shape[0]):
+        u0 = int(pv_list[n, 0])
+        v0 = int(pv_list[n, 1])
+        u1 = int(pv_list[n, 2])
+        v1 = int(pv_list[n, 3])
+
+        if ((u0 < 0) or (u0 >= width)):
+            continue
+        if ((u1 < 0) or (u1 > width)):
+            continue
+        if ((v0 < 0) or (v0 >= height)):
+            continue
+        if ((v1 < 0) or (v1 > height)):
+            continue
+
+        pv_z[v0:v1, u0:u1] = pv_list[n, 4]
+
+    return pv_z
+
+
+# Z-buffered loop with the optional block_max clip of rm_depth_reproject,
+# blocks are clipped after the image bounds test
+def reproject_reference(rays, depth, depth_to_world, world_to_camera, intrinsics, width, height, block_max=None):
+    xy1_o = rays[:-1, :-1, :]
+    xy1_d = rays[1:, 1:, :]
+    depth_to_camera = depth_to_world @ world_to_camera
+
+    points_o = hl2ss_3dcv.transform(hl2ss_3dcv.rm_depth_to_points(xy1_o, depth[:-1, :-1, :]), depth_to_camera)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        uv_o = hl2ss_3dcv.project(points_o, intrinsics)
+        uv_d = hl2ss_3dcv.project(hl2ss_3dcv.transform(hl2ss_3dcv.rm_depth_to_points(xy1_d, depth[:-1, :-1, :]), depth_to_camera), intrinsics)
+
+    mask    = depth[:-1, :-1, 0].reshape((-1,)) > 0
+    pv_list = np.hstack((np.floor(hl2ss_3dcv.block_to_list(uv_o)[mask, :]), np.floor(hl2ss_3dcv.block_to_list(uv_d)[mask, :]) + 1, hl2ss_3dcv.block_to_list(points_o[:, :, 2:])[mask, :]))
+    pv_z    = np.full((height, width), np.inf, dtype=np.float32)
+
+    for n in range(0, pv_list.shape[0]):
+        u0 = int(pv_list[n, 0])
+        v0 = int(pv_list[n, 1])
+        u1 = int(pv_list[n, 2])
+        v1 = int(pv_list[n, 3])
+        d  = np.float32(pv_list[n, 4])
+
+        if ((d <= 0) or (u0 < 0) or (u0 >= width) or (u1 < 0) or (u1 > width) or (v0 < 0) or (v0 >= height) or (v1 < 0) or (v1 > height)):
+            continue
+
+        if (block_max is not None):
+            u1 = min(u1, u0 + block_max)
+            v1 = min(v1, v0 + block_max)
+
+        np.minimum(pv_z[v0:v1, u0:u1], d, out=pv_z[v0:v1, u0:u1])
+
+    pv_z[np.isinf(pv_z)] = 0
+
+    return pv_z
+
+
+# Writing the points of the original loop from far to near makes last write
+# wins equal to nearest wins, so the unclipped result must match it exactly
+pv_z_original = reproject_original(xy1, z, lt_to_world, world_to_pv, pv_intrinsics, args.pv_width, args.pv_height, True)
+pv_z          = hl2ss_3dcv.rm_depth_reproject(xy1, z, lt_to_world, world_to_pv, pv_intrinsics, args.pv_width, args.pv_height)
+
+if (not np.array_equal(pv_z, pv_z_original)):
+    print('Mismatch between original loop and vectorised reprojection')
+    quit()
+
+pv_z_reference = reproject_reference(xy1, z, lt_to_world, world_to_pv, pv_intrinsics, args.pv_width, args.pv_height, 8)
+pv_z           = hl2ss_3dcv.rm_depth_reproject(xy1, z, lt_to_world, world_to_pv, pv_intrinsics, args.pv_width, args.pv_height, 8)
+
+if (not np.array_equal(pv_z, pv_z_reference)):
+    print('Mismatch between reference and vectorised reprojection with block_max')
+    quit()
+
+frame_time = 1 / hl2ss.Parameters_RM_DEPTH_LONGTHROW.FPS
+
+start = time.perf_counter()
+for _ in range(args.frames):
+    reproject_original(xy1, z, lt_to_world, world_to_pv, pv_intrinsics, args.pv_width, args.pv_height)
+original = (time.perf_counter() - start) / args.frames
+
+start = time.perf_counter()
+for _ in range(args.frames):
+    hl2ss_3dcv.rm_depth_reproject(xy1, z, lt_to_world, world_to_pv, pv_intrinsics, args.pv_width, args.pv_height)
+vectorised = (time.perf_counter() - start) / args.frames
+
+print(f'original:   {original * 1e3:.1f} ms/frame ({100 * original / frame_time:.2f}% of frame time at {hl2ss.Parameters_RM_DEPTH_LONGTHROW.FPS} FPS)')
+print(f'vectorised: {vectorised * 1e3:.1f} ms/frame ({100 * vectorised / frame_time:.2f}% of frame time at {hl2ss.Parameters_RM_DEPTH_LONGTHROW.FPS} FPS)')
+print(f'speedup:    {original / vectorised:.2f}x')
@@ -0,0 +1,22 @@
+
+import argparse
+
+parser = argparse.ArgumentParser(description='HL2SS decode bin Tool. Decodes data recorded with hl2ss_io in parallel and saves the decoded frames.')
+parser.add_argument('-I', '--input', action='append', required=True, help='Input bin files (e.g., -I ./data/personal_video.bin -I ./data/rm_vlc_leftfront.bin)')
+parser.add_argument('-O', '--output', required=True, help='Output folder (e.g., ./data/decoded)')
+parser.add_argument('--sink', choices=['npz', 'png'], default='npz', help='Save one npz file per segment or one png file per frame')
+parser.add_argument('--format', default='bgr24', help='Decoded format for video streams (e.g., bgr24)')
+parser.add_argument('--segment', type=int, default=300, help='Minimum number of frames per segment, segments start at keyframes')
+parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: number of CPUs)')
+args = parser.parse_args()
+
+import sys
+
+sys.path.append('../viewer')
+
+import hl2ss_ds
+
+if __name__ == '__main__':
+    sink = hl2ss_ds.decode_sink_npz(args.output) if (args.sink == 'npz') else hl2ss_ds.decode_sink_images(args.output)
+    count = hl2ss_ds.decode_parallel(args.input, sink, args.format, args.segment, args.workers)
+    print(f'Decoded {count} segments')
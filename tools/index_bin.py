@@ -0,0 +1,17 @@
+
+import argparse
+
+parser = argparse.ArgumentParser(description='HL2SS index bin Tool. Converts data recorded with hl2ss_io (HL2SSV23 or interrupted HL2SSV24 recordings) into a seekable HL2SSV24 file.')
+parser.add_argument('-I', '--input', required=True, help='Input bin file (e.g., ./data/personal_video.bin)')
+parser.add_argument('-O', '--output', required=True, help='Output bin file (e.g., ./data/personal_video_indexed.bin)')
+args = parser.parse_args()
+
+import sys
+
+sys.path.append('../viewer')
+
+import hl2ss_io
+
+count = hl2ss_io.create_index(args.input, args.output)
+
+print(f'Wrote {args.output} ({count} packets)')
@@ -0,0 +1,70 @@
+#------------------------------------------------------------------------------
+# This script receives several streams from the HoloLens concurrently on a
+# single asyncio event loop and prints the framerate of each stream every
+# second. Decoding runs in the default executor of the loop.
+# Press Ctrl+C to stop.
+#------------------------------------------------------------------------------
+
+import asyncio
+import time
+import hl2ss
+import hl2ss_lnm
+import hl2ss_aio
+
+# Settings --------------------------------------------------------------------
+
+# HoloLens address
+host = '192.168.1.7'
+
+# PV camera parameters
+pv_width     = 640
+pv_height    = 360
+pv_framerate = 30
+
+#------------------------------------------------------------------------------
+
+async def receive(name, client, counters):
+    async with client:
+        async for data in client:
+            counters[name] += 1
+
+
+async def report(counters):
+    start = time.perf_counter()
+    while (True):
+        await asyncio.sleep(1)
+        stop = time.perf_counter()
+        print(' '.join([f'{name}: {count / (stop - start):.2f} FPS' for name, count in counters.items()]))
+        for name in counters.keys():
+            counters[name] = 0
+        start = stop
+
+
+async def main():
+    sockopt = hl2ss_lnm.create_sockopt()
+    profile = hl2ss.VideoProfile.H265_MAIN
+    level   = hl2ss.H26xLevel.DEFAULT
+
+    hl2ss_lnm.start_subsystem_pv(host, hl2ss.StreamPort.PERSONAL_VIDEO)
+
+    vlc_bitrate = hl2ss_lnm.get_video_codec_default_bitrate(hl2ss.Parameters_RM_VLC.WIDTH, hl2ss.Parameters_RM_VLC.HEIGHT, hl2ss.Parameters_RM_VLC.FPS, 1, profile)
+    pv_bitrate  = hl2ss_lnm.get_video_codec_default_bitrate(pv_width, pv_height, pv_framerate, 1, profile)
+
+    clients = {
+        'vlc_lf' : hl2ss_aio.rx_decoded_rm_vlc(host, hl2ss.StreamPort.RM_VLC_LEFTFRONT, sockopt, hl2ss.ChunkSize.RM_VLC, hl2ss.StreamMode.MODE_1, 1, profile, level, vlc_bitrate, hl2ss_lnm.get_video_codec_default_options(hl2ss.Parameters_RM_VLC.WIDTH, hl2ss.Parameters_RM_VLC.HEIGHT, hl2ss.Parameters_RM_VLC.FPS, 1, profile)),
+        'vlc_rf' : hl2ss_aio.rx_decoded_rm_vlc(host, hl2ss.StreamPort.RM_VLC_RIGHTFRONT, sockopt, hl2ss.ChunkSize.RM_VLC, hl2ss.StreamMode.MODE_1, 1, profile, level, vlc_bitrate, hl2ss_lnm.get_video_codec_default_options(hl2ss.Parameters_RM_VLC.WIDTH, hl2ss.Parameters_RM_VLC.HEIGHT, hl2ss.Parameters_RM_VLC.FPS, 1, profile)),
+        'lt'     : hl2ss_aio.rx_decoded_rm_depth_longthrow(host, hl2ss.StreamPort.RM_DEPTH_LONGTHROW, sockopt, hl2ss.ChunkSize.RM_DEPTH_LONGTHROW, hl2ss.StreamMode.MODE_1, 1, hl2ss.PNGFilterMode.PAETH),
+        'imu'    : hl2ss_aio.rx_decoded_rm_imu(host, hl2ss.StreamPort.RM_IMU_ACCELEROMETER, sockopt, hl2ss.ChunkSize.RM_IMU, hl2ss.StreamMode.MODE_1),
+        'pv'     : hl2ss_aio.rx_decoded_pv(host, hl2ss.StreamPort.PERSONAL_VIDEO, sockopt, hl2ss.ChunkSize.PERSONAL_VIDEO, hl2ss.StreamMode.MODE_1, pv_width, pv_height, pv_framerate, 1, profile, level, pv_bitrate, hl2ss_lnm.get_video_codec_default_options(pv_width, pv_height, pv_framerate, 1, profile), 'bgr24'),
+        'si'     : hl2ss_aio.rx_decoded_si(host, hl2ss.StreamPort.SPATIAL_INPUT, sockopt, hl2ss.ChunkSize.SPATIAL_INPUT),
+    }
+
+    counters = { name : 0 for name in clients.keys() }
+
+    try:
+        await asyncio.gather(report(counters), *[receive(name, client, counters) for name, client in clients.items()])
+    finally:
+        hl2ss_lnm.stop_subsystem_pv(host, hl2ss.StreamPort.PERSONAL_VIDEO)
+
+
+asyncio.run(main())
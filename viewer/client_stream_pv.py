@@ -55,6 +55,12 @@ bitrate = None
 # 'gray8'
 decoded_format = 'bgr24'
 
+# Preview settings
+# downscale: decode at 1/downscale of the stream resolution
+# keyframe_only: decode only the first frame of each GOP
+downscale     = 1
+keyframe_only = False
+
 #------------------------------------------------------------------------------
 
 hl2ss_lnm.start_subsystem_pv(host, hl2ss.StreamPort.PERSONAL_VIDEO, enable_mrc=enable_mrc, shared=shared)
@@ -78,7 +84,7 @@ else:
     listener = hl2ss_utilities.key_listener(keyboard.Key.esc)
     listener.open()
 
-    client = hl2ss_lnm.rx_pv(host, hl2ss.StreamPort.PERSONAL_VIDEO, mode=mode, width=width, height=height, framerate=framerate, profile=profile, bitrate=bitrate, decoded_format=decoded_format)
+    client = hl2ss_lnm.rx_pv(host, hl2ss.StreamPort.PERSONAL_VIDEO, mode=mode, width=width, height=height, framerate=framerate, profile=profile, bitrate=bitrate, decoded_format=decoded_format, keyframe_only=keyframe_only, downscale=downscale)
     client.open()
 
     while (not listener.pressed()):
@@ -1,9 +1,17 @@
 
 import numpy as np
+import concurrent.futures
+import collections
 import weakref
+import threading
+import importlib.util
+import tempfile
+import json
+import os
 import socket
 import select
 import struct
+import time
 import cv2
 import av
 
@@ -349,6 +357,12 @@ class _client:
             raise Exception('connection closed')
         return chunk
 
+    def recv_into(self, buffer):
+        count = self._socket.recv_into(buffer)
+        if (count <= 0):
+            raise Exception('connection closed')
+        return count
+
     def download(self, total, chunk_size):
         data = bytearray()
 
@@ -371,11 +385,24 @@ class _client:
 #------------------------------------------------------------------------------
 
 class _packet:
+    '''
+    Packet of a stream. Packets returned by get_next_packet of the undecoded
+    receivers hold the payload as a memoryview into the receive arena
+    instead of bytes. Use bytes(payload) to keep a copy that does not pin the
+    arena, payloads are converted to bytes when pickled.
+    '''
+
     def __init__(self, timestamp, payload, pose):
         self.timestamp = timestamp
         self.payload   = payload
         self.pose      = pose
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        if (isinstance(self.payload, memoryview)):
+            state['payload'] = self.payload.tobytes()
+        return state
+
 
 def pack_packet(packet):
     buffer = bytearray()
@@ -428,6 +455,74 @@ class _unpacker:
         return unpack_packet(self._packet)
 
 
+class _unpacker_arena:
+    _ARENA_SIZE = 4 * 1024 * 1024
+    _RESERVE_MIN = 64 * 1024
+
+    def reset(self, mode):
+        self._mode = mode
+        self._state = 0
+        self._size = None
+        self._packet = None
+        self._pose_size = 64 if (mode == StreamMode.MODE_1) else 0
+        self._arena = bytearray(_unpacker_arena._ARENA_SIZE)
+        self._view = memoryview(self._arena)
+        self._begin = 0
+        self._end = 0
+
+    def _allocate(self, size):
+        # Packets returned by get are views into the arena so it is never
+        # rewound, pending bytes are moved to a new arena instead and the old
+        # one is released once no packet references it
+        count = self._end - self._begin
+        arena = bytearray(max(_unpacker_arena._ARENA_SIZE, count + size))
+        view = memoryview(arena)
+        view[:count] = self._view[self._begin:self._end]
+        self._arena = arena
+        self._view = view
+        self._begin = 0
+        self._end = count
+
+    def reserve(self, size):
+        # A new arena is started when less than _RESERVE_MIN bytes are left
+        # so that the tail of an arena is not received in tiny reads
+        free = len(self._arena) - self._end
+        if ((free < min(size, _unpacker_arena._RESERVE_MIN)) or ((self._state == 1) and ((self._begin + self._size) > len(self._arena)))):
+            self._allocate(max(size, self._size) if (self._state == 1) else size)
+            free = len(self._arena) - self._end
+        return self._view[self._end:(self._end + min(size, free))]
+
+    def commit(self, count):
+        self._end += count
+
+    def extend(self, chunk):
+        view = memoryview(chunk)
+        while (len(view) > 0):
+            buffer = self.reserve(len(view))
+            count = len(buffer)
+            buffer[:] = view[:count]
+            self.commit(count)
+            view = view[count:]
+
+    def unpack(self):
+        length = self._end - self._begin
+
+        if ((self._state == 0) and (length >= 12)):
+            self._size   = 12 + struct.unpack_from('<I', self._arena, self._begin + 8)[0] + self._pose_size
+            self._state  = 1
+
+        if ((self._state == 1) and (length >= self._size)):
+            self._packet = self._view[self._begin:(self._begin + self._size)]
+            self._begin += self._size
+            self._state  = 0
+            return True
+
+        return False
+
+    def get(self):
+        return unpack_packet(self._packet)
+
+
 #------------------------------------------------------------------------------
 # Packet Gatherer
 #------------------------------------------------------------------------------
@@ -435,7 +530,7 @@ class _unpacker:
 class _gatherer:
     def __init__(self):
         self._client = _client()
-        self._unpacker = _unpacker()
+        self._unpacker = _unpacker_arena()
 
     def open(self, host, port, sockopt, chunk_size, mode):
         self._chunk_size = chunk_size
@@ -446,12 +541,13 @@ class _gatherer:
         self._client.sendall(data)
 
     def get_next_packet(self, wait=True):
+        # The payload of the returned packet is a memoryview, see _packet
         while (True):
             if (self._unpacker.unpack()):
                 return self._unpacker.get()
             if ((not wait) and (not self._client.poll())):
                 return None
-            self._unpacker.extend(self._client.recv(self._chunk_size))
+            self._unpacker.commit(self._client.recv_into(self._unpacker.reserve(self._chunk_size)))
 
     def close(self):
         self._client.close()
@@ -976,30 +1072,99 @@ def get_audio_codec_bitrate(profile):
     return None
 
 
-class _codec_h264:
+class _codec_h26x:
+    # Decoded frames are queued and returned latency calls after their
+    # payload was sent, giving frame threading room to decode ahead
+    # Payloads are numbered through the packet pts, payloads that produce no
+    # frame (skip_frame, or not a multiple of keyframe_period which is only
+    # valid for streams that start with a keyframe and have a fixed GOP) are
+    # reported by dropped when the next frame is returned
+    # decode_time is the time taken by the send of the payload of the last
+    # returned frame, with frame threading part of the work of a payload is
+    # done during later sends
+    def __init__(self, name, thread_type, thread_count, latency, skip_frame=None, keyframe_period=0):
+        self._codec = av.CodecContext.create(name, 'r')
+        if (thread_type is not None):
+            self._codec.thread_type = thread_type
+            self._codec.thread_count = thread_count
+        if (skip_frame is not None):
+            self._codec.skip_frame = skip_frame
+        self._latency = latency
+        self._keyframe_period = keyframe_period
+        self._frames = collections.deque()
+        self._sent = collections.deque()
+        self._sequence = 0
+        self._next = 0
+        self.dropped = 0
+        self.unnumbered = 0
+        self.decode_time = 0
+
+    def _parse(self, payload):
+        return payload
+
+    def send(self, payload):
+        sequence = self._sequence
+        self._sequence += 1
+        if ((self._keyframe_period > 1) and ((sequence % self._keyframe_period) != 0)):
+            return
+        start = time.perf_counter()
+        for packet in self._codec.parse(self._parse(payload)):
+            packet.pts = sequence
+            self._frames.extend(self._codec.decode(packet))
+        self._sent.append((sequence, time.perf_counter() - start))
+
+    def receive(self):
+        if ((len(self._sent) <= self._latency) or (len(self._frames) <= 0)):
+            return None
+        frame = self._frames.popleft()
+        # libav copies the packet pts to the frame, a frame without pts is
+        # assumed to follow the previous one with no payload dropped, such
+        # frames are counted in unnumbered
+        if (frame.pts is None):
+            sequence = self._next
+            self.unnumbered += 1
+        else:
+            sequence = frame.pts
+        self.decode_time = 0
+        while ((len(self._sent) > 0) and (self._sent[0][0] <= sequence)):
+            sent, elapsed = self._sent.popleft()
+            if (sent == sequence):
+                self.decode_time = elapsed
+        self.dropped = sequence - self._next
+        self._next = sequence + 1
+        return frame
+
+    def decode(self, payload):
+        self.send(payload)
+        return self.receive()
+
+    def flush(self):
+        self._frames.extend(self._codec.decode(None))
+        frames = list(self._frames)
+        self._frames.clear()
+        self._sent.clear()
+        self._next = self._sequence
+        return frames
+
+
+class _codec_h264(_codec_h26x):
     _aud = b'\x00\x00\x00\x01\x09\x10'
 
-    def __init__(self):
-        self._codec = self._codec = av.CodecContext.create('h264', 'r')
+    def __init__(self, thread_type=None, thread_count=0, latency=0, skip_frame=None, keyframe_period=0):
+        super().__init__('h264', thread_type, thread_count, latency, skip_frame, keyframe_period)
 
-    def decode(self, payload):
-        for packet in self._codec.parse(payload[6:] + _codec_h264._aud):
-            for frame in self._codec.decode(packet):
-                return frame
-        return None
+    def _parse(self, payload):
+        return bytes(payload[6:]) + _codec_h264._aud
 
 
-class _codec_hevc:
+class _codec_hevc(_codec_h26x):
     _aud = b'\x00\x00\x00\x01\x46\x01\x03'
 
-    def __init__(self):
-        self._codec = self._codec = av.CodecContext.create('hevc', 'r')
+    def __init__(self, thread_type=None, thread_count=0, latency=0, skip_frame=None, keyframe_period=0):
+        super().__init__('hevc', thread_type, thread_count, latency, skip_frame, keyframe_period)
 
-    def decode(self, payload):
-        for packet in self._codec.parse(payload + _codec_hevc._aud):
-            for frame in self._codec.decode(packet):
-                return frame
-        return None
+    def _parse(self, payload):
+        return bytes(payload) + _codec_hevc._aud
 
 
 class _codec_aac:
@@ -1013,30 +1178,37 @@ class _codec_aac:
         return None
 
 
-def get_video_codec(profile):
-    if (profile == VideoProfile.H264_BASE):
-        return _codec_h264()
-    if (profile == VideoProfile.H264_MAIN):
-        return _codec_h264()
-    if (profile == VideoProfile.H264_HIGH):
-        return _codec_h264()
-    if (profile == VideoProfile.H265_MAIN):
-        return _codec_hevc()
+def _get_video_plane(frame, index, width, height):
+    plane = frame.planes[index]
+    return np.frombuffer(plane, dtype=np.uint8).reshape((-1, plane.line_size))[:height, :width]
 
-    return None
+
+def get_video_codec(profile, thread_type=None, thread_count=0, latency=0, skip_frame=None, keyframe_period=0):
+    name = get_video_codec_name(profile)
+    return None if (name is None) else decoders.create(name, thread_type, thread_count, latency, skip_frame, keyframe_period)
+
+
+def get_video_keyframe_period(options, keyframe_only):
+    if (not keyframe_only):
+        return 0
+    period = None if (options is None) else options.get(H26xEncoderProperty.CODECAPI_AVEncMPVGOPSize, None)
+    if (period is None):
+        raise Exception('keyframe_only requires H26xEncoderProperty.CODECAPI_AVEncMPVGOPSize in options')
+    return period
+
+
+def get_video_downscale_size(width, height, downscale):
+    # Even sizes so that 4:2:0 images can be converted after downscaling
+    return ((width // downscale) & ~1, (height // downscale) & ~1) if (downscale > 1) else (width, height)
+
+
+def _downscale_video_plane(plane, width, height):
+    return cv2.resize(plane, (width, height), interpolation=cv2.INTER_LINEAR)
 
 
 def get_audio_codec(profile):
-    if (profile == AudioProfile.AAC_12000):
-        return _codec_aac()
-    if (profile == AudioProfile.AAC_16000):
-        return _codec_aac()
-    if (profile == AudioProfile.AAC_20000):
-        return _codec_aac()
-    if (profile == AudioProfile.AAC_24000):
-        return _codec_aac()
-    
-    return None
+    name = get_audio_codec_name(profile)
+    return None if (name is None) else decoders.create(name)
 
 
 class _MetadataSize:
@@ -1085,6 +1257,211 @@ class _decompress_zdepth:
         return np.frombuffer(decompressed, dtype=np.uint16).reshape((height, width))
 
 
+class _decompress_png_opencv:
+    def decode(self, payload):
+        return cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+
+
+class _decompress_png_pyav:
+    # Codec contexts are not thread safe, each thread gets its own
+    def __init__(self):
+        self._local = threading.local()
+
+    def decode(self, payload):
+        codec = getattr(self._local, 'codec', None)
+        if (codec is None):
+            codec = av.CodecContext.create('png', 'r')
+            self._local.codec = codec
+        for frame in codec.decode(av.Packet(bytes(payload))):
+            return cv2.cvtColor(frame.to_ndarray(format='rgba'), cv2.COLOR_RGBA2BGRA)
+        return None
+
+
+def _get_png_samples(count=8):
+    # Synthetic long throw composites (depth over active brightness)
+    shape = Parameters_RM_DEPTH_LONGTHROW.SHAPE
+    samples = []
+    for i in range(0, count):
+        x, y = np.meshgrid(np.arange(shape[1]), np.arange(shape[0]))
+        depth = (1000 + 500 * np.sin((x + 8 * i) / 40) * np.cos(y / 30)).astype(np.uint16)
+        ab = ((x * y + 16 * i) % 1024).astype(np.uint16)
+        composite = np.vstack((depth, ab)).view(np.uint8).reshape((shape[0], shape[1], 4))
+        samples.append(cv2.imencode('.png', composite)[1].tobytes())
+    return samples
+
+
+#------------------------------------------------------------------------------
+# Decoder Registry
+#------------------------------------------------------------------------------
+
+class decoder_registry:
+    '''
+    Maps codec names (h264, hevc, aac, png, zdepth) to decoder backends.
+    A backend is a factory returning an object with a decode(payload) method
+    and an optional probe that reports if the backend can run on this host.
+    Each codec uses its selected backend, or the first available backend in
+    registration order. autoselect times the available backends on sample
+    payloads and selects the fastest, the timings are kept in benchmarks.
+    With startup_autoselect (HL2SS_DECODER_AUTOSELECT=1) the codecs that
+    were not selected explicitly are autoselected once, when the first
+    decoder is created, so that backends registered after import are
+    included. If selection_path is set (HL2SS_DECODER_SELECTION) the
+    selection is loaded from this JSON file, only codecs missing from it are
+    benchmarked and the file is updated. The selection is not saved by
+    default because it is only valid for the host and library versions that
+    produced it. RAW profiles are not backends: their payloads are not
+    encoded, so no backend of a codec could decode them and they bypass the
+    registry.
+    '''
+
+    def __init__(self, startup_autoselect=False, selection_path=None):
+        self._backends = dict()
+        self._available = dict()
+        self._selected = dict()
+        self._samples = dict()
+        self.benchmarks = dict()
+        self.startup_autoselect = startup_autoselect
+        self.selection_path = selection_path
+
+    def register(self, codec, backend, factory, probe=None):
+        self._backends.setdefault(codec, dict())[backend] = (factory, probe)
+        self._available.pop((codec, backend), None)
+
+    def register_samples(self, codec, generator):
+        self._samples[codec] = generator
+
+    def is_available(self, codec, backend):
+        available = self._available.get((codec, backend), None)
+        if (available is None):
+            factory, probe = self._backends[codec][backend]
+            try:
+                available = True if (probe is None) else bool(probe())
+            except Exception:
+                available = False
+            self._available[(codec, backend)] = available
+        return available
+
+    def get_backends(self, codec):
+        return [backend for backend in self._backends.get(codec, dict()).keys() if (self.is_available(codec, backend))]
+
+    def select(self, codec, backend):
+        if ((backend not in self._backends.get(codec, dict())) or (not self.is_available(codec, backend))):
+            raise Exception(f'Decoder backend {backend} is not available for {codec}')
+        self._selected[codec] = backend
+
+    def get_selected(self, codec):
+        if (self.startup_autoselect):
+            self.startup_autoselect = False
+            self._autoselect_startup()
+        backend = self._selected.get(codec, None)
+        if (backend is None):
+            backends = self.get_backends(codec)
+            if (len(backends) <= 0):
+                raise Exception(f'No decoder backend available for {codec}')
+            backend = backends[0]
+            self._selected[codec] = backend
+        return backend
+
+    def create(self, codec, *args, **kwargs):
+        return self._backends[codec][self.get_selected(codec)][0](*args, **kwargs)
+
+    def benchmark(self, codec, payloads, repeat=3):
+        # Minimum time to decode all payloads with a fresh decoder, per backend
+        results = dict()
+        for backend in self.get_backends(codec):
+            factory = self._backends[codec][backend][0]
+            best = None
+            try:
+                for _ in range(0, repeat):
+                    decoder = factory()
+                    start = time.perf_counter()
+                    for payload in payloads:
+                        decoder.decode(payload)
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if ((best is None) or (elapsed < best)) else best
+            except Exception:
+                continue
+            results[backend] = best
+        return results
+
+    def autoselect(self, codec, payloads=None, repeat=3):
+        if (payloads is None):
+            generator = self._samples.get(codec, None)
+            if ((generator is None) or (len(self.get_backends(codec)) <= 1)):
+                return self.get_selected(codec)
+            payloads = generator()
+        results = self.benchmark(codec, payloads, repeat)
+        if (len(results) <= 0):
+            return self.get_selected(codec)
+        self.benchmarks[codec] = results
+        self._selected[codec] = min(results, key=results.get)
+        return self._selected[codec]
+
+    def autoselect_all(self, repeat=3):
+        return {codec : self.autoselect(codec, None, repeat) for codec in self._backends.keys() if (len(self.get_backends(codec)) > 0)}
+
+    def load(self, path):
+        # Entries for unknown or unavailable backends are ignored
+        with open(path, 'r') as file:
+            data = json.load(file)
+        loaded = dict()
+        for codec, backend in data.get('selected', dict()).items():
+            if ((backend in self._backends.get(codec, dict())) and self.is_available(codec, backend)):
+                loaded[codec] = backend
+                if (codec in data.get('benchmarks', dict())):
+                    self.benchmarks[codec] = data['benchmarks'][codec]
+        self._selected.update(loaded)
+        return loaded
+
+    def save(self, path):
+        # Written to a unique temporary file and renamed so that processes
+        # starting together never read a partial file
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, temporary = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(path) + '.', dir=directory)
+        try:
+            with os.fdopen(fd, 'w') as file:
+                json.dump({'selected' : self._selected, 'benchmarks' : self.benchmarks}, file, indent=4)
+            os.replace(temporary, path)
+        except:
+            os.remove(temporary)
+            raise
+
+    def _autoselect_startup(self, repeat=3):
+        explicit = dict(self._selected)
+        loaded = dict()
+        if ((self.selection_path is not None) and os.path.isfile(self.selection_path)):
+            try:
+                loaded = self.load(self.selection_path)
+            except Exception:
+                loaded = dict()
+            self._selected.update(explicit)
+        pending = [codec for codec in self._backends.keys() if ((codec not in explicit) and (codec not in loaded) and (len(self.get_backends(codec)) > 0))]
+        for codec in pending:
+            self.autoselect(codec, None, repeat)
+        if ((self.selection_path is not None) and (len(pending) > 0)):
+            self.save(self.selection_path)
+
+
+def _probe_pyav(name):
+    return lambda : name in av.codecs_available
+
+
+def _probe_module(name):
+    return lambda : importlib.util.find_spec(name) is not None
+
+
+decoders = decoder_registry(os.environ.get('HL2SS_DECODER_AUTOSELECT', '0') == '1', os.environ.get('HL2SS_DECODER_SELECTION', None))
+
+decoders.register('h264',   'pyav',     _codec_h264,             _probe_pyav('h264'))
+decoders.register('hevc',   'pyav',     _codec_hevc,             _probe_pyav('hevc'))
+decoders.register('aac',    'pyav',     _codec_aac,              _probe_pyav('aac'))
+decoders.register('png',    'opencv',   _decompress_png_opencv)
+decoders.register('png',    'pyav',     _decompress_png_pyav,    _probe_pyav('png'))
+decoders.register('zdepth', 'pyzdepth', _decompress_zdepth,      _probe_module('pyzdepth'))
+
+decoders.register_samples('png', _get_png_samples)
+
+
 #------------------------------------------------------------------------------
 # RM VLC Decoder
 #------------------------------------------------------------------------------
@@ -1098,27 +1475,61 @@ class _RM_VLC_Frame:
 
 
 class _decode_rm_vlc_h26x:
-    def __init__(self, profile):
-        self._codec = get_video_codec(profile)
+    def __init__(self, profile, thread_type, thread_count, latency, skip_frame, keyframe_period, downscale):
+        self._codec = get_video_codec(profile, thread_type, thread_count, latency, skip_frame, keyframe_period)
+        self._size = get_video_downscale_size(Parameters_RM_VLC.WIDTH, Parameters_RM_VLC.HEIGHT, downscale)
 
     def decode(self, payload):
-        return self._codec.decode(payload).to_ndarray()[:Parameters_RM_VLC.HEIGHT, :Parameters_RM_VLC.WIDTH]
+        frame = self._codec.decode(payload)
+        if (frame is None):
+            return None
+        if (self._size != (Parameters_RM_VLC.WIDTH, Parameters_RM_VLC.HEIGHT)):
+            return _downscale_video_plane(_get_video_plane(frame, 0, Parameters_RM_VLC.WIDTH, Parameters_RM_VLC.HEIGHT), *self._size)
+        return frame.to_ndarray()[:Parameters_RM_VLC.HEIGHT, :Parameters_RM_VLC.WIDTH]
+
+    def get_decode_time(self):
+        return self._codec.decode_time
+
+    def get_dropped(self):
+        return self._codec.dropped
 
 
 class _decode_rm_vlc_raw:
+    def __init__(self, downscale):
+        self._size = get_video_downscale_size(Parameters_RM_VLC.WIDTH, Parameters_RM_VLC.HEIGHT, downscale)
+
     def decode(self, payload):
-        return np.frombuffer(payload, dtype=np.uint8).reshape(Parameters_RM_VLC.SHAPE)
+        image = np.frombuffer(payload, dtype=np.uint8).reshape(Parameters_RM_VLC.SHAPE)
+        return image if (self._size == (Parameters_RM_VLC.WIDTH, Parameters_RM_VLC.HEIGHT)) else _downscale_video_plane(image, *self._size)
+
+    def get_decode_time(self):
+        return 0
+
+    def get_dropped(self):
+        return 0
 
 
 class decode_rm_vlc:
-    def __init__(self, profile):
-        self._codec = _decode_rm_vlc_raw() if (profile == VideoProfile.RAW) else _decode_rm_vlc_h26x(profile)
+    def __init__(self, profile, thread_type=None, thread_count=0, latency=0, skip_frame=None, keyframe_period=0, downscale=1):
+        self._codec = _decode_rm_vlc_raw(downscale) if (profile == VideoProfile.RAW) else _decode_rm_vlc_h26x(profile, thread_type, thread_count, latency, skip_frame, keyframe_period, downscale)
+        self._metadata = collections.deque()
+
+    def get_decode_time(self):
+        return self._codec.get_decode_time()
+
+    def get_dropped(self):
+        return self._codec.get_dropped()
 
     def decode(self, payload):
-        data     = payload[:-_MetadataSize.RM_VLC]
-        metadata = payload[-_MetadataSize.RM_VLC:]
+        self._metadata.append(payload[-_MetadataSize.RM_VLC:])
+
+        image = self._codec.decode(payload[:-_MetadataSize.RM_VLC])
+        if (image is None):
+            return None
+        for _ in range(0, self._codec.get_dropped()):
+            self._metadata.popleft()
+        metadata = self._metadata.popleft()
 
-        image        = self._codec.decode(data)
         sensor_ticks = np.frombuffer(metadata, dtype=np.uint64, offset=0,  count=1)
         exposure     = np.frombuffer(metadata, dtype=np.uint64, offset=8,  count=1)
         gain         = np.frombuffer(metadata, dtype=np.uint32, offset=16, count=1)
@@ -1137,6 +1548,12 @@ class _RM_Depth_Frame:
         self.sensor_ticks = sensor_ticks
 
 
+def _copy_depth_ab(depth, ab, out):
+    np.copyto(out[0], depth)
+    np.copyto(out[1], ab)
+    return out
+
+
 class _decode_rm_depth_ahat_z_ab_h26x:
     TRUNCATE = 4
 
@@ -1150,47 +1567,63 @@ class _decode_rm_depth_ahat_z_ab_h26x:
     BEGIN_I_V = END_I_U
     END_I_V   = BEGIN_I_V + CS
 
-    def __init__(self, profile):
-        self._codec = get_video_codec(profile)
-
-    def decode(self, payload):
-        yuv = self._codec.decode(payload).to_ndarray()
-
-        y = yuv[_decode_rm_depth_ahat_z_ab_h26x.BEGIN_Z_Y : _decode_rm_depth_ahat_z_ab_h26x.END_Z_Y, :]
-        u = yuv[_decode_rm_depth_ahat_z_ab_h26x.BEGIN_I_U : _decode_rm_depth_ahat_z_ab_h26x.END_I_U, :].reshape((Parameters_RM_DEPTH_AHAT.HEIGHT, -1))
-        v = yuv[_decode_rm_depth_ahat_z_ab_h26x.BEGIN_I_V : _decode_rm_depth_ahat_z_ab_h26x.END_I_V, :].reshape((Parameters_RM_DEPTH_AHAT.HEIGHT, -1))
-
-        depth = np.multiply(y, _decode_rm_depth_ahat_z_ab_h26x.TRUNCATE, dtype=np.uint16)
-        ab    = np.empty((Parameters_RM_DEPTH_AHAT.HEIGHT, Parameters_RM_DEPTH_AHAT.WIDTH), dtype=np.uint16)
+    def __init__(self, profile, skip_frame=None, keyframe_period=0):
+        self._codec = get_video_codec(profile, None, 0, 0, skip_frame, keyframe_period)
+        self._uv = np.empty((Parameters_RM_DEPTH_AHAT.HEIGHT // 2, Parameters_RM_DEPTH_AHAT.WIDTH // 2, 2), dtype=np.uint8)
+
+    def unpack(self, y, u, v, depth, ab):
+        # u and v are interleaved and squared in u32 lanes, multiplying by
+        # 0x10001 copies each square to both u16 halves, giving the u u v v
+        # pattern of ab with contiguous passes only
+        np.copyto(depth, y)
+        np.multiply(depth, _decode_rm_depth_ahat_z_ab_h26x.TRUNCATE, out=depth)
+        cv2.merge((u, v), dst=self._uv)
+        lanes = ab.view(np.uint32).reshape((Parameters_RM_DEPTH_AHAT.HEIGHT, -1))
+        np.copyto(lanes, self._uv.reshape(lanes.shape))
+        np.multiply(lanes, lanes, out=lanes)
+        np.multiply(lanes, 0x10001, out=lanes)
+        return depth, ab
 
-        u = np.square(u, dtype=np.uint16)
-        v = np.square(v, dtype=np.uint16)
+    def decode(self, payload, out=None):
+        frame = self._codec.decode(payload)
+        if (frame is None):
+            return None
+        depth, ab = (np.empty(Parameters_RM_DEPTH_AHAT.SHAPE, dtype=np.uint16), np.empty(Parameters_RM_DEPTH_AHAT.SHAPE, dtype=np.uint16)) if (out is None) else out
 
-        ab[:, 0::4] = u
-        ab[:, 1::4] = u
-        ab[:, 2::4] = v
-        ab[:, 3::4] = v
+        if ((frame.format.name in ('yuv420p', 'yuvj420p')) and (frame.width == Parameters_RM_DEPTH_AHAT.WIDTH) and (frame.height == Parameters_RM_DEPTH_AHAT.HEIGHT)):
+            y = _get_video_plane(frame, 0, Parameters_RM_DEPTH_AHAT.WIDTH,      Parameters_RM_DEPTH_AHAT.HEIGHT)
+            u = _get_video_plane(frame, 1, Parameters_RM_DEPTH_AHAT.WIDTH // 2, Parameters_RM_DEPTH_AHAT.HEIGHT // 2)
+            v = _get_video_plane(frame, 2, Parameters_RM_DEPTH_AHAT.WIDTH // 2, Parameters_RM_DEPTH_AHAT.HEIGHT // 2)
+        else:
+            yuv = frame.to_ndarray()
+            y = yuv[_decode_rm_depth_ahat_z_ab_h26x.BEGIN_Z_Y : _decode_rm_depth_ahat_z_ab_h26x.END_Z_Y, :]
+            u = yuv[_decode_rm_depth_ahat_z_ab_h26x.BEGIN_I_U : _decode_rm_depth_ahat_z_ab_h26x.END_I_U, :].reshape((Parameters_RM_DEPTH_AHAT.HEIGHT // 2, -1))
+            v = yuv[_decode_rm_depth_ahat_z_ab_h26x.BEGIN_I_V : _decode_rm_depth_ahat_z_ab_h26x.END_I_V, :].reshape((Parameters_RM_DEPTH_AHAT.HEIGHT // 2, -1))
 
-        return depth, ab
+        return self.unpack(y, u, v, depth, ab)
 
 
 class _decode_rm_depth_ahat_z_ab_raw:
     _Z = 0
     _I = Parameters_RM_DEPTH_AHAT.PIXELS * _SIZEOF.WORD
 
-    def decode(self, payload):
+    def decode(self, payload, out=None):
         depth = np.frombuffer(payload, dtype=np.uint16, offset=_decode_rm_depth_ahat_z_ab_raw._Z, count=Parameters_RM_DEPTH_AHAT.PIXELS).reshape(Parameters_RM_DEPTH_AHAT.SHAPE)
         ab    = np.frombuffer(payload, dtype=np.uint16, offset=_decode_rm_depth_ahat_z_ab_raw._I, count=Parameters_RM_DEPTH_AHAT.PIXELS).reshape(Parameters_RM_DEPTH_AHAT.SHAPE)
         
-        return depth, ab
+        return (depth, ab) if (out is None) else _copy_depth_ab(depth, ab, out)
 
 
 class _decode_rm_depth_ahat_x_ab_h26x:
-    def __init__(self, profile):
-        self._codec = get_video_codec(profile)
+    def __init__(self, profile, skip_frame=None, keyframe_period=0):
+        self._codec = get_video_codec(profile, None, 0, 0, skip_frame, keyframe_period)
 
     def decode(self, payload):
-        return np.square(self._codec.decode(payload).to_ndarray()[:Parameters_RM_DEPTH_AHAT.HEIGHT, :Parameters_RM_DEPTH_AHAT.WIDTH], dtype=np.uint16)
+        frame = self._codec.decode(payload)
+        if (frame is None):
+            return None
+        image = _get_video_plane(frame, 0, Parameters_RM_DEPTH_AHAT.WIDTH, Parameters_RM_DEPTH_AHAT.HEIGHT) if (frame.format.name in ('yuv420p', 'yuvj420p')) else frame.to_ndarray()[:Parameters_RM_DEPTH_AHAT.HEIGHT, :Parameters_RM_DEPTH_AHAT.WIDTH]
+        return np.square(image, dtype=np.uint16)
 
 
 class _decode_rm_depth_ahat_x_ab_raw:
@@ -1203,21 +1636,23 @@ class _decode_rm_depth_ahat:
 
 
 class _decode_rm_depth_ahat_same:
-    def __init__(self, profile, base):
-        self._codec_f = _decode_rm_depth_ahat_z_ab_raw() if (profile == VideoProfile.RAW) else _decode_rm_depth_ahat_z_ab_h26x(profile)
+    def __init__(self, profile, base, skip_frame, keyframe_period):
+        self._codec_f = _decode_rm_depth_ahat_z_ab_raw() if (profile == VideoProfile.RAW) else _decode_rm_depth_ahat_z_ab_h26x(profile, skip_frame, keyframe_period)
         self._base = base
 
-    def decode(self, payload):
-        return self._codec_f.decode(payload[self._base:])
+    def decode(self, payload, out=None):
+        return self._codec_f.decode(payload[self._base:], out)
 
 
 class _decode_rm_depth_ahat_zdepth:
-    def __init__(self, profile, base):
-        self._codec_z = _decompress_zdepth()
-        self._codec_i = _decode_rm_depth_ahat_x_ab_raw() if (profile == VideoProfile.RAW) else _decode_rm_depth_ahat_x_ab_h26x(profile)
+    # Depth is decoded for every payload, zdepth frames depend on the
+    # previous ones, the frame is dropped when ab produces no image
+    def __init__(self, profile, base, skip_frame, keyframe_period):
+        self._codec_z = decoders.create('zdepth')
+        self._codec_i = _decode_rm_depth_ahat_x_ab_raw() if (profile == VideoProfile.RAW) else _decode_rm_depth_ahat_x_ab_h26x(profile, skip_frame, keyframe_period)
         self._base = base
 
-    def decode(self, payload):
+    def decode(self, payload, out=None):
         size_z, size_i = struct.unpack_from('<II', payload, 0)
 
         start_z = self._base
@@ -1227,27 +1662,39 @@ class _decode_rm_depth_ahat_zdepth:
 
         depth = self._codec_z.decode(payload[start_z:end_z])
         ab    = self._codec_i.decode(payload[start_i:end_i])
+
+        if (ab is None):
+            return None
         
-        return depth, ab
+        return (depth, ab) if (out is None) else _copy_depth_ab(depth, ab, out)
 
 
 class decode_rm_depth_ahat:
-    def __init__(self, profile_z, profile_ab, base=_decode_rm_depth_ahat.BASE):
-        self._codec = _decode_rm_depth_ahat_same(profile_ab, base) if (profile_z == DepthProfile.SAME) else _decode_rm_depth_ahat_zdepth(profile_ab, base)
+    # Depth is not downscaled, each pixel must keep its calibration ray and
+    # interpolated depth is not a measurement
+    def __init__(self, profile_z, profile_ab, base=_decode_rm_depth_ahat.BASE, skip_frame=None, keyframe_period=0):
+        self._codec = _decode_rm_depth_ahat_same(profile_ab, base, skip_frame, keyframe_period) if (profile_z == DepthProfile.SAME) else _decode_rm_depth_ahat_zdepth(profile_ab, base, skip_frame, keyframe_period)
 
-    def decode(self, payload):
+    def decode(self, payload, out=None):
         data     = payload[:-_MetadataSize.RM_DEPTH_AHAT]
         metadata = payload[-_MetadataSize.RM_DEPTH_AHAT:]
 
-        depth, ab    = self._codec.decode(data)
+        image = self._codec.decode(data, out)
+        if (image is None):
+            return None
+
+        depth, ab    = image
         sensor_ticks = np.frombuffer(metadata, dtype=np.uint64, offset=0, count=1)
 
         return _RM_Depth_Frame(depth, ab, sensor_ticks)
 
 
 class _decode_rm_depth_longthrow_png:
+    def __init__(self):
+        self._codec = decoders.create('png')
+
     def decode(self, payload):
-        composite = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        composite = self._codec.decode(payload)
         h, w, _   = composite.shape
         image     = composite.view(np.uint16).reshape((-1, w))
         depth     = image[:h, :]
@@ -1267,11 +1714,37 @@ class _decode_rm_depth_longthrow_raw:
         return depth, ab
 
 
+class _frame_rate_counter:
+    def __init__(self, period=1):
+        self._period = period
+        self._count = 0
+        self._start = time.perf_counter()
+        self._fps = 0
+
+    def update(self):
+        self._count += 1
+        now = time.perf_counter()
+        if ((now - self._start) >= self._period):
+            self._fps = self._count / (now - self._start)
+            self._count = 0
+            self._start = now
+
+    def get(self):
+        return self._fps
+
+
 class decode_rm_depth_longthrow:
-    def __init__(self, profile):
+    # With an executor, PNG decoding (cv2.imdecode releases the GIL) runs on
+    # its threads and decode returns frames in order, latency calls after
+    # their payload was sent
+    def __init__(self, profile, executor=None, latency=0):
         self._codec = _decode_rm_depth_longthrow_raw() if (profile == VideoProfile.RAW) else _decode_rm_depth_longthrow_png()
+        self._executor = executor
+        self._latency = latency
+        self._pending = collections.deque()
+        self._fps = _frame_rate_counter()
 
-    def decode(self, payload):
+    def _decode(self, payload):
         data     = payload[:-_MetadataSize.RM_DEPTH_LONGTHROW]
         metadata = payload[-_MetadataSize.RM_DEPTH_LONGTHROW:]
 
@@ -1280,6 +1753,27 @@ class decode_rm_depth_longthrow:
 
         return _RM_Depth_Frame(depth, ab, sensor_ticks)
 
+    def decode(self, payload):
+        if (self._executor is None):
+            frame = self._decode(payload)
+        else:
+            self._pending.append(self._executor.submit(self._decode, payload))
+            if (len(self._pending) <= self._latency):
+                return None
+            frame = self._pending.popleft().result()
+        self._fps.update()
+        return frame
+
+    def flush(self):
+        frames = [future.result() for future in self._pending]
+        self._pending.clear()
+        for _ in frames:
+            self._fps.update()
+        return frames
+
+    def get_fps(self):
+        return self._fps.get()
+
 
 #------------------------------------------------------------------------------
 # RM IMU Decoder
@@ -1300,23 +1794,54 @@ def rm_imu_fix_soc_ticks(vinyl_hup_ticks, soc_ticks):
     return soc_ticks + ((vinyl_hup_ticks - vinyl_hup_ticks[0]) // 100)
 
 
+# Wire layout of one IMU sample, payloads are arrays of samples
+RM_IMU_DTYPE = np.dtype([
+    ('vinyl_hup_ticks', '<u8'),
+    ('soc_ticks',       '<u8'),
+    ('x',               '<f4'),
+    ('y',               '<f4'),
+    ('z',               '<f4'),
+    ('temperature',     '<f4'),
+])
+
+
 class decode_rm_imu:
     def decode(self, payload):
-        data_u8  = np.frombuffer(payload, dtype=np.uint8)
-        data_u64 = data_u8.view(np.uint64)
-        data_f32 = data_u8.view(np.float32)
-
-        count           = len(payload) // 32
-        vinyl_hup_ticks = data_u64[( 0 // 8)::(32 // 8)]
-        soc_ticks       = data_u64[( 8 // 8)::(32 // 8)]
-        x               = data_f32[(16 // 4)::(32 // 4)]
-        y               = data_f32[(20 // 4)::(32 // 4)]
-        z               = data_f32[(24 // 4)::(32 // 4)]
-        temperature     = data_f32[(28 // 4)::(32 // 4)]
+        samples = np.frombuffer(payload, dtype=RM_IMU_DTYPE)
+
+        count           = samples.shape[0]
+        vinyl_hup_ticks = samples['vinyl_hup_ticks']
+        soc_ticks       = samples['soc_ticks']
+        x               = samples['x']
+        y               = samples['y']
+        z               = samples['z']
+        temperature     = samples['temperature']
         patch_soc_ticks = rm_imu_fix_soc_ticks(vinyl_hup_ticks, soc_ticks) if (soc_ticks[0] == soc_ticks[-1]) else soc_ticks
 
         return _RM_IMU_Frame(count, vinyl_hup_ticks, patch_soc_ticks, x, y, z, temperature)
 
+    def decode_array(self, payloads):
+        # Samples of all payloads in one array, soc_ticks are patched per
+        # payload, batch holds the index of the payload of each sample
+        samples = np.frombuffer(bytearray().join(payloads), dtype=RM_IMU_DTYPE)
+        counts  = np.array([len(payload) // RM_IMU_DTYPE.itemsize for payload in payloads], dtype=np.int64)
+        batch   = np.repeat(np.arange(counts.shape[0]), counts)
+        
+        if (samples.shape[0] > 0):
+            first     = np.cumsum(counts) - counts
+            last      = first + counts - 1
+            nonempty  = counts > 0
+            constant  = np.zeros(counts.shape, dtype=np.bool_)
+            constant[nonempty] = samples['soc_ticks'][first[nonempty]] == samples['soc_ticks'][last[nonempty]]
+            patch     = constant[batch]
+            vinyl     = samples['vinyl_hup_ticks'][patch]
+            samples['soc_ticks'][patch] += (vinyl - samples['vinyl_hup_ticks'][first[batch[patch]]]) // 100
+
+        return samples, batch
+
+    def get_frame(self, samples):
+        return _RM_IMU_Frame(samples.shape[0], samples['vinyl_hup_ticks'], samples['soc_ticks'], samples['x'], samples['y'], samples['z'], samples['temperature'])
+
 
 def rm_imu_get_batch_size(port):
     if (port == StreamPort.RM_IMU_ACCELEROMETER):
@@ -1360,11 +1885,66 @@ def pv_get_video_stride(width):
 
 
 class _decode_pv_h26x:
-    def __init__(self, profile):
-        self._codec = get_video_codec(profile)
+    _cv2_i420_format = {
+        'rgb24' : cv2.COLOR_YUV2RGB_I420,
+        'bgr24' : cv2.COLOR_YUV2BGR_I420,
+        'rgba'  : cv2.COLOR_YUV2RGBA_I420,
+        'bgra'  : cv2.COLOR_YUV2BGRA_I420,
+    }
+
+    # Limited to full range luma, same as to_ndarray(format='gray8')
+    _gray8_lut = np.clip(np.round((np.arange(256) - 16) * 255 / 219), 0, 255).astype(np.uint8)
+
+    def __init__(self, profile, thread_type, thread_count, latency, skip_frame=None, keyframe_period=0, downscale=1):
+        self._codec = get_video_codec(profile, thread_type, thread_count, latency, skip_frame, keyframe_period)
+        self._downscale = downscale
+        self._i420 = None
+
+    def _convert(self, frame, format, out):
+        # Planes are gathered (and downscaled) into a reused I420 buffer and
+        # converted straight into out, avoiding the intermediate arrays of
+        # to_ndarray and converting only the downscaled pixels
+        w = frame.width
+        h = frame.height
+        sw, sh = get_video_downscale_size(w, h, self._downscale)
+        if ((frame.format.name not in ('yuv420p', 'yuvj420p')) or (w % 2 != 0) or (h % 2 != 0)):
+            np.copyto(out, frame.to_ndarray(format=format) if ((sw, sh) == (w, h)) else frame.reformat(width=sw, height=sh, format=format).to_ndarray())
+            return out
+        if (format == 'gray8'):
+            y = _get_video_plane(frame, 0, w, h)
+            cv2.LUT(y if ((sw, sh) == (w, h)) else _downscale_video_plane(y, sw, sh), _decode_pv_h26x._gray8_lut, dst=out)
+            return out
+        sf = _decode_pv_h26x._cv2_i420_format.get(format, None)
+        if (sf is None):
+            np.copyto(out, frame.to_ndarray(format=format) if ((sw, sh) == (w, h)) else frame.reformat(width=sw, height=sh, format=format).to_ndarray())
+            return out
+        if ((self._i420 is None) or (self._i420.shape != ((sh * 3) // 2, sw))):
+            self._i420 = np.empty(((sh * 3) // 2, sw), dtype=np.uint8)
+        flat = self._i420.reshape((-1,))
+        cs = (sh // 2) * (sw // 2)
+        planes = [(_get_video_plane(frame, 0, w, h), flat[:(sh * sw)].reshape((sh, sw))), (_get_video_plane(frame, 1, w // 2, h // 2), flat[(sh * sw):(sh * sw + cs)].reshape((sh // 2, sw // 2))), (_get_video_plane(frame, 2, w // 2, h // 2), flat[(sh * sw + cs):].reshape((sh // 2, sw // 2)))]
+        for src, dst in planes:
+            if ((sw, sh) == (w, h)):
+                dst[:] = src
+            else:
+                cv2.resize(src, (dst.shape[1], dst.shape[0]), dst=dst, interpolation=cv2.INTER_LINEAR)
+        cv2.cvtColor(self._i420, sf, dst=out)
+        return out
+
+    def decode(self, payload, width, height, format, out=None):
+        frame = self._codec.decode(payload)
+        if (frame is None):
+            return None
+        if ((out is None) and (self._downscale > 1)):
+            shape = get_pv_image_shape(*get_video_downscale_size(frame.width, frame.height, self._downscale), format)
+            out = None if (shape is None) else np.empty(shape, dtype=np.uint8)
+        return frame.to_ndarray(format=format) if (out is None) else self._convert(frame, format, out)
 
-    def decode(self, payload, width, height, format):
-        return self._codec.decode(payload).to_ndarray(format=format)
+    def get_decode_time(self):
+        return self._codec.decode_time
+
+    def get_dropped(self):
+        return self._codec.dropped
 
 
 class _decode_pv_raw:
@@ -1377,23 +1957,104 @@ class _decode_pv_raw:
         'nv12'  : None
     }
 
-    def decode(self, payload, width, height, format):
+    def __init__(self, downscale=1):
+        self._downscale = downscale
+
+    def decode(self, payload, width, height, format, out=None):
         image = np.frombuffer(payload, dtype=np.uint8)
-        if (format == 'any'):
+        if (format != 'any'):
+            image = image.reshape(((height * 3) // 2, -1))[:, :width]
+            sf = _decode_pv_raw._cv2_nv12_format[format]
+            if (sf is not None):
+                if (self._downscale <= 1):
+                    return cv2.cvtColor(image, sf, dst=out)
+                return cv2.resize(cv2.cvtColor(image, sf), get_video_downscale_size(int(width), int(height), self._downscale), dst=out, interpolation=cv2.INTER_LINEAR)
+        if (out is None):
             return image
-        image = image.reshape(((height * 3) // 2, -1))[:, :width]
-        sf = _decode_pv_raw._cv2_nv12_format[format]
-        return image if (sf is None) else cv2.cvtColor(image, sf)
+        np.copyto(out, image)
+        return out
+
+    def get_decode_time(self):
+        return 0
+
+    def get_dropped(self):
+        return 0
+
+
+def get_pv_image_shape(width, height, format):
+    if (format == 'rgb24'):
+        return (height, width, 3)
+    if (format == 'bgr24'):
+        return (height, width, 3)
+    if (format == 'rgba'):
+        return (height, width, 4)
+    if (format == 'bgra'):
+        return (height, width, 4)
+    if (format == 'gray8'):
+        return (height, width)
+    if (format == 'nv12'):
+        return ((height * 3) // 2, width)
+
+    return None
+
+
+class buffer_pool:
+    '''
+    Recycles output arrays of fixed shape and dtype. Buffers obtained with
+    get are returned with release once the consumer is done with them, at
+    most size_max buffers of each shape are kept.
+    '''
+
+    def __init__(self, size_max=8):
+        self._size_max = size_max
+        self._free = dict()
+
+    def get(self, shape, dtype=np.uint8):
+        free = self._free.get((tuple(shape), np.dtype(dtype)), None)
+        return free.pop() if (free) else np.empty(shape, dtype=dtype)
+
+    def release(self, buffer):
+        if (not isinstance(buffer, np.ndarray)):
+            return
+        free = self._free.setdefault((buffer.shape, buffer.dtype), [])
+        if (len(free) < self._size_max):
+            free.append(buffer)
 
 
 class decode_pv:
-    def __init__(self, profile):
-        self._codec =  _decode_pv_raw() if (profile == VideoProfile.RAW) else _decode_pv_h26x(profile)
+    def __init__(self, profile, thread_type=None, thread_count=0, latency=0, pool=None, skip_frame=None, keyframe_period=0, downscale=1):
+        self._codec =  _decode_pv_raw(downscale) if (profile == VideoProfile.RAW) else _decode_pv_h26x(profile, thread_type, thread_count, latency, skip_frame, keyframe_period, downscale)
+        self._metadata = collections.deque()
+        self._pool = pool
+        self._downscale = downscale
+
+    def get_decode_time(self):
+        return self._codec.get_decode_time()
+
+    def get_dropped(self):
+        return self._codec.get_dropped()
 
-    def decode(self, payload, format):
+    def decode(self, payload, format, out=None):
         data     = payload[:-_MetadataSize.PERSONAL_VIDEO]
         metadata = payload[-_MetadataSize.PERSONAL_VIDEO:]
 
+        self._metadata.append(metadata)
+
+        resolution = np.frombuffer(metadata, dtype=np.uint16, offset=76, count=2)
+        if ((out is None) and (self._pool is not None)):
+            shape = get_pv_image_shape(*get_video_downscale_size(int(resolution[0]), int(resolution[1]), self._downscale), format) if ((self._downscale <= 1) or (format != 'nv12')) else None
+            pooled = None if (shape is None) else self._pool.get(shape)
+        else:
+            pooled = None
+        image = self._codec.decode(data, resolution[0], resolution[1], format, out if (pooled is None) else pooled)
+        if (image is None):
+            if (pooled is not None):
+                self._pool.release(pooled)
+            return None
+        for _ in range(0, self._codec.get_dropped()):
+            self._metadata.popleft()
+        metadata = self._metadata.popleft()
+
         focal_length          = np.frombuffer(metadata, dtype=np.float32, offset=0,  count=2)
         principal_point       = np.frombuffer(metadata, dtype=np.float32, offset=8,  count=2)
         exposure_time         = np.frombuffer(metadata, dtype=np.uint64,  offset=16, count=1)
@@ -1405,7 +2066,6 @@ class decode_pv:
         iso_gains             = np.frombuffer(metadata, dtype=np.float32, offset=56, count=2)
         white_balance_gains   = np.frombuffer(metadata, dtype=np.float32, offset=64, count=3)
         resolution            = np.frombuffer(metadata, dtype=np.uint16,  offset=76, count=2)
-        image                 = self._codec.decode(data, resolution[0], resolution[1], format)
 
         return _PV_Frame(image, focal_length, principal_point, exposure_time, exposure_compensation, lens_position, focus_state, iso_speed, white_balance, iso_gains, white_balance_gains, resolution)
 
@@ -1442,17 +2102,24 @@ class decode_microphone:
         return self._codec.decode(payload)
 
 
-def microphone_planar_to_packed(array, channels):
-    data = np.zeros((1, array.size), dtype=array.dtype)
+def microphone_planar_to_packed(array, channels, out=None):
+    # Per channel strided copies into a (samples, channels) view of the
+    # output, faster than a transposed copy for packet sized arrays
+    # out must be C contiguous, reshaping a strided array would copy it
+    if ((out is not None) and (not out.flags.c_contiguous)):
+        raise Exception('microphone_planar_to_packed: out must be C contiguous')
+    data   = np.empty((1, array.size), dtype=array.dtype) if (out is None) else out
+    frames = data.reshape((-1, channels))
     for i in range(0, channels):
-        data[0, i::channels] = array[i, :]
+        frames[:, i] = array[i, :]
     return data
 
 
-def microphone_packed_to_planar(array, channels):
-    data = np.zeros((channels, array.size // channels), dtype=array.dtype)
+def microphone_packed_to_planar(array, channels, out=None):
+    data   = np.empty((channels, array.size // channels), dtype=array.dtype) if (out is None) else out
+    frames = array.reshape((-1, channels))
     for i in range(0, channels):
-        data[i, :] = array[0, i::channels]
+        data[i, :] = frames[:, i]
     return data
 
 
@@ -1523,27 +2190,53 @@ class _SI_Frame:
         self.hand_right_valid = hand_right_valid
 
 
+SI_JOINT_DTYPE = np.dtype([
+    ('orientation', '<f4', (4,)),
+    ('position',    '<f4', (3,)),
+    ('radius',      '<f4'),
+    ('accuracy',    '<i4'),
+])
+
+# Wire layout of one SI payload
+SI_DTYPE = np.dtype([
+    ('valid',         '<u4'),
+    ('head_position', '<f4', (3,)),
+    ('head_forward',  '<f4', (3,)),
+    ('head_up',       '<f4', (3,)),
+    ('eye_origin',    '<f4', (3,)),
+    ('eye_direction', '<f4', (3,)),
+    ('hand_left',     SI_JOINT_DTYPE, (SI_HandJointKind.TOTAL,)),
+    ('hand_right',    SI_JOINT_DTYPE, (SI_HandJointKind.TOTAL,)),
+])
+
+
+class SI_Valid:
+    HEAD       = 0x01
+    EYE        = 0x02
+    HAND_LEFT  = 0x04
+    HAND_RIGHT = 0x08
+
+
 class decode_si:
     def decode(self, payload):
-        status = payload[:4]
-        data   = payload[4:]
-
-        valid = struct.unpack('<I', status)[0]
-        f     = np.frombuffer(data, dtype=np.float32)
-
-        head_pose         = _SI_HeadPose(f[0:3], f[3:6], f[6:9])
-        eye_ray           = _SI_EyeRay(f[9:12], f[12:15])
-        hands             = f[15:].reshape((-1, 9))
-        hands_orientation = hands[:, 0:4]
-        hands_position    = hands[:, 4:7]
-        hands_radius      = hands[:, 7]
-        hands_accuracy    = hands[:, 8].view(np.int32)
-        hand_left         = _SI_HandPose(hands_orientation[:SI_HandJointKind.TOTAL, :], hands_position[:SI_HandJointKind.TOTAL, :], hands_radius[:SI_HandJointKind.TOTAL], hands_accuracy[:SI_HandJointKind.TOTAL])
-        hand_right        = _SI_HandPose(hands_orientation[SI_HandJointKind.TOTAL:, :], hands_position[SI_HandJointKind.TOTAL:, :], hands_radius[SI_HandJointKind.TOTAL:], hands_accuracy[SI_HandJointKind.TOTAL:])
-        head_pose_valid   = (valid & 0x01) != 0
-        eye_ray_valid     = (valid & 0x02) != 0
-        hand_left_valid   = (valid & 0x04) != 0
-        hand_right_valid  = (valid & 0x08) != 0
+        return self.get_frame(np.frombuffer(payload, dtype=SI_DTYPE, count=1)[0])
+
+    def decode_array(self, payloads):
+        return np.frombuffer(bytearray().join(payloads), dtype=SI_DTYPE)
+
+    def get_frame(self, record):
+        # Fields of the frame are views of the record
+        valid             = int(record['valid'])
+        head_pose         = _SI_HeadPose(record['head_position'], record['head_forward'], record['head_up'])
+        eye_ray           = _SI_EyeRay(record['eye_origin'], record['eye_direction'])
+        left              = record['hand_left']
+        right             = record['hand_right']
+        hand_left         = _SI_HandPose(left['orientation'], left['position'], left['radius'], left['accuracy'])
+        hand_right        = _SI_HandPose(right['orientation'], right['position'], right['radius'], right['accuracy'])
+        head_pose_valid   = (valid & SI_Valid.HEAD) != 0
+        eye_ray_valid     = (valid & SI_Valid.EYE) != 0
+        hand_left_valid   = (valid & SI_Valid.HAND_LEFT) != 0
+        hand_right_valid  = (valid & SI_Valid.HAND_RIGHT) != 0
 
         return _SI_Frame(head_pose, eye_ray, hand_left, hand_right, head_pose_valid, eye_ray_valid, hand_left_valid, hand_right_valid)
 
@@ -1604,28 +2297,56 @@ class _EET_Frame:
         self.vergence_distance_valid = vergence_distance_valid
 
 
+# Wire layout of one EET payload
+EET_DTYPE = np.dtype([
+    ('reserved',           '<u4'),
+    ('combined_origin',    '<f4', (3,)),
+    ('combined_direction', '<f4', (3,)),
+    ('left_origin',        '<f4', (3,)),
+    ('left_direction',     '<f4', (3,)),
+    ('right_origin',       '<f4', (3,)),
+    ('right_direction',    '<f4', (3,)),
+    ('left_openness',      '<f4'),
+    ('right_openness',     '<f4'),
+    ('vergence_distance',  '<f4'),
+    ('valid',              '<u4'),
+])
+
+
+class EET_Valid:
+    CALIBRATION       = 0x01
+    COMBINED_RAY      = 0x02
+    LEFT_RAY          = 0x04
+    RIGHT_RAY         = 0x08
+    LEFT_OPENNESS     = 0x10
+    RIGHT_OPENNESS    = 0x20
+    VERGENCE_DISTANCE = 0x40
+
+
 class decode_eet:
     def decode(self, payload):
-        reserved = payload[:4]
-        data     = payload[4:-4]
-        status   = payload[-4:]
-
-        f     = np.frombuffer(data, dtype=np.float32)
-        valid = struct.unpack('<I', status)[0]
-
-        combined_ray            = _SI_EyeRay(f[ 0: 3], f[ 3: 6])
-        left_ray                = _SI_EyeRay(f[ 6: 9], f[ 9:12])
-        right_ray               = _SI_EyeRay(f[12:15], f[15:18])
-        left_openness           = f[18]
-        right_openness          = f[19]
-        vergence_distance       = f[20]
-        calibration_valid       = (valid & 0x01) != 0
-        combined_ray_valid      = (valid & 0x02) != 0
-        left_ray_valid          = (valid & 0x04) != 0
-        right_ray_valid         = (valid & 0x08) != 0
-        left_openness_valid     = (valid & 0x10) != 0
-        right_openness_valid    = (valid & 0x20) != 0
-        vergence_distance_valid = (valid & 0x40) != 0
+        return self.get_frame(np.frombuffer(payload, dtype=EET_DTYPE, count=1)[0])
+
+    def decode_array(self, payloads):
+        return np.frombuffer(bytearray().join(payloads), dtype=EET_DTYPE)
+
+    def get_frame(self, record):
+        # Fields of the frame are views of the record
+        valid = int(record['valid'])
+
+        combined_ray            = _SI_EyeRay(record['combined_origin'], record['combined_direction'])
+        left_ray                = _SI_EyeRay(record['left_origin'], record['left_direction'])
+        right_ray               = _SI_EyeRay(record['right_origin'], record['right_direction'])
+        left_openness           = record['left_openness']
+        right_openness          = record['right_openness']
+        vergence_distance       = record['vergence_distance']
+        calibration_valid       = (valid & EET_Valid.CALIBRATION) != 0
+        combined_ray_valid      = (valid & EET_Valid.COMBINED_RAY) != 0
+        left_ray_valid          = (valid & EET_Valid.LEFT_RAY) != 0
+        right_ray_valid         = (valid & EET_Valid.RIGHT_RAY) != 0
+        left_openness_valid     = (valid & EET_Valid.LEFT_OPENNESS) != 0
+        right_openness_valid    = (valid & EET_Valid.RIGHT_OPENNESS) != 0
+        vergence_distance_valid = (valid & EET_Valid.VERGENCE_DISTANCE) != 0
 
         return _EET_Frame(combined_ray, left_ray, right_ray, left_openness, right_openness, vergence_distance, calibration_valid, combined_ray_valid, left_ray_valid, right_ray_valid, left_openness_valid, right_openness_valid, vergence_distance_valid)
 
@@ -1674,7 +2395,7 @@ class _EZ_Frame:
 
 class _decode_extended_depth_zdepth:
     def __init__(self):
-        self._codec = _decompress_zdepth()
+        self._codec = decoders.create('zdepth')
 
     def decode(self, payload, width, height):
         return self._codec.decode(payload)
@@ -1704,57 +2425,96 @@ class decode_extended_depth:
 #------------------------------------------------------------------------------
 
 class rx_decoded_rm_vlc(rx_rm_vlc):
-    def __init__(self, host, port, sockopt, chunk, mode, divisor, profile, level, bitrate, options):
+    def __init__(self, host, port, sockopt, chunk, mode, divisor, profile, level, bitrate, options, thread_type=None, thread_count=0, latency=0, skip_frame=None, keyframe_only=False, downscale=1):
         super().__init__(host, port, sockopt, chunk, mode, divisor, profile, level, bitrate, options)
+        self.thread_type = thread_type
+        self.thread_count = thread_count
+        self.latency = latency
+        self.skip_frame = skip_frame
+        self.keyframe_only = keyframe_only
+        self.downscale = downscale
 
     def open(self):
-        self._codec = decode_rm_vlc(self.profile)
+        self._codec = decode_rm_vlc(self.profile, self.thread_type, self.thread_count, self.latency, self.skip_frame, get_video_keyframe_period(self.options, self.keyframe_only), self.downscale)
+        self._pending = collections.deque()
         super().open()
 
     def get_next_packet(self, wait=True):
-        data = super().get_next_packet(wait)
-        if (data is not None):
-            data.payload = self._codec.decode(data.payload)
-        return data
+        while (True):
+            data = super().get_next_packet(wait)
+            if (data is None):
+                return None
+            self._pending.append(data)
+            payload = self._codec.decode(data.payload)
+            if (payload is not None):
+                for _ in range(0, self._codec.get_dropped()):
+                    self._pending.popleft()
+                data = self._pending.popleft()
+                data.payload = payload
+                return data
+
+    def get_decode_time(self):
+        return self._codec.get_decode_time()
 
     def close(self):
         super().close()
 
 
 class rx_decoded_rm_depth_ahat(rx_rm_depth_ahat):
-    def __init__(self, host, port, sockopt, chunk, mode, divisor, profile_z, profile_ab, level, bitrate, options):
+    def __init__(self, host, port, sockopt, chunk, mode, divisor, profile_z, profile_ab, level, bitrate, options, skip_frame=None, keyframe_only=False):
         super().__init__(host, port, sockopt, chunk, mode, divisor, profile_z, profile_ab, level, bitrate, options)
+        self.skip_frame = skip_frame
+        self.keyframe_only = keyframe_only
         
     def open(self):
-        self._codec = decode_rm_depth_ahat(self.profile_z, self.profile_ab)
+        self._codec = decode_rm_depth_ahat(self.profile_z, self.profile_ab, _decode_rm_depth_ahat.BASE, self.skip_frame, get_video_keyframe_period(self.options, self.keyframe_only))
         super().open()
 
     def get_next_packet(self, wait=True):
-        data = super().get_next_packet(wait)
-        if (data is not None):
-            data.payload = self._codec.decode(data.payload)
-        return data
+        # No frame threading, payloads that produce no image are skipped
+        while (True):
+            data = super().get_next_packet(wait)
+            if (data is None):
+                return None
+            payload = self._codec.decode(data.payload)
+            if (payload is not None):
+                data.payload = payload
+                return data
 
     def close(self):
         super().close()
 
 
 class rx_decoded_rm_depth_longthrow(rx_rm_depth_longthrow):
-    def __init__(self, host, port, sockopt, chunk, mode, divisor, png_filter):
+    def __init__(self, host, port, sockopt, chunk, mode, divisor, png_filter, workers=0):
         super().__init__(host, port, sockopt, chunk, mode, divisor, png_filter)
+        self.workers = workers
 
     def open(self):
-        self._codec = decode_rm_depth_longthrow(self.png_filter)
+        self._executor = concurrent.futures.ThreadPoolExecutor(self.workers) if (self.workers > 0) else None
+        self._codec = decode_rm_depth_longthrow(self.png_filter, self._executor, max(self.workers - 1, 0))
+        self._pending = collections.deque()
         super().open()
 
     def get_next_packet(self, wait=True):
-        data = super().get_next_packet(wait)
-        if (data is not None):
-            data.payload = self._codec.decode(data.payload)
-        return data
+        while (True):
+            data = super().get_next_packet(wait)
+            if (data is None):
+                return None
+            self._pending.append(data)
+            payload = self._codec.decode(data.payload)
+            if (payload is not None):
+                data = self._pending.popleft()
+                data.payload = payload
+                return data
+
+    def get_fps(self):
+        return self._codec.get_fps()
 
     def close(self):
         super().close()
+        if (self._executor is not None):
+            self._executor.shutdown()
 
 
 class rx_decoded_rm_imu(rx_rm_imu):
@@ -1776,19 +2536,38 @@ class rx_decoded_rm_imu(rx_rm_imu):
 
 
 class rx_decoded_pv(rx_pv):
-    def __init__(self, host, port, sockopt, chunk, mode, width, height, framerate, divisor, profile, level, bitrate, options, format):
+    def __init__(self, host, port, sockopt, chunk, mode, width, height, framerate, divisor, profile, level, bitrate, options, format, thread_type=None, thread_count=0, latency=0, pool=None, skip_frame=None, keyframe_only=False, downscale=1):
         super().__init__(host, port, sockopt, chunk, mode, width, height, framerate, divisor, profile, level, bitrate, options)
         self.format = format
+        self.thread_type = thread_type
+        self.thread_count = thread_count
+        self.latency = latency
+        self.pool = pool
+        self.skip_frame = skip_frame
+        self.keyframe_only = keyframe_only
+        self.downscale = downscale
         
     def open(self):        
-        self._codec = decode_pv(self.profile)
+        self._codec = decode_pv(self.profile, self.thread_type, self.thread_count, self.latency, self.pool, self.skip_frame, get_video_keyframe_period(self.options, self.keyframe_only), self.downscale)
+        self._pending = collections.deque()
         super().open()
 
     def get_next_packet(self, wait=True):
-        data = super().get_next_packet(wait)
-        if (data is not None):
-            data.payload = self._codec.decode(data.payload, self.format)
-        return data
+        while (True):
+            data = super().get_next_packet(wait)
+            if (data is None):
+                return None
+            self._pending.append(data)
+            payload = self._codec.decode(data.payload, self.format)
+            if (payload is not None):
+                for _ in range(0, self._codec.get_dropped()):
+                    self._pending.popleft()
+                data = self._pending.popleft()
+                data.payload = payload
+                return data
+
+    def get_decode_time(self):
+        return self._codec.get_decode_time()
 
     def close(self):
         super().close()
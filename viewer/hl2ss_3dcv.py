@@ -1,6 +1,9 @@
 
 import numpy as np
 import os
+import hashlib
+import struct
+import tempfile
 import cv2
 import hl2ss
 import hl2ss_lnm
@@ -184,6 +187,58 @@ def rm_depth_to_points(rays, depth):
     return rays * depth
 
 
+def rm_depth_reproject(rays, depth, depth_to_world, world_to_camera, intrinsics, width, height, block_max=None):
+    # Splats each depth pixel over the image block spanned by the projections
+    # of its two opposite corners, nearest depth wins where blocks overlap
+    # Blocks are clipped to block_max x block_max pixels if block_max is set
+    # Blocks up to 8 x 8 are splatted together one offset at a time, larger
+    # blocks are rare and are splatted one by one
+    z     = depth[:-1, :-1, :]
+    valid = z.reshape((-1,)) > 0
+    z     = block_to_list(z)[valid, :]
+
+    depth_to_camera = depth_to_world @ world_to_camera
+    camera_to_pixel = camera_to_image(intrinsics)
+
+    points_o = transform(rm_depth_to_points(block_to_list(rays[:-1, :-1, :])[valid, :], z), depth_to_camera)
+    points_d = transform(rm_depth_to_points(block_to_list(rays[1:,  1:,  :])[valid, :], z), depth_to_camera)
+    uv_o     = np.floor(project(points_o, camera_to_pixel)).astype(np.int64)
+    uv_d     = np.floor(project(points_d, camera_to_pixel)).astype(np.int64) + 1
+    d        = points_o[:, 2].astype(np.float32)
+
+    select = (d > 0) & (uv_o[:, 0] >= 0) & (uv_o[:, 0] < width) & (uv_o[:, 1] >= 0) & (uv_o[:, 1] < height) & (uv_d[:, 0] >= 0) & (uv_d[:, 0] <= width) & (uv_d[:, 1] >= 0) & (uv_d[:, 1] <= height)
+
+    u = uv_o[select, 0]
+    v = uv_o[select, 1]
+    w = np.clip(uv_d[select, 0] - u, 0, block_max)
+    h = np.clip(uv_d[select, 1] - v, 0, block_max)
+    d = d[select]
+
+    buffer = np.full((height * width,), np.inf, dtype=np.float32)
+    image  = buffer.reshape((height, width))
+
+    large = (w > 8) | (h > 8)
+
+    for n in np.flatnonzero(large):
+        np.minimum(image[v[n]:(v[n] + h[n]), u[n]:(u[n] + w[n])], d[n], out=image[v[n]:(v[n] + h[n]), u[n]:(u[n] + w[n])])
+
+    small = ~large
+
+    offset = v[small] * width + u[small]
+    w      = w[small]
+    h      = h[small]
+    d      = d[small]
+
+    for dv in range(0, int(h.max()) if (h.size > 0) else 0):
+        for du in range(0, int(w.max())):
+            covered = (h > dv) & (w > du)
+            np.minimum.at(buffer, offset[covered] + (dv * width + du), d[covered])
+
+    buffer[np.isinf(buffer)] = 0
+
+    return image
+
+
 def rm_depth_colormap(depth, max_depth, colormap=cv2.COLORMAP_JET):
     return cv2.applyColorMap(((depth / max_depth) * 255).astype(np.uint8), colormap)
 
@@ -333,7 +388,7 @@ def _save_calibration_pv(calibration, path):
     calibration.intrinsics           .tofile(os.path.join(path, 'intrinsics.bin'))
     calibration.extrinsics           .tofile(os.path.join(path, 'extrinsics.bin'))
     calibration.intrinsics_mf        .tofile(os.path.join(path, 'intrinsics_mf.bin'))
-    calibration.extrinsics_mf        .tofile(os.path.join(path, 'extriniscs_mf.bin'))
+    calibration.extrinsics_mf        .tofile(os.path.join(path, 'extrinsics_mf.bin'))
 
 
 def _load_calibration_rm_vlc(path):
@@ -634,3 +689,269 @@ def load_stereo_rectification(port_1, port_2, path):
     base = _stereo_subdirectory(port_1, port_2, path)
     return _load_stereo_rectification(base)
 
+
+
+#------------------------------------------------------------------------------
+# Fused Remap
+#------------------------------------------------------------------------------
+
+# Out of image source coordinate for composed map pixels that have no source
+_REMAP_OUTSIDE = -64
+
+
+def _hash_arrays(*arrays):
+    digest = hashlib.sha1()
+    for array in arrays:
+        if (array is None):
+            digest.update(b'\x00')
+        else:
+            array = np.ascontiguousarray(array)
+            digest.update(str((array.dtype.str, array.shape)).encode())
+            digest.update(array.data)
+    return digest.hexdigest()
+
+
+def compose_remap(undistort_map, rotation=None, rectify_map=None):
+    # Rotating the map permutes destination pixels the same way cv2.rotate
+    # permutes the image, rectification samples the rotated map
+    # Rectified pixels whose nearest source pixel is outside the rotated image
+    # get no source, the others sample the map with replicated borders since
+    # interpolating towards the outside marker would give arbitrary sources
+    map_xy = undistort_map.astype(np.float32)
+    if (rotation is not None):
+        map_xy = cv2.rotate(map_xy, rotation)
+    if (rectify_map is not None):
+        h, w = map_xy.shape[0:2]
+        rx = rectify_map[:, :, 0].astype(np.float32)
+        ry = rectify_map[:, :, 1].astype(np.float32)
+        map_xy = cv2.remap(map_xy, rx, ry, cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+        map_xy[(rx < -0.5) | (rx > (w - 0.5)) | (ry < -0.5) | (ry > (h - 0.5)), :] = _REMAP_OUTSIDE
+    return map_xy
+
+
+class remap_pipeline:
+    '''
+    Undistortion, rotation and rectification composed into a single fixed
+    point (CV_16SC2) remap. Outputs can be preallocated, remap_rgb converts
+    grayscale images through an internal buffer so a pipeline should be used
+    by one thread at a time.
+    '''
+
+    def __init__(self, map1, map2, map1_nearest):
+        self.shape = map1.shape[0:2]
+        self._map1 = map1
+        self._map2 = map2
+        self._map1_nearest = map1_nearest
+        self._gray = None
+
+    def remap(self, image, out=None, interpolation=cv2.INTER_LINEAR):
+        if (interpolation == cv2.INTER_NEAREST):
+            return cv2.remap(image, self._map1_nearest, None, cv2.INTER_NEAREST, dst=out)
+        return cv2.remap(image, self._map1, self._map2, interpolation, dst=out)
+
+    def remap_rgb(self, image, out=None, interpolation=cv2.INTER_LINEAR):
+        if ((self._gray is None) or (self._gray.dtype != image.dtype)):
+            self._gray = np.empty(self.shape, dtype=image.dtype)
+        return cv2.cvtColor(self.remap(image, self._gray, interpolation), cv2.COLOR_GRAY2RGB, dst=out)
+
+
+def convert_remap(map_xy):
+    map1, map2 = cv2.convertMaps(map_xy, None, cv2.CV_16SC2)
+    map1_nearest, _ = cv2.convertMaps(map_xy, None, cv2.CV_16SC2, nninterpolation=True)
+    return (map1, map2, map1_nearest)
+
+
+_remap_pipelines = dict()
+
+
+def get_remap_pipeline(port, undistort_map, rotation=None, rectify_map=None):
+    # Cached by port and calibration hash, hashing the maps takes a few ms so
+    # get pipelines once and not per frame
+    key = (port, rotation, _hash_arrays(undistort_map, rectify_map))
+    pipeline = _remap_pipelines.get(key, None)
+    if (pipeline is None):
+        pipeline = remap_pipeline(*convert_remap(compose_remap(undistort_map, rotation, rectify_map)))
+        _remap_pipelines[key] = pipeline
+    return pipeline
+
+
+def rm_vlc_get_remap_pipeline(port, undistort_map, rotate=True, rectify_map=None):
+    return get_remap_pipeline(port, undistort_map, rm_vlc_get_rotation(port) if (rotate) else None, rectify_map)
+
+
+def clear_remap_pipelines():
+    _remap_pipelines.clear()
+
+
+#------------------------------------------------------------------------------
+# Calibration LUT Store
+#------------------------------------------------------------------------------
+
+# One file per calibration: header, array table and 64 byte aligned arrays
+# Header: magic, version, count, calibration hash, content hash
+# Array: name, dtype, ndim, shape (up to 4 dimensions), offset
+_LUT_MAGIC   = b'HL2SSLUT'
+_LUT_VERSION = 1
+_LUT_HEADER  = struct.Struct('<8sII40s40s')
+_LUT_ARRAY   = struct.Struct('<32s8sI4QQ')
+_LUT_ALIGN   = 64
+
+
+def _lut_align(offset):
+    return (offset + _LUT_ALIGN - 1) & ~(_LUT_ALIGN - 1)
+
+
+def _save_calibration_lut(filename, calibration_hash, arrays):
+    arrays = {name : np.ascontiguousarray(array) for name, array in arrays.items()}
+    offset = _lut_align(_LUT_HEADER.size + len(arrays) * _LUT_ARRAY.size)
+    table = bytearray()
+    offsets = []
+    for name, array in arrays.items():
+        table.extend(_LUT_ARRAY.pack(name.encode(), array.dtype.str.encode(), array.ndim, *(array.shape + (0,) * (4 - array.ndim)), offset))
+        offsets.append(offset)
+        offset = _lut_align(offset + array.nbytes)
+    data = bytearray(offset - offsets[0])
+    for array, start in zip(arrays.values(), offsets):
+        data[(start - offsets[0]):(start - offsets[0] + array.nbytes)] = array.tobytes()
+    content_hash = hashlib.sha1(data).hexdigest()
+    # Unique temporary file, processes building the same LUT at the same
+    # time each publish a complete file
+    fd, temporary = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(filename) + '.', dir=os.path.dirname(filename))
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(_LUT_HEADER.pack(_LUT_MAGIC, _LUT_VERSION, len(arrays), calibration_hash.encode(), content_hash.encode()))
+            file.write(table)
+            file.write(bytes(offsets[0] - _LUT_HEADER.size - len(table)))
+            file.write(data)
+        os.replace(temporary, filename)
+    except:
+        os.remove(temporary)
+        raise
+
+
+class _CalibrationLUT:
+    # Arrays are read only views of a single memory map, processes that load
+    # the same file share its pages and pickling sends only the filename
+    def __init__(self, filename):
+        self.filename = filename
+        self._buffer = np.memmap(filename, dtype=np.uint8, mode='r')
+        magic, version, count, calibration_hash, content_hash = _LUT_HEADER.unpack_from(self._buffer, 0)
+        if ((magic != _LUT_MAGIC) or (version != _LUT_VERSION)):
+            raise Exception(f'{filename} is not a calibration LUT file')
+        self.calibration_hash = calibration_hash.decode()
+        self.content_hash = content_hash.decode()
+        self.names = []
+        self._data = None
+        for index in range(0, count):
+            name, dtype, ndim, d0, d1, d2, d3, offset = _LUT_ARRAY.unpack_from(self._buffer, _LUT_HEADER.size + index * _LUT_ARRAY.size)
+            name = name.rstrip(b'\x00').decode()
+            self._data = offset if (self._data is None) else min(self._data, offset)
+            setattr(self, name, np.ndarray((d0, d1, d2, d3)[0:ndim], dtype=np.dtype(dtype.rstrip(b'\x00').decode()), buffer=self._buffer, offset=offset))
+            self.names.append(name)
+        self._remap = None
+
+    def __reduce__(self):
+        return (_CalibrationLUT, (self.filename,))
+
+    def validate(self):
+        return hashlib.sha1(self._buffer[self._data:]).hexdigest() == self.content_hash
+
+    def get_remap_pipeline(self):
+        # Undistort (and rotate for RM VLC) map precomputed in fixed point
+        if (self._remap is None):
+            self._remap = remap_pipeline(self.remap_map1, self.remap_map2, self.remap_map1_nearest)
+        return self._remap
+
+
+def _get_calibration_files(path):
+    # Calibration files saved by get_calibration_rm/pv, the LUT is rebuilt
+    # when they change or are downloaded again
+    files = []
+    for name in sorted(os.listdir(path)):
+        filename = os.path.join(path, name)
+        if ((not name.endswith('.bin')) or (not os.path.isfile(filename))):
+            continue
+        stat = os.stat(filename)
+        files.append((name, stat.st_size, stat.st_mtime_ns))
+    return tuple(files)
+
+
+def _hash_calibration_files(path, files):
+    sha1 = hashlib.sha1()
+    for name, _, _ in files:
+        sha1.update(name.encode())
+        with open(os.path.join(path, name), 'rb') as file:
+            sha1.update(file.read())
+    return sha1.hexdigest()
+
+
+_calibration_hashes = dict()
+
+
+def _get_calibration_hash(path):
+    # Contents are hashed again only when name, size or mtime of a file change
+    files = _get_calibration_files(path)
+    stamp, calibration_hash = _calibration_hashes.get(path, (None, None))
+    if (stamp != files):
+        calibration_hash = _hash_calibration_files(path, files)
+        _calibration_hashes[path] = (files, calibration_hash)
+    return calibration_hash
+
+
+def _compute_calibration_lut_rm(port, calibration):
+    arrays = dict(vars(calibration))
+    if ('uv2xy' in arrays):
+        if ('scale' in arrays):
+            arrays['rays'], arrays['rays_scale'] = rm_depth_compute_rays(arrays['uv2xy'], arrays['scale'])
+        else:
+            arrays['rays'] = to_homogeneous(arrays['uv2xy'])
+    if ('undistort_map' in arrays):
+        arrays['remap_map1'], arrays['remap_map2'], arrays['remap_map1_nearest'] = convert_remap(compose_remap(arrays['undistort_map'], rm_vlc_get_rotation(port)))
+    return arrays
+
+
+def _compute_calibration_lut_pv(calibration):
+    return dict(vars(calibration))
+
+
+_calibration_luts = dict()
+
+
+def _load_calibration_lut(filename, calibration_hash, validate):
+    try:
+        lut = _calibration_luts.get(filename, None) or _CalibrationLUT(filename)
+    except:
+        return None
+    return lut if ((lut.calibration_hash == calibration_hash) and ((not validate) or lut.validate())) else None
+
+
+def _get_calibration_lut(base, get_calibration, compute, validate):
+    filename = os.path.join(base, 'calibration.lut')
+    lut = _load_calibration_lut(filename, _get_calibration_hash(base), validate)
+    if (lut is None):
+        calibration = get_calibration()
+        _save_calibration_lut(filename, _get_calibration_hash(base), compute(calibration))
+        lut = _CalibrationLUT(filename)
+    _calibration_luts[filename] = lut
+    return lut
+
+
+def get_calibration_lut_rm(path, host, port, sockopt=None, validate=False):
+    # Calibration plus precomputed rays (rm_depth_compute_rays for depth) and
+    # undistort remap, computed once per calibration directory
+    _check_calibration_directory(path)
+    base = _calibration_subdirectory(port, path)
+    os.makedirs(base, exist_ok=True)
+    return _get_calibration_lut(base, lambda : get_calibration_rm(path, host, port, sockopt), lambda calibration : _compute_calibration_lut_rm(port, calibration), validate)
+
+
+def get_calibration_lut_pv(path, host, port, sockopt=None, focus=1000, width=1920, height=1080, framerate=30, validate=False):
+    _check_calibration_directory(path)
+    base = _calibration_subdirectory_pv(focus, width, height, _calibration_subdirectory(port, path))
+    os.makedirs(base, exist_ok=True)
+    return _get_calibration_lut(base, lambda : get_calibration_pv(path, host, port, sockopt, focus, width, height, framerate), _compute_calibration_lut_pv, validate)
+
+
+def clear_calibration_luts():
+    _calibration_luts.clear()
+    _calibration_hashes.clear()
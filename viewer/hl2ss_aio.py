@@ -0,0 +1,499 @@
+
+import asyncio
+import struct
+import socket
+import hl2ss
+
+
+#------------------------------------------------------------------------------
+# Client
+#------------------------------------------------------------------------------
+
+class _client:
+    async def open(self, host, port, sockopt):
+        self._loop = asyncio.get_running_loop()
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, sockopt['setsockopt.IPPROTO_TCP.TCP_NODELAY'])
+        self._socket.setblocking(False)
+        self._timeout = sockopt['settimeout']
+        await asyncio.wait_for(self._loop.sock_connect(self._socket, (host, port)), self._timeout)
+
+    async def sendall(self, data):
+        await asyncio.wait_for(self._loop.sock_sendall(self._socket, data), self._timeout)
+
+    async def recv_into(self, buffer):
+        count = await asyncio.wait_for(self._loop.sock_recv_into(self._socket, buffer), self._timeout)
+        if (count <= 0):
+            raise Exception('connection closed')
+        return count
+
+    async def close(self):
+        self._socket.close()
+
+
+#------------------------------------------------------------------------------
+# Packet Gatherer
+#------------------------------------------------------------------------------
+
+class _gatherer:
+    def __init__(self):
+        self._client = _client()
+        self._unpacker = hl2ss._unpacker_arena()
+
+    async def open(self, host, port, sockopt, chunk_size, mode):
+        self._chunk_size = chunk_size
+        self._unpacker.reset(mode)
+        await self._client.open(host, port, sockopt)
+
+    async def sendall(self, data):
+        await self._client.sendall(data)
+
+    async def get_next_packet(self):
+        while (True):
+            if (self._unpacker.unpack()):
+                return self._unpacker.get()
+            self._unpacker.commit(await self._client.recv_into(self._unpacker.reserve(self._chunk_size)))
+
+    async def close(self):
+        await self._client.close()
+
+
+async def _connect_client(host, port, sockopt, chunk_size, mode, configuration):
+    c = _gatherer()
+    await c.open(host, port, sockopt, chunk_size, mode)
+    if (configuration is not None):
+        await c.sendall(configuration)
+    return c
+
+
+#------------------------------------------------------------------------------
+# Context Manager
+#------------------------------------------------------------------------------
+
+class _context_manager:
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.get_next_packet()
+
+
+#------------------------------------------------------------------------------
+# Receiver Wrappers
+#------------------------------------------------------------------------------
+
+class rx_rm_vlc(_context_manager):
+    def __init__(self, host, port, sockopt, chunk, mode, divisor, profile, level, bitrate, options):
+        self.host = host
+        self.port = port
+        self.sockopt = sockopt
+        self.chunk = chunk
+        self.mode = mode
+        self.divisor = divisor
+        self.profile = profile
+        self.level = level
+        self.bitrate = bitrate
+        self.options = options
+
+    async def open(self):
+        self._client = await _connect_client(self.host, self.port, self.sockopt, self.chunk, self.mode, hl2ss._create_configuration_for_rm_vlc(self.mode, self.divisor, self.profile, self.level, self.bitrate, self.options))
+
+    async def get_next_packet(self):
+        while (True):
+            data = await self._client.get_next_packet()
+            if (len(data.payload) > hl2ss._MetadataSize.RM_VLC):
+                return data
+
+    async def close(self):
+        await self._client.close()
+
+
+class rx_rm_depth_ahat(_context_manager):
+    def __init__(self, host, port, sockopt, chunk, mode, divisor, profile_z, profile_ab, level, bitrate, options):
+        self.host = host
+        self.port = port
+        self.sockopt = sockopt
+        self.chunk = chunk
+        self.mode = mode
+        self.divisor = divisor
+        self.profile_z = profile_z
+        self.profile_ab = profile_ab
+        self.level = level
+        self.bitrate = bitrate
+        self.options = options
+
+    async def open(self):
+        self._client = await _connect_client(self.host, self.port, self.sockopt, self.chunk, self.mode, hl2ss._create_configuration_for_rm_depth_ahat(self.mode, self.divisor, self.profile_z, self.profile_ab, self.level, self.bitrate, self.options))
+
+    async def get_next_packet(self):
+        while (True):
+            data = await self._client.get_next_packet()
+            if (struct.unpack_from('<II', data.payload, 0)[1] > 0):
+                return data
+
+    async def close(self):
+        await self._client.close()
+
+
+class rx_rm_depth_longthrow(_context_manager):
+    def __init__(self, host, port, sockopt, chunk, mode, divisor, png_filter):
+        self.host = host
+        self.port = port
+        self.sockopt = sockopt
+        self.chunk = chunk
+        self.mode = mode
+        self.divisor = divisor
+        self.png_filter = png_filter
+
+    async def open(self):
+        self._client = await _connect_client(self.host, self.port, self.sockopt, self.chunk, self.mode, hl2ss._create_configuration_for_rm_depth_longthrow(self.mode, self.divisor, self.png_filter))
+
+    async def get_next_packet(self):
+        return await self._client.get_next_packet()
+
+    async def close(self):
+        await self._client.close()
+
+
+class rx_rm_imu(_context_manager):
+    def __init__(self, host, port, sockopt, chunk, mode):
+        self.host = host
+        self.port = port
+        self.sockopt = sockopt
+        self.chunk = chunk
+        self.mode = mode
+
+    async def open(self):
+        self._client = await _connect_client(self.host, self.port, self.sockopt, self.chunk, self.mode, hl2ss._create_configuration_for_rm_imu(self.mode))
+
+    async def get_next_packet(self):
+        return await self._client.get_next_packet()
+
+    async def close(self):
+        await self._client.close()
+
+
+class rx_pv(_context_manager):
+    def __init__(self, host, port, sockopt, chunk, mode, width, height, framerate, divisor, profile, level, bitrate, options):
+        self.host = host
+        self.port = port
+        self.sockopt = sockopt
+        self.chunk = chunk
+        self.mode = mode
+        self.width = width
+        self.height = height
+        self.framerate = framerate
+        self.divisor = divisor
+        self.profile = profile
+        self.level = level
+        self.bitrate = bitrate
+        self.options = options
+
+    async def open(self):
+        self._client = await _connect_client(self.host, self.port, self.sockopt, self.chunk, self.mode, hl2ss._create_configuration_for_pv(self.mode, self.width, self.height, self.framerate, self.divisor, self.profile, self.level, self.bitrate, self.options))
+
+    async def get_next_packet(self):
+        while (True):
+            data = await self._client.get_next_packet()
+            if (len(data.payload) > hl2ss._MetadataSize.PERSONAL_VIDEO):
+                return data
+
+    async def close(self):
+        await self._client.close()
+
+
+class rx_microphone(_context_manager):
+    def __init__(self, host, port, sockopt, chunk, profile, level):
+        self.host = host
+        self.port = port
+        self.sockopt = sockopt
+        self.chunk = chunk
+        self.profile = profile
+        self.level = level
+
+    async def open(self):
+        self._client = await _connect_client(self.host, self.port, self.sockopt, self.chunk, hl2ss.StreamMode.MODE_0, hl2ss._create_configuration_for_microphone(self.profile, self.level))
+
+    async def get_next_packet(self):
+        return await self._client.get_next_packet()
+
+    async def close(self):
+        await self._client.close()
+
+
+class rx_si(_context_manager):
+    def __init__(self, host, port, sockopt, chunk):
+        self.host = host
+        self.port = port
+        self.sockopt = sockopt
+        self.chunk = chunk
+
+    async def open(self):
+        self._client = await _connect_client(self.host, self.port, self.sockopt, self.chunk, hl2ss.StreamMode.MODE_0, None)
+
+    async def get_next_packet(self):
+        return await self._client.get_next_packet()
+
+    async def close(self):
+        await self._client.close()
+
+
+class rx_eet(_context_manager):
+    def __init__(self, host, port, sockopt, chunk, fps):
+        self.host = host
+        self.port = port
+        self.sockopt = sockopt
+        self.chunk = chunk
+        self.fps = fps
+
+    async def open(self):
+        self._client = await _connect_client(self.host, self.port, self.sockopt, self.chunk, hl2ss.StreamMode.MODE_1, hl2ss._create_configuration_for_eet(self.fps))
+
+    async def get_next_packet(self):
+        return await self._client.get_next_packet()
+
+    async def close(self):
+        await self._client.close()
+
+
+class rx_extended_audio(_context_manager):
+    def __init__(self, host, port, sockopt, chunk, mixer_mode, loopback_gain, microphone_gain, profile, level):
+        self.host = host
+        self.port = port
+        self.sockopt = sockopt
+        self.chunk = chunk
+        self.mixer_mode = mixer_mode
+        self.loopback_gain = loopback_gain
+        self.microphone_gain = microphone_gain
+        self.profile = profile
+        self.level = level
+
+    async def open(self):
+        self._client = await _connect_client(self.host, self.port, self.sockopt, self.chunk, hl2ss.StreamMode.MODE_0, hl2ss._create_configuration_for_extended_audio(self.mixer_mode, self.loopback_gain, self.microphone_gain, self.profile, self.level))
+
+    async def get_next_packet(self):
+        return await self._client.get_next_packet()
+
+    async def close(self):
+        await self._client.close()
+
+
+class rx_extended_depth(_context_manager):
+    def __init__(self, host, port, sockopt, chunk, mode, divisor, profile_z, options):
+        self.host = host
+        self.port = port
+        self.sockopt = sockopt
+        self.chunk = chunk
+        self.mode = mode
+        self.divisor = divisor
+        self.profile_z = profile_z
+        self.options = options
+
+    async def open(self):
+        self._client = await _connect_client(self.host, self.port, self.sockopt, self.chunk, self.mode, hl2ss._create_configuration_for_extended_depth(self.mode, self.divisor, self.profile_z, self.options))
+
+    async def get_next_packet(self):
+        return await self._client.get_next_packet()
+
+    async def close(self):
+        await self._client.close()
+
+
+#------------------------------------------------------------------------------
+# Decoded Receivers
+#------------------------------------------------------------------------------
+
+# Decoding runs in executor (None selects the default executor of the loop)
+# so the event loop only does network I/O, packets of a given stream are still
+# decoded one at a time and in order since stateful codecs require it
+
+async def _decode(executor, function, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+
+class rx_decoded_rm_vlc(rx_rm_vlc):
+    def __init__(self, host, port, sockopt, chunk, mode, divisor, profile, level, bitrate, options, executor=None):
+        super().__init__(host, port, sockopt, chunk, mode, divisor, profile, level, bitrate, options)
+        self.executor = executor
+
+    async def open(self):
+        self._codec = hl2ss.decode_rm_vlc(self.profile)
+        await super().open()
+
+    async def get_next_packet(self):
+        data = await super().get_next_packet()
+        data.payload = await _decode(self.executor, self._codec.decode, data.payload)
+        return data
+
+    async def close(self):
+        await super().close()
+
+
+class rx_decoded_rm_depth_ahat(rx_rm_depth_ahat):
+    def __init__(self, host, port, sockopt, chunk, mode, divisor, profile_z, profile_ab, level, bitrate, options, executor=None):
+        super().__init__(host, port, sockopt, chunk, mode, divisor, profile_z, profile_ab, level, bitrate, options)
+        self.executor = executor
+
+    async def open(self):
+        self._codec = hl2ss.decode_rm_depth_ahat(self.profile_z, self.profile_ab)
+        await super().open()
+
+    async def get_next_packet(self):
+        data = await super().get_next_packet()
+        data.payload = await _decode(self.executor, self._codec.decode, data.payload)
+        return data
+
+    async def close(self):
+        await super().close()
+
+
+class rx_decoded_rm_depth_longthrow(rx_rm_depth_longthrow):
+    def __init__(self, host, port, sockopt, chunk, mode, divisor, png_filter, executor=None):
+        super().__init__(host, port, sockopt, chunk, mode, divisor, png_filter)
+        self.executor = executor
+
+    async def open(self):
+        self._codec = hl2ss.decode_rm_depth_longthrow(self.png_filter)
+        await super().open()
+
+    async def get_next_packet(self):
+        data = await super().get_next_packet()
+        data.payload = await _decode(self.executor, self._codec.decode, data.payload)
+        return data
+
+    async def close(self):
+        await super().close()
+
+
+class rx_decoded_rm_imu(rx_rm_imu):
+    def __init__(self, host, port, sockopt, chunk, mode, executor=None):
+        super().__init__(host, port, sockopt, chunk, mode)
+        self.executor = executor
+
+    async def open(self):
+        self._codec = hl2ss.decode_rm_imu()
+        await super().open()
+
+    async def get_next_packet(self):
+        data = await super().get_next_packet()
+        data.payload = await _decode(self.executor, self._codec.decode, data.payload)
+        return data
+
+    async def close(self):
+        await super().close()
+
+
+class rx_decoded_pv(rx_pv):
+    def __init__(self, host, port, sockopt, chunk, mode, width, height, framerate, divisor, profile, level, bitrate, options, format, executor=None):
+        super().__init__(host, port, sockopt, chunk, mode, width, height, framerate, divisor, profile, level, bitrate, options)
+        self.format = format
+        self.executor = executor
+
+    async def open(self):
+        self._codec = hl2ss.decode_pv(self.profile)
+        await super().open()
+
+    async def get_next_packet(self):
+        data = await super().get_next_packet()
+        data.payload = await _decode(self.executor, self._codec.decode, data.payload, self.format)
+        return data
+
+    async def close(self):
+        await super().close()
+
+
+class rx_decoded_microphone(rx_microphone):
+    def __init__(self, host, port, sockopt, chunk, profile, level, executor=None):
+        super().__init__(host, port, sockopt, chunk, profile, level)
+        self.executor = executor
+
+    async def open(self):
+        self._codec = hl2ss.decode_microphone(self.profile, self.level)
+        await super().open()
+
+    async def get_next_packet(self):
+        data = await super().get_next_packet()
+        data.payload = await _decode(self.executor, self._codec.decode, data.payload)
+        return data
+
+    async def close(self):
+        await super().close()
+
+
+class rx_decoded_si(rx_si):
+    def __init__(self, host, port, sockopt, chunk, executor=None):
+        super().__init__(host, port, sockopt, chunk)
+        self.executor = executor
+
+    async def open(self):
+        self._codec = hl2ss.decode_si()
+        await super().open()
+
+    async def get_next_packet(self):
+        data = await super().get_next_packet()
+        data.payload = await _decode(self.executor, self._codec.decode, data.payload)
+        return data
+
+    async def close(self):
+        await super().close()
+
+
+class rx_decoded_eet(rx_eet):
+    def __init__(self, host, port, sockopt, chunk, fps, executor=None):
+        super().__init__(host, port, sockopt, chunk, fps)
+        self.executor = executor
+
+    async def open(self):
+        self._codec = hl2ss.decode_eet()
+        await super().open()
+
+    async def get_next_packet(self):
+        data = await super().get_next_packet()
+        data.payload = await _decode(self.executor, self._codec.decode, data.payload)
+        return data
+
+    async def close(self):
+        await super().close()
+
+
+class rx_decoded_extended_audio(rx_extended_audio):
+    def __init__(self, host, port, sockopt, chunk, mixer_mode, loopback_gain, microphone_gain, profile, level, executor=None):
+        super().__init__(host, port, sockopt, chunk, mixer_mode, loopback_gain, microphone_gain, profile, level)
+        self.executor = executor
+
+    async def open(self):
+        self._codec = hl2ss.decode_extended_audio(self.profile, self.level)
+        await super().open()
+
+    async def get_next_packet(self):
+        data = await super().get_next_packet()
+        data.payload = await _decode(self.executor, self._codec.decode, data.payload)
+        return data
+
+    async def close(self):
+        await super().close()
+
+
+class rx_decoded_extended_depth(rx_extended_depth):
+    def __init__(self, host, port, sockopt, chunk, mode, divisor, profile_z, options, executor=None):
+        super().__init__(host, port, sockopt, chunk, mode, divisor, profile_z, options)
+        self.executor = executor
+
+    async def open(self):
+        self._codec = hl2ss.decode_extended_depth(self.profile_z)
+        await super().open()
+
+    async def get_next_packet(self):
+        data = await super().get_next_packet()
+        data.payload = await _decode(self.executor, self._codec.decode, data.payload)
+        return data
+
+    async def close(self):
+        await super().close()
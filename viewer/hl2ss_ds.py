@@ -1,6 +1,10 @@
 
 import multiprocessing as mp
+import numpy as np
 import fractions
+import time
+import os
+import cv2
 import av
 import hl2ss
 import hl2ss_io
@@ -33,8 +37,8 @@ class _wr_process(mp.Process):
                 self._sink.acquire()
                 state, _, data = self._sink.get_buffered_frame(self._frame_stamp)
                 if (state == hl2ss_mx.Status.OK):
+                    writer.write(data, self._frame_stamp)
                     self._frame_stamp += 1
-                    writer.write(data)
                 elif (state == hl2ss_mx.Status.DISCARDED):
                     self._frame_stamp = hl2ss_mx.get_sync_frame_stamp(self._frame_stamp + 1, self._sync_period)
                     print(f'[hl2ss_ds._wr_process] {self._worker_name} writer out of sync')
@@ -59,6 +63,144 @@ class wr(hl2ss._context_manager):
         self._worker.join()
 
 
+class _wr_statistics:
+    PACKETS    = 0
+    BYTES      = 1
+    THROUGHPUT = 2
+    BACKLOG    = 3
+    RESYNCS    = 4
+    COUNT      = 5
+
+
+class _wr_batch_process(mp.Process):
+    def __init__(self, filenames, producer, ports, user, batch_size, fsync_period):
+        super().__init__()
+        self._event_stop = mp.Event()
+        self._ports = list(ports)
+        self._batch_size = batch_size
+        self._fsync_period = fsync_period
+        manager = mp.Manager()
+        consumer = hl2ss_mp.consumer()
+        self._wr = [hl2ss_io.create_wr_from_rx(filenames[port], producer.get_receiver(port), user) for port in self._ports]
+        self._sink = [consumer.create_sink(producer, port, manager, ... if (index == 0) else self._ports[0]) for index, port in enumerate(self._ports)]
+        self._statistics = mp.Array('d', len(self._ports) * _wr_statistics.COUNT)
+
+    def stop(self):
+        self._event_stop.set()
+        self._sink[0].release()
+
+    def get_statistics(self):
+        with self._statistics.get_lock():
+            values = self._statistics[:]
+        return {port : { 'packets' : int(values[base + _wr_statistics.PACKETS]), 'bytes' : int(values[base + _wr_statistics.BYTES]), 'throughput' : values[base + _wr_statistics.THROUGHPUT], 'backlog' : int(values[base + _wr_statistics.BACKLOG]), 'resyncs' : int(values[base + _wr_statistics.RESYNCS]) } for port, base in zip(self._ports, range(0, len(values), _wr_statistics.COUNT))}
+
+    def _update_statistics(self, index, packets, count, backlog, resync):
+        base = index * _wr_statistics.COUNT
+        with self._statistics.get_lock():
+            self._statistics[base + _wr_statistics.PACKETS] += packets
+            self._statistics[base + _wr_statistics.BYTES] += count
+            self._statistics[base + _wr_statistics.BACKLOG] = backlog
+            self._statistics[base + _wr_statistics.RESYNCS] += resync
+
+    def _update_throughput(self, window_bytes, elapsed):
+        with self._statistics.get_lock():
+            for index in range(0, len(self._ports)):
+                self._statistics[index * _wr_statistics.COUNT + _wr_statistics.THROUGHPUT] = window_bytes[index] / elapsed
+
+    def _drain(self, index):
+        sink = self._sink[index]
+        frame_stamps = list(range(self._frame_stamp[index], self._frame_stamp[index] + self._batch_size)) + [-1]
+        states, frame_stamps, data = sink.get_buffered_frames(frame_stamps)
+        frame_stamp = self._frame_stamp[index]
+        packets = []
+        resync = 0
+        for state, packet in zip(states[:-1], data[:-1]):
+            if (state == hl2ss_mx.Status.OK):
+                self._frame_stamp[index] += 1
+                packets.append(packet)
+            elif (state == hl2ss_mx.Status.DISCARDED):
+                self._frame_stamp[index] = hl2ss_mx.get_sync_frame_stamp(self._frame_stamp[index] + 1, self._sync_period[index])
+                resync += 1
+                print(f'[hl2ss_ds._wr_batch_process] {self._worker_name[index]} writer out of sync')
+                break
+            else:
+                break
+        count = self._wr[index].write_many(packets, frame_stamp) if (len(packets) > 0) else 0
+        backlog = max(int(frame_stamps[-1]) + 1 - self._frame_stamp[index], 0)
+        self._update_statistics(index, len(packets), count, backlog, resync)
+        return len(packets), count, backlog
+
+    def run(self):
+        self._sync_period = [hl2ss_mx.get_sync_period(wr) for wr in self._wr]
+        self._frame_stamp = [hl2ss_mx.get_sync_frame_stamp(sink.get_attach_response() + 1, sync_period) for sink, sync_period in zip(self._sink, self._sync_period)]
+        self._worker_name = [hl2ss.get_port_name(port) for port in self._ports]
+
+        for wr in self._wr:
+            wr.open()
+
+        active = [True] * len(self._ports)
+        window_bytes = [0] * len(self._ports)
+        window_start = time.perf_counter()
+        fsync_start = window_start
+
+        while ((not self._event_stop.is_set()) and any(active)):
+            self._sink[0].acquire()
+            while (self._sink[0].acquire(False)):
+                pass
+            pending = True
+            while (pending):
+                pending = False
+                for index in range(0, len(self._ports)):
+                    if (not active[index]):
+                        continue
+                    packets, count, backlog = self._drain(index)
+                    window_bytes[index] += count
+                    pending = pending or ((packets >= self._batch_size) and (backlog > 0))
+                    if ((packets <= 0) and (not self._sink[index].get_source_status())):
+                        active[index] = False
+            now = time.perf_counter()
+            if ((now - window_start) >= 1):
+                self._update_throughput(window_bytes, now - window_start)
+                window_bytes = [0] * len(self._ports)
+                window_start = now
+            if ((self._fsync_period is not None) and ((now - fsync_start) >= self._fsync_period)):
+                for wr in self._wr:
+                    wr.sync()
+                fsync_start = now
+
+        for index in range(0, len(self._ports)):
+            if (active[index]):
+                self._drain(index)
+
+        for wr in self._wr:
+            if (self._fsync_period is not None):
+                wr.sync()
+            wr.close()
+
+        for index in range(0, len(self._ports)):
+            source_string = self._sink[index].get_source_string()
+            self._sink[index].detach()
+            if (source_string is None):
+                continue
+            print(f'[hl2ss_ds._wr_batch_process] {self._worker_name[index]} source was lost:')
+            print(source_string)
+
+
+class wr_batch(hl2ss._context_manager):
+    def __init__(self, filenames, producer, ports, user, batch_size=64, fsync_period=None):
+        self._worker = _wr_batch_process(filenames, producer, ports, user, batch_size, fsync_period)
+
+    def open(self):
+        self._worker.start()
+
+    def get_statistics(self):
+        return self._worker.get_statistics()
+
+    def close(self):
+        self._worker.stop()
+        self._worker.join()
+
+
 #------------------------------------------------------------------------------
 # Unpacking
 #------------------------------------------------------------------------------
@@ -177,3 +319,144 @@ def unpack_to_mp4(input_filenames, output_filename):
     for reader in readers:
         reader.close()
 
+
+#------------------------------------------------------------------------------
+# Parallel Decoding
+#------------------------------------------------------------------------------
+
+def _get_decoded_fields(payload, prefix=None):
+    # Nested frames (SI, EET) are flattened into dotted names, scalars are
+    # stored as 0-d arrays
+    if (isinstance(payload, (np.ndarray, np.generic, int, float))):
+        return { 'payload' if (prefix is None) else prefix : np.asarray(payload) }
+    if (not hasattr(payload, '__dict__')):
+        raise Exception(f'Unsupported payload field {prefix} of type {type(payload).__name__}')
+    fields = dict()
+    for key, value in vars(payload).items():
+        fields.update(_get_decoded_fields(value, key if (prefix is None) else f'{prefix}.{key}'))
+    return fields
+
+
+def _get_image_fields(payload):
+    if (isinstance(payload, np.ndarray)):
+        return { 'payload' : payload }
+    return { key : value for key, value in vars(payload).items() if (isinstance(value, np.ndarray) and (value.ndim >= 2)) }
+
+
+def _stack_decoded_fields(values):
+    try:
+        return np.stack(values)
+    except ValueError:
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+
+
+class decode_sink_npz:
+    # One npz file per segment, segment files sort in decoding order
+    def __init__(self, path):
+        self.path = path
+
+    def process(self, name, segment, start, packets):
+        folder = os.path.join(self.path, name)
+        os.makedirs(folder, exist_ok=True)
+        fields = [_get_decoded_fields(packet.payload) for packet in packets]
+        if ((len(fields) > 0) and (len(fields[0]) <= 0)):
+            raise Exception(f'No payload fields to save for {name}')
+        arrays = { key : _stack_decoded_fields([f[key] for f in fields]) for key in fields[0].keys() } if (len(fields) > 0) else {}
+        arrays['frame'] = np.arange(start, start + len(packets), dtype=np.int64)
+        arrays['timestamp'] = np.array([packet.timestamp for packet in packets], dtype=np.uint64)
+        if ((len(packets) > 0) and (packets[0].pose is not None)):
+            arrays['pose'] = np.stack([packet.pose for packet in packets])
+        np.savez(os.path.join(folder, f'{segment:06d}.npz'), **arrays)
+        return len(packets)
+
+    def collect(self, name, segment, start, result):
+        pass
+
+
+class decode_sink_images:
+    # One image per frame and image field (e.g. depth and ab), named after
+    # the frame index in the file
+    def __init__(self, path, extension='.png'):
+        self.path = path
+        self.extension = extension
+
+    def process(self, name, segment, start, packets):
+        for index, packet in enumerate(packets, start):
+            for key, value in _get_image_fields(packet.payload).items():
+                folder = os.path.join(self.path, name, key)
+                os.makedirs(folder, exist_ok=True)
+                cv2.imwrite(os.path.join(folder, f'{index:08d}_{packet.timestamp}{self.extension}'), value)
+        return len(packets)
+
+    def collect(self, name, segment, start, result):
+        pass
+
+
+class decode_sink_callback:
+    # Decoded packets are sent back to the calling process, callback is
+    # invoked as callback(name, index, packet) in file order for each stream
+    def __init__(self, callback):
+        self.callback = callback
+
+    def __getstate__(self):
+        return {}
+
+    def process(self, name, segment, start, packets):
+        return packets
+
+    def collect(self, name, segment, start, result):
+        for index, packet in enumerate(result, start):
+            self.callback(name, index, packet)
+
+
+def _get_decode_segments(filename, segment_size):
+    # Segments start at keyframes so each one can be decoded independently
+    rd = hl2ss_io.create_rd_mmap(filename, None)
+    rd.open()
+    index = rd.get_index()
+    rd.close()
+    count = len(index)
+    keyframes = np.flatnonzero(index['keyframe']).tolist()
+    if ((len(keyframes) <= 0) or (keyframes[0] != 0)):
+        keyframes.insert(0, 0)
+    segments = []
+    start = 0
+    for keyframe in keyframes[1:]:
+        if ((keyframe - start) >= segment_size):
+            segments.append((start, keyframe))
+            start = keyframe
+    if (count > start):
+        segments.append((start, count))
+    return segments
+
+
+def _decode_segment(task):
+    filename, name, format, segment, start, stop, sink = task
+    rd = hl2ss_io.create_rd_mmap(filename, format)
+    rd.open()
+    rd.seek_frame(start)
+    packets = []
+    for _ in range(start, stop):
+        packet = rd.get_next_packet()
+        if (packet is None):
+            break
+        packets.append(packet)
+    result = sink.process(name, segment, start, packets)
+    rd.close()
+    return (name, segment, start, result)
+
+
+def decode_parallel(filenames, sink, format='bgr24', segment_size=300, workers=None):
+    tasks = []
+    for filename in filenames:
+        name = os.path.splitext(os.path.basename(filename))[0]
+        for segment, (start, stop) in enumerate(_get_decode_segments(filename, segment_size)):
+            tasks.append((filename, name, format, segment, start, stop, sink))
+
+    with mp.Pool(workers) as pool:
+        for name, segment, start, result in pool.imap(_decode_segment, tasks):
+            sink.collect(name, segment, start, result)
+
+    return len(tasks)
@@ -1,12 +1,34 @@
 
+import numpy as np
+import concurrent.futures
+import collections
 import weakref
 import struct
+import mmap
+import os
 import types
 import hl2ss
 import hl2ss_mx
 
 
-_MAGIC = 'HL2SSV23'
+_MAGIC = 'HL2SSV24'
+_MAGIC_V23 = 'HL2SSV23'
+_IOV_MAX = 1024
+
+
+#------------------------------------------------------------------------------
+# Index
+#------------------------------------------------------------------------------
+
+# HL2SSV24 files end with a footer index, one entry per packet, followed by a
+# trailer pointing at the first entry
+_INDEX_ENTRY = np.dtype([('frame_stamp', '<u8'), ('timestamp', '<u8'), ('offset', '<u8'), ('keyframe', 'u1')])
+_INDEX_TRAILER = '<QQ8s'
+_INDEX_MAGIC = b'HL2SSIDX'
+
+
+def _pack_index(entries, offset):
+    return np.array(entries, dtype=_INDEX_ENTRY).tobytes() + struct.pack(_INDEX_TRAILER, offset, len(entries), _INDEX_MAGIC)
 
 
 #------------------------------------------------------------------------------
@@ -17,14 +39,69 @@ class _writer:
     def open(self, filename):
         self._file = open(filename, 'wb')
         self._f = weakref.finalize(self, lambda f : f.close(), self._file)
+        self._offset = 0
+        self._frame_stamp = 0
+        self._sync_period = 1
+        self._index = []
+
+    def set_sync_period(self, sync_period):
+        self._sync_period = sync_period
 
     def put(self, data):
         self._file.write(data)
+        self._offset += len(data)
 
-    def write(self, packet):
-        self._file.write(hl2ss.pack_packet(packet))
+    def _add_index_entry(self, packet, size, frame_stamp):
+        if (frame_stamp is not None):
+            self._frame_stamp = frame_stamp
+        self._index.append((self._frame_stamp, packet.timestamp, self._offset, (self._frame_stamp % self._sync_period) == 0))
+        self._frame_stamp += 1
+        self._offset += size
+
+    def write(self, packet, frame_stamp=None):
+        data = hl2ss.pack_packet(packet)
+        self._file.write(data)
+        self._add_index_entry(packet, len(data), frame_stamp)
+
+    def write_many(self, packets, frame_stamp=None):
+        # Packets are written with a single gather write, payloads and poses
+        # are not copied
+        buffers = []
+        for packet in packets:
+            header = struct.pack('<QI', packet.timestamp, len(packet.payload))
+            buffers.append(header)
+            buffers.append(packet.payload)
+            size = len(header) + len(packet.payload)
+            if (packet.pose is not None):
+                buffers.append(packet.pose)
+                size += packet.pose.nbytes
+            self._add_index_entry(packet, size, frame_stamp)
+            frame_stamp = None
+        if (len(buffers) <= 0):
+            return 0
+        if (not hasattr(os, 'writev')):
+            return self._file.write(b''.join(buffers))
+        self._file.flush()
+        views = [memoryview(buffer).cast('B') for buffer in buffers]
+        fd = self._file.fileno()
+        index = 0
+        total = 0
+        while (index < len(views)):
+            count = os.writev(fd, views[index:(index + _IOV_MAX)])
+            total += count
+            while ((index < len(views)) and (count >= len(views[index]))):
+                count -= len(views[index])
+                index += 1
+            if (count > 0):
+                views[index] = views[index][count:]
+        return total
+
+    def sync(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
 
     def close(self):
+        self._file.write(_pack_index(self._index, self._offset))
         self._f.detach()
         self._file.close()
 
@@ -138,9 +215,16 @@ class _wr_rm_vlc(hl2ss._context_manager):
 
     def open(self):
         self._wr = _create_wr_rm_vlc(self.filename, self.port, self.mode, self.divisor, self.profile, self.level, self.bitrate, self.options, self.user)
+        self._wr.set_sync_period(hl2ss_mx.get_sync_period(self))
+
+    def write(self, packet, frame_stamp=None):
+        self._wr.write(packet, frame_stamp)
 
-    def write(self, packet):
-        self._wr.write(packet)
+    def write_many(self, packets, frame_stamp=None):
+        return self._wr.write_many(packets, frame_stamp)
+
+    def sync(self):
+        self._wr.sync()
 
     def close(self):
         self._wr.close()
@@ -161,9 +245,16 @@ class _wr_rm_depth_ahat(hl2ss._context_manager):
 
     def open(self):
         self._wr = _create_wr_rm_depth_ahat(self.filename, self.port, self.mode, self.divisor, self.profile_z, self.profile_ab, self.level, self.bitrate, self.options, self.user)
+        self._wr.set_sync_period(hl2ss_mx.get_sync_period(self))
+
+    def write(self, packet, frame_stamp=None):
+        self._wr.write(packet, frame_stamp)
 
-    def write(self, packet):
-        self._wr.write(packet)
+    def write_many(self, packets, frame_stamp=None):
+        return self._wr.write_many(packets, frame_stamp)
+
+    def sync(self):
+        self._wr.sync()
 
     def close(self):
         self._wr.close()
@@ -180,9 +271,16 @@ class _wr_rm_depth_longthrow(hl2ss._context_manager):
 
     def open(self):
         self._wr = _create_wr_rm_depth_longthrow(self.filename, self.port, self.mode, self.divisor, self.png_filter, self.user)
+        self._wr.set_sync_period(hl2ss_mx.get_sync_period(self))
+
+    def write(self, packet, frame_stamp=None):
+        self._wr.write(packet, frame_stamp)
 
-    def write(self, packet):
-        self._wr.write(packet)
+    def write_many(self, packets, frame_stamp=None):
+        return self._wr.write_many(packets, frame_stamp)
+
+    def sync(self):
+        self._wr.sync()
 
     def close(self):
         self._wr.close()
@@ -197,9 +295,16 @@ class _wr_rm_imu(hl2ss._context_manager):
 
     def open(self):
         self._wr = _create_wr_rm_imu(self.filename, self.port, self.mode, self.user)
+        self._wr.set_sync_period(hl2ss_mx.get_sync_period(self))
+
+    def write(self, packet, frame_stamp=None):
+        self._wr.write(packet, frame_stamp)
 
-    def write(self, packet):
-        self._wr.write(packet)
+    def write_many(self, packets, frame_stamp=None):
+        return self._wr.write_many(packets, frame_stamp)
+
+    def sync(self):
+        self._wr.sync()
 
     def close(self):
         self._wr.close()
@@ -222,9 +327,16 @@ class _wr_pv(hl2ss._context_manager):
 
     def open(self):
         self._wr = _create_wr_pv(self.filename, self.port, self.mode, self.width, self.height, self.framerate, self.divisor, self.profile, self.level, self.bitrate, self.options, self.user)
+        self._wr.set_sync_period(hl2ss_mx.get_sync_period(self))
+
+    def write(self, packet, frame_stamp=None):
+        self._wr.write(packet, frame_stamp)
+
+    def write_many(self, packets, frame_stamp=None):
+        return self._wr.write_many(packets, frame_stamp)
 
-    def write(self, packet):
-        self._wr.write(packet)
+    def sync(self):
+        self._wr.sync()
 
     def close(self):
         self._wr.close()
@@ -240,9 +352,16 @@ class _wr_microphone(hl2ss._context_manager):
     
     def open(self):
         self._wr = _create_wr_microphone(self.filename, self.port, self.profile, self.level, self.user)
+        self._wr.set_sync_period(hl2ss_mx.get_sync_period(self))
+
+    def write(self, packet, frame_stamp=None):
+        self._wr.write(packet, frame_stamp)
+
+    def write_many(self, packets, frame_stamp=None):
+        return self._wr.write_many(packets, frame_stamp)
 
-    def write(self, packet):
-        self._wr.write(packet)
+    def sync(self):
+        self._wr.sync()
 
     def close(self):
         self._wr.close()
@@ -256,9 +375,16 @@ class _wr_si(hl2ss._context_manager):
 
     def open(self):
         self._wr = _create_wr_si(self.filename, self.port, self.user)
+        self._wr.set_sync_period(hl2ss_mx.get_sync_period(self))
 
-    def write(self, packet):
-        self._wr.write(packet)
+    def write(self, packet, frame_stamp=None):
+        self._wr.write(packet, frame_stamp)
+
+    def write_many(self, packets, frame_stamp=None):
+        return self._wr.write_many(packets, frame_stamp)
+
+    def sync(self):
+        self._wr.sync()
 
     def close(self):
         self._wr.close()
@@ -273,9 +399,16 @@ class _wr_eet(hl2ss._context_manager):
 
     def open(self):
         self._wr = _create_wr_eet(self.filename, self.port, self.fps, self.user)
+        self._wr.set_sync_period(hl2ss_mx.get_sync_period(self))
+
+    def write(self, packet, frame_stamp=None):
+        self._wr.write(packet, frame_stamp)
+
+    def write_many(self, packets, frame_stamp=None):
+        return self._wr.write_many(packets, frame_stamp)
 
-    def write(self, packet):
-        self._wr.write(packet)
+    def sync(self):
+        self._wr.sync()
 
     def close(self):
         self._wr.close()
@@ -294,9 +427,16 @@ class _wr_extended_audio(hl2ss._context_manager):
 
     def open(self):
         self._wr = _create_wr_extended_audio(self.filename, self.port, self.mixer_mode, self.loopback_gain, self.microphone_gain, self.profile, self.level, self.user)
+        self._wr.set_sync_period(hl2ss_mx.get_sync_period(self))
 
-    def write(self, packet):
-        self._wr.write(packet)
+    def write(self, packet, frame_stamp=None):
+        self._wr.write(packet, frame_stamp)
+
+    def write_many(self, packets, frame_stamp=None):
+        return self._wr.write_many(packets, frame_stamp)
+
+    def sync(self):
+        self._wr.sync()
 
     def close(self):
         self._wr.close()
@@ -314,9 +454,16 @@ class _wr_extended_depth(hl2ss._context_manager):
 
     def open(self):
         self._wr = _create_wr_extended_depth(self.filename, self.port, self.mode, self.divisor, self.profile_z, self.options, self.user)
+        self._wr.set_sync_period(hl2ss_mx.get_sync_period(self))
+
+    def write(self, packet, frame_stamp=None):
+        self._wr.write(packet, frame_stamp)
+
+    def write_many(self, packets, frame_stamp=None):
+        return self._wr.write_many(packets, frame_stamp)
 
-    def write(self, packet):
-        self._wr.write(packet)
+    def sync(self):
+        self._wr.sync()
 
     def close(self):
         self._wr.close()
@@ -407,19 +554,29 @@ def create_wr_from_rx(filename, rx, user):
 
 class _reader:
     def __init__(self):
-        self._unpacker = hl2ss._unpacker()
+        self._unpacker = hl2ss._unpacker_arena()
 
     def open(self, filename, chunk_size):
         self._file = open(filename, 'rb')
         self._f = weakref.finalize(self, lambda f : f.close(), self._file)
         self._chunk_size = chunk_size
         self._eof = False
+        self._begin = None
+        self._end = None
+        self._position = None
+        self._index = None
+        self._index_offset = None
+        self._index_count = None
 
     def get(self, format):
         return struct.unpack(format, self._file.read(struct.calcsize(format)))
     
     def get_header(self):
-        return self.get(f'<{len(_MAGIC)}sH') + (self._file.read(self.get('<I')[0]),)
+        header = self.get(f'<{len(_MAGIC)}sH') + (self._file.read(self.get('<I')[0]),)
+        self._magic = header[0].decode()
+        if (self._magic not in (_MAGIC, _MAGIC_V23)):
+            raise Exception(f'Unsupported file format {self._magic}')
+        return header
     
     def get_configuration_for_mode(self):
         return self.get('<B')
@@ -502,21 +659,112 @@ class _reader:
         self._unpacker.reset(configuration[0])
         return configuration
     
+    def begin(self):
+        # Called after the configuration has been read, packets start here
+        self._begin = self._file.tell()
+        self._position = self._begin
+        if (self._magic != _MAGIC):
+            return
+        size = struct.calcsize(_INDEX_TRAILER)
+        end = self._file.seek(0, os.SEEK_END)
+        if ((end - self._begin) >= size):
+            self._file.seek(end - size)
+            offset, count, magic = self.get(_INDEX_TRAILER)
+            if ((magic == _INDEX_MAGIC) and ((offset + (count * _INDEX_ENTRY.itemsize) + size) == end)):
+                self._index_offset = offset
+                self._index_count = count
+                self._end = offset
+        self._file.seek(self._begin)
+
+    def _scan_index(self, sync_period):
+        # Unindexed files (HL2SSV23 or interrupted recordings) are indexed by
+        # walking the packet headers
+        pose_size = 64 if (self._unpacker._mode == hl2ss.StreamMode.MODE_1) else 0
+        header_size = struct.calcsize('<QI')
+        end = self._file.seek(0, os.SEEK_END)
+        offset = self._begin
+        entries = []
+        while ((offset + header_size) <= end):
+            self._file.seek(offset)
+            timestamp, size = self.get('<QI')
+            next_offset = offset + header_size + size + pose_size
+            if (next_offset > end):
+                break
+            entries.append((len(entries), timestamp, offset, (len(entries) % sync_period) == 0))
+            offset = next_offset
+        self._file.seek(self._position)
+        return np.array(entries, dtype=_INDEX_ENTRY), offset
+
+    def get_index(self, sync_period):
+        if (self._index is None):
+            if (self._index_offset is not None):
+                self._file.seek(self._index_offset)
+                self._index = np.frombuffer(self._file.read(self._index_count * _INDEX_ENTRY.itemsize), dtype=_INDEX_ENTRY)
+                self._file.seek(self._position)
+            else:
+                self._index, self._end = self._scan_index(sync_period)
+        return self._index
+    
+    def get_data_range(self):
+        return (self._begin, self._end)
+
+    def seek(self, offset):
+        self._position = self._file.seek(offset)
+        self._eof = (self._end is not None) and (self._position >= self._end)
+        self._unpacker.reset(self._unpacker._mode)
+
     def get_next_packet(self):
         while (True):
             if (self._unpacker.unpack()):
                 return self._unpacker.get()
             if (self._eof):
                 return None
-            chunk = self._file.read(self._chunk_size)
-            self._eof = len(chunk) < self._chunk_size
-            self._unpacker.extend(chunk)
+            buffer = self._unpacker.reserve(self._chunk_size if (self._end is None) else min(self._chunk_size, self._end - self._position))
+            count = self._file.readinto(buffer)
+            self._position += count
+            self._eof = (count < len(buffer)) or ((self._end is not None) and (self._position >= self._end))
+            self._unpacker.commit(count)
 
     def close(self):
         self._f.detach()
         self._file.close()
 
 
+#------------------------------------------------------------------------------
+# Memory Mapped File Reader
+#------------------------------------------------------------------------------
+
+class _reader_mmap(_reader):
+    # Packets are views into the mapping, no data is copied until decoding
+    def open(self, filename):
+        super().open(filename, None)
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+
+    def seek(self, offset):
+        self._position = offset
+
+    def get_next_packet(self):
+        end = len(self._map) if (self._end is None) else self._end
+        if ((self._position + 12) > end):
+            return None
+        size = 12 + struct.unpack_from('<I', self._map, self._position + 8)[0] + (64 if (self._unpacker._mode == hl2ss.StreamMode.MODE_1) else 0)
+        if ((self._position + size) > end):
+            return None
+        packet = hl2ss.unpack_packet(self._view[self._position:(self._position + size)])
+        self._position += size
+        return packet
+
+    def close(self):
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # Packets still reference the mapping, it is released with them
+            pass
+        super().close()
+
+
 #------------------------------------------------------------------------------
 # Mode 0 and Mode 1 Data Load
 #------------------------------------------------------------------------------
@@ -527,6 +775,12 @@ def _create_rd(filename, chunk):
     return rd
 
 
+def _create_rd_mmap(filename):
+    rd = _reader_mmap()
+    rd.open(filename)
+    return rd
+
+
 #------------------------------------------------------------------------------
 # Reader Wrapper
 #------------------------------------------------------------------------------
@@ -590,14 +844,38 @@ class _rd(hl2ss._context_manager):
         self.chunk = chunk
 
     def open(self):
-        self._rd = _create_rd(self.filename, self.chunk)
+        self._rd = _create_rd(self.filename, self.chunk) if (self.chunk is not None) else _create_rd_mmap(self.filename)
         self.magic, self.port, self.user = self._rd.get_header()
         self.__build()
         self.__load()
+        self._rd.begin()
         
     def get_next_packet(self):
         return self._rd.get_next_packet()
 
+    def get_index(self):
+        return self._rd.get_index(hl2ss_mx.get_sync_period(self))
+
+    def __len__(self):
+        return len(self.get_index())
+
+    def seek_frame(self, index):
+        entries = self.get_index()
+        if (index < 0):
+            index += len(entries)
+        if ((index < 0) or (index >= len(entries))):
+            raise IndexError('frame index out of range')
+        keyframes = np.flatnonzero(entries['keyframe'][:(index + 1)])
+        start = keyframes[-1] if (len(keyframes) > 0) else 0
+        self._rd.seek(int(entries['offset'][start]))
+        return int(start)
+
+    def seek(self, timestamp, time_preference=hl2ss_mx.TimePreference.PREFER_NEAREST, tiebreak_right=False):
+        entries = self.get_index()
+        if (len(entries) <= 0):
+            return None
+        return self.seek_frame(int(hl2ss_mx.get_nearest_indices(entries['timestamp'], [timestamp], time_preference, tiebreak_right)[0]))
+
     def close(self):
         self._rd.close()
 
@@ -614,7 +892,7 @@ class _rd_decoded(_rd):
         self._codec = hl2ss.decode_rm_depth_ahat(self.profile_z, self.profile_ab)
 
     def __set_codec_rm_depth_longthrow(self):
-        self._codec = hl2ss.decode_rm_depth_longthrow(self.png_filter)
+        self._codec = hl2ss.decode_rm_depth_longthrow(self.png_filter, self._executor, max(self.workers - 1, 0))
 
     def __set_codec_rm_imu(self):
         self._codec = hl2ss.decode_rm_imu()
@@ -691,31 +969,159 @@ class _rd_decoded(_rd):
         self.__set_codec = types.MethodType(f[0], self)
         self.__decode    = types.MethodType(f[1], self)
 
-    def __init__(self, filename, chunk, format):
+    def __init__(self, filename, chunk, format, workers=0):
         super().__init__(filename, chunk)
         self.format = format
+        self.workers = workers
 
     def open(self):
         super().open()
+        self._executor = concurrent.futures.ThreadPoolExecutor(self.workers) if (self.workers > 0) else None
+        self._pending = collections.deque()
+        self._flushed = False
         self.__build()
         self.__set_codec()
         
     def get_next_packet(self):
-        data = super().get_next_packet()
-        if (data is not None):
-            data.payload = self.__decode(data.payload)
-        return data
+        # Decoders running on a pool return frames late, packets are held
+        # until their frame is ready and the remaining ones are flushed at
+        # the end of the file
+        # Packets that produce no frame (e.g., P-frames before the first
+        # keyframe after a seek) are discarded, for H26x decoders this is known
+        # from the dropped count when the next frame is returned
+        while (True):
+            data = super().get_next_packet()
+            if (data is None):
+                if (not self._flushed):
+                    self._flushed = True
+                    frames = self._codec.flush() if (hasattr(self._codec, 'flush')) else []
+                    ready = collections.deque()
+                    for pending, payload in zip(self._pending, frames):
+                        pending.payload = payload
+                        ready.append(pending)
+                    self._pending = ready
+                return self._pending.popleft() if (len(self._pending) > 0) else None
+            self._pending.append(data)
+            payload = self.__decode(data.payload)
+            if (payload is None):
+                if (not (hasattr(self._codec, 'get_dropped') or hasattr(self._codec, 'flush'))):
+                    self._pending.pop()
+                continue
+            for _ in range(0, self._codec.get_dropped() if (hasattr(self._codec, 'get_dropped')) else 0):
+                self._pending.popleft()
+            data = self._pending.popleft()
+            data.payload = payload
+            return data
+
+    def seek_frame(self, index):
+        index = super().seek_frame(index)
+        self._pending.clear()
+        self._flushed = False
+        self.__set_codec()
+        return index
 
     def close(self):
         super().close()
+        if (self._executor is not None):
+            self._executor.shutdown()
 
 
 #------------------------------------------------------------------------------
 # Create Reader
 #------------------------------------------------------------------------------
 
-def create_rd(filename, chunk, decoded):
-    return _rd_decoded(filename, chunk, decoded) if (decoded) else _rd(filename, chunk)
+def create_rd(filename, chunk, decoded, workers=0):
+    return _rd_decoded(filename, chunk, decoded, workers) if (decoded) else _rd(filename, chunk)
+
+
+def create_rd_mmap(filename, decoded, workers=0):
+    return create_rd(filename, None, decoded, workers)
+
+
+#------------------------------------------------------------------------------
+# Structured Load
+#------------------------------------------------------------------------------
+
+class _structured_recording:
+    def __init__(self, port, timestamp, pose, data, batch):
+        self.port      = port
+        self.timestamp = timestamp
+        self.pose      = pose
+        self.data      = data
+        self.batch     = batch
+
+
+def _get_structured_decoder(port):
+    if (port == hl2ss.StreamPort.SPATIAL_INPUT):
+        return hl2ss.decode_si()
+    if (port == hl2ss.StreamPort.EXTENDED_EYE_TRACKER):
+        return hl2ss.decode_eet()
+    if ((port == hl2ss.StreamPort.RM_IMU_ACCELEROMETER) or (port == hl2ss.StreamPort.RM_IMU_GYROSCOPE) or (port == hl2ss.StreamPort.RM_IMU_MAGNETOMETER)):
+        return hl2ss.decode_rm_imu()
+    raise Exception(f'Unsupported port {port}')
+
+
+def load_structured(filename):
+    # Loads a SI, EET or RM IMU recording into one record array, data[i] is
+    # the payload of packet i except for RM IMU where data holds all samples
+    # and batch[j] is the packet of sample j
+    rd = create_rd_mmap(filename, False)
+    rd.open()
+    port    = rd.port
+    decoder = _get_structured_decoder(port)
+
+    timestamps = []
+    payloads   = []
+    poses      = []
+
+    while (True):
+        data = rd.get_next_packet()
+        if (data is None):
+            break
+        timestamps.append(data.timestamp)
+        payloads.append(data.payload)
+        if (data.pose is not None):
+            poses.append(data.pose)
+
+    timestamp = np.array(timestamps, dtype=np.uint64)
+    pose      = np.array(poses, dtype=np.float32) if (len(poses) > 0) else None
+
+    if (isinstance(decoder, hl2ss.decode_rm_imu)):
+        data, batch = decoder.decode_array(payloads)
+    else:
+        data  = decoder.decode_array(payloads)
+        batch = None
+
+    payloads = None
+    rd.close()
+
+    return _structured_recording(port, timestamp, pose, data, batch)
+
+
+#------------------------------------------------------------------------------
+# Index Existing Files
+#------------------------------------------------------------------------------
+
+def create_index(input_filename, output_filename, chunk=hl2ss.ChunkSize.SINGLE_TRANSFER):
+    rd = _rd(input_filename, chunk)
+    rd.open()
+    index = rd.get_index()
+    begin, end = rd._rd.get_data_range()
+    rd.close()
+
+    with open(input_filename, 'rb') as input_file, open(output_filename, 'wb') as output_file:
+        input_file.seek(len(_MAGIC))
+        output_file.write(_MAGIC.encode())
+        size = end - len(_MAGIC)
+        while (size > 0):
+            data = input_file.read(min(chunk, size))
+            if (len(data) <= 0):
+                break
+            output_file.write(data)
+            size -= len(data)
+        output_file.write(_pack_index(index, end))
+
+    return len(index)
 
 
 #------------------------------------------------------------------------------
@@ -735,6 +1141,12 @@ class sequencer(hl2ss._context_manager):
         self._l = self._r
         self._r = self.rd.get_next_packet()
 
+    def seek(self, timestamp, time_preference=hl2ss_mx.TimePreference.PREFER_PAST, tiebreak_right=False):
+        index = self.rd.seek(timestamp, time_preference, tiebreak_right)
+        self._l = self.rd.get_next_packet()
+        self._r = self.rd.get_next_packet()
+        return index
+
     def get_left(self):
         return self._l
 
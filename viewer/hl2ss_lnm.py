@@ -65,7 +65,7 @@ def stop_subsystem_pv(host, port, sockopt=None):
 # Modes 0, 1
 #------------------------------------------------------------------------------
 
-def rx_rm_vlc(host, port, sockopt=None, chunk=hl2ss.ChunkSize.RM_VLC, mode=hl2ss.StreamMode.MODE_1, divisor=1, profile=hl2ss.VideoProfile.H265_MAIN, level=hl2ss.H26xLevel.DEFAULT, bitrate=None, options=None, decoded=True):
+def rx_rm_vlc(host, port, sockopt=None, chunk=hl2ss.ChunkSize.RM_VLC, mode=hl2ss.StreamMode.MODE_1, divisor=1, profile=hl2ss.VideoProfile.H265_MAIN, level=hl2ss.H26xLevel.DEFAULT, bitrate=None, options=None, decoded=True, thread_type=None, thread_count=0, latency=0, skip_frame=None, keyframe_only=False, downscale=1):
     if (sockopt is None):
         sockopt = create_sockopt()
 
@@ -79,10 +79,10 @@ def rx_rm_vlc(host, port, sockopt=None, chunk=hl2ss.ChunkSize.RM_VLC, mode=hl2ss
     else:
         options[hl2ss.H26xEncoderProperty.CODECAPI_AVEncMPVGOPSize] = options.get(hl2ss.H26xEncoderProperty.CODECAPI_AVEncMPVGOPSize, get_video_codec_default_gop_size(hl2ss.Parameters_RM_VLC.FPS, divisor, profile))
     
-    return hl2ss.rx_decoded_rm_vlc(host, port, sockopt, chunk, mode, divisor, profile, level, bitrate, options) if (decoded) else hl2ss.rx_rm_vlc(host, port, sockopt, chunk, mode, divisor, profile, level, bitrate, options)
+    return hl2ss.rx_decoded_rm_vlc(host, port, sockopt, chunk, mode, divisor, profile, level, bitrate, options, thread_type, thread_count, latency, skip_frame, keyframe_only, downscale) if (decoded) else hl2ss.rx_rm_vlc(host, port, sockopt, chunk, mode, divisor, profile, level, bitrate, options)
 
 
-def rx_rm_depth_ahat(host, port, sockopt=None, chunk=hl2ss.ChunkSize.RM_DEPTH_AHAT, mode=hl2ss.StreamMode.MODE_1, divisor=1, profile_z=hl2ss.DepthProfile.SAME, profile_ab=hl2ss.VideoProfile.H265_MAIN, level=hl2ss.H26xLevel.DEFAULT, bitrate=None, options=None, decoded=True):
+def rx_rm_depth_ahat(host, port, sockopt=None, chunk=hl2ss.ChunkSize.RM_DEPTH_AHAT, mode=hl2ss.StreamMode.MODE_1, divisor=1, profile_z=hl2ss.DepthProfile.SAME, profile_ab=hl2ss.VideoProfile.H265_MAIN, level=hl2ss.H26xLevel.DEFAULT, bitrate=None, options=None, decoded=True, skip_frame=None, keyframe_only=False):
     if (sockopt is None):
         sockopt = create_sockopt()
 
@@ -94,14 +94,14 @@ def rx_rm_depth_ahat(host, port, sockopt=None, chunk=hl2ss.ChunkSize.RM_DEPTH_AH
     else:
         options[hl2ss.H26xEncoderProperty.CODECAPI_AVEncMPVGOPSize] = options.get(hl2ss.H26xEncoderProperty.CODECAPI_AVEncMPVGOPSize, get_video_codec_default_gop_size(hl2ss.Parameters_RM_DEPTH_AHAT.FPS, divisor, profile_ab))
     
-    return hl2ss.rx_decoded_rm_depth_ahat(host, port, sockopt, chunk, mode, divisor, profile_z, profile_ab, level, bitrate, options) if (decoded) else hl2ss.rx_rm_depth_ahat(host, port, sockopt, chunk, mode, divisor, profile_z, profile_ab, level, bitrate, options)
+    return hl2ss.rx_decoded_rm_depth_ahat(host, port, sockopt, chunk, mode, divisor, profile_z, profile_ab, level, bitrate, options, skip_frame, keyframe_only) if (decoded) else hl2ss.rx_rm_depth_ahat(host, port, sockopt, chunk, mode, divisor, profile_z, profile_ab, level, bitrate, options)
 
 
-def rx_rm_depth_longthrow(host, port, sockopt=None, chunk=hl2ss.ChunkSize.RM_DEPTH_LONGTHROW, mode=hl2ss.StreamMode.MODE_1, divisor=1, png_filter=hl2ss.PNGFilterMode.PAETH, decoded=True):
+def rx_rm_depth_longthrow(host, port, sockopt=None, chunk=hl2ss.ChunkSize.RM_DEPTH_LONGTHROW, mode=hl2ss.StreamMode.MODE_1, divisor=1, png_filter=hl2ss.PNGFilterMode.PAETH, decoded=True, workers=0):
     if (sockopt is None):
         sockopt = create_sockopt()
 
-    return hl2ss.rx_decoded_rm_depth_longthrow(host, port, sockopt, chunk, mode, divisor, png_filter) if (decoded) else hl2ss.rx_rm_depth_longthrow(host, port, sockopt, chunk, mode, divisor, png_filter)
+    return hl2ss.rx_decoded_rm_depth_longthrow(host, port, sockopt, chunk, mode, divisor, png_filter, workers) if (decoded) else hl2ss.rx_rm_depth_longthrow(host, port, sockopt, chunk, mode, divisor, png_filter)
 
 
 def rx_rm_imu(host, port, sockopt=None, chunk=hl2ss.ChunkSize.RM_IMU, mode=hl2ss.StreamMode.MODE_1, decoded=True):
@@ -111,7 +111,7 @@ def rx_rm_imu(host, port, sockopt=None, chunk=hl2ss.ChunkSize.RM_IMU, mode=hl2ss
     return hl2ss.rx_decoded_rm_imu(host, port, sockopt, chunk, mode) if (decoded) else hl2ss.rx_rm_imu(host, port, sockopt, chunk, mode)
 
 
-def rx_pv(host, port, sockopt=None, chunk=hl2ss.ChunkSize.PERSONAL_VIDEO, mode=hl2ss.StreamMode.MODE_1, width=1920, height=1080, framerate=30, divisor=1, profile=hl2ss.VideoProfile.H265_MAIN, level=hl2ss.H26xLevel.DEFAULT, bitrate=None, options=None, decoded_format='bgr24'):
+def rx_pv(host, port, sockopt=None, chunk=hl2ss.ChunkSize.PERSONAL_VIDEO, mode=hl2ss.StreamMode.MODE_1, width=1920, height=1080, framerate=30, divisor=1, profile=hl2ss.VideoProfile.H265_MAIN, level=hl2ss.H26xLevel.DEFAULT, bitrate=None, options=None, decoded_format='bgr24', thread_type=None, thread_count=0, latency=0, pool=None, skip_frame=None, keyframe_only=False, downscale=1):
     if (sockopt is None):
         sockopt = create_sockopt()
     
@@ -123,7 +123,7 @@ def rx_pv(host, port, sockopt=None, chunk=hl2ss.ChunkSize.PERSONAL_VIDEO, mode=h
     else:
         options[hl2ss.H26xEncoderProperty.CODECAPI_AVEncMPVGOPSize] = options.get(hl2ss.H26xEncoderProperty.CODECAPI_AVEncMPVGOPSize, get_video_codec_default_gop_size(framerate, divisor, profile))
     
-    return hl2ss.rx_decoded_pv(host, port, sockopt, chunk, mode, width, height, framerate, divisor, profile, level, bitrate, options, decoded_format) if (decoded_format) else hl2ss.rx_pv(host, port, sockopt, chunk, mode, width, height, framerate, divisor, profile, level, bitrate, options)
+    return hl2ss.rx_decoded_pv(host, port, sockopt, chunk, mode, width, height, framerate, divisor, profile, level, bitrate, options, decoded_format, thread_type, thread_count, latency, pool, skip_frame, keyframe_only, downscale) if (decoded_format) else hl2ss.rx_pv(host, port, sockopt, chunk, mode, width, height, framerate, divisor, profile, level, bitrate, options)
 
 
 def rx_microphone(host, port, sockopt=None, chunk=hl2ss.ChunkSize.MICROPHONE, profile=hl2ss.AudioProfile.AAC_24000, level=hl2ss.AACLevel.L2, decoded=True):
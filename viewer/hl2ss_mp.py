@@ -1,11 +1,241 @@
 
+from multiprocessing import shared_memory
 import multiprocessing as mp
 import threading as mt
+import numpy as np
 import queue
+import pickle
+import struct
 import traceback
+import mmap
+import os
 import hl2ss
 import hl2ss_mx
 
+try:
+    import _posixshmem
+except ImportError:
+    _posixshmem = None
+
+
+#------------------------------------------------------------------------------
+# Shared Memory
+#------------------------------------------------------------------------------
+
+# Packets are moved between processes through a ring of fixed size slots in
+# shared memory, only a small descriptor goes through the queues
+# Slot layout: header, buffer sizes, pickle stream of the payload, out of band
+# buffers of the payload (numpy array data, raw payload bytes)
+# The writer invalidates the sequence number of a slot before writing it and
+# readers check it again after copying the slot out, packets overwritten
+# before or while they are read are reported as discarded
+# Sinks return copies by default, with zero_copy the payload is a view into
+# the slot and remains valid only until the slot is reused, that is, while the
+# packet is still in the buffer of the interconnect
+class _SHM:
+    ALIGNMENT = 64
+    HEADER = struct.Struct('<qQIII64s')
+    SEQUENCE = struct.Struct('<q')
+    BUFFER = struct.Struct('<Q')
+    SLACK = 32
+    INVALID = -1
+
+
+def _shm_align(size):
+    return (size + _SHM.ALIGNMENT - 1) & ~(_SHM.ALIGNMENT - 1)
+
+
+class _shm_mapping(shared_memory.SharedMemory):
+    def release(self):
+        # Payloads handed out by zero copy sinks may still reference the
+        # mapping, it is then closed when the last of them is collected
+        try:
+            self.close()
+        except BufferError:
+            pass
+
+    def __del__(self):
+        self.release()
+
+
+class _shm_untracked(_shm_mapping):
+    # Before Python 3.13 every attach registers the segment with the resource
+    # tracker, which is shared by all the processes of a program, so the
+    # writer that creates and unlinks a segment would lose its registration
+    # as soon as a reader unregisters or be left with a stale one if a
+    # reader attaches while it unlinks
+    # Only the writer is tracked, readers map the segment like attaching with
+    # track=False
+    def __init__(self, name):
+        self._name = ('/' + name) if (self._prepend_leading_slash) else name
+        self._flags = os.O_RDWR
+        self._fd = _posixshmem.shm_open(self._name, self._flags, mode=self._mode)
+        try:
+            self._size = os.fstat(self._fd).st_size
+            self._mmap = mmap.mmap(self._fd, self._size)
+        except OSError:
+            os.close(self._fd)
+            self._fd = -1
+            raise
+        self._buf = memoryview(self._mmap)
+
+
+def _shm_attach(name):
+    try:
+        return _shm_mapping(name=name, track=False)
+    except TypeError:
+        pass
+    # Windows segments are not tracked
+    return _shm_untracked(name) if (_posixshmem is not None) else _shm_mapping(name=name)
+
+
+class _shm_packet:
+    def __init__(self, timestamp, name, generation, live, slot, slot_size, sequence):
+        self.timestamp = timestamp
+        self.name = name
+        self.generation = generation
+        self.live = live
+        self.slot = slot
+        self.slot_size = slot_size
+        self.sequence = sequence
+
+
+class _shm_writer:
+    def __init__(self, slots):
+        self._slots = slots
+        self._shm = None
+        self._slot_size = 0
+        self._generation = -1
+        self._retired = []
+        self._sequence = 0
+        self._enable = True
+
+    def _create(self, size):
+        if (self._shm is not None):
+            self._retired.append((self._sequence, self._generation, self._shm))
+        self._slot_size = max(_shm_align(size), 2 * self._slot_size)
+        self._shm = shared_memory.SharedMemory(create=True, size=self._slots * self._slot_size)
+        self._generation += 1
+
+    def _release(self, force):
+        while ((len(self._retired) > 0) and (force or ((self._sequence - self._retired[0][0]) > self._slots))):
+            _, _, shm = self._retired.pop(0)
+            shm.close()
+            shm.unlink()
+
+    def _get_live(self):
+        # Oldest ring not yet unlinked
+        return self._retired[0][1] if (len(self._retired) > 0) else self._generation
+
+    def write(self, packet):
+        if (not self._enable):
+            return packet
+
+        buffers = []
+        stream = pickle.dumps(pickle.PickleBuffer(packet.payload) if (isinstance(packet.payload, memoryview)) else packet.payload, protocol=5, buffer_callback=buffers.append)
+        views = [buffer.raw() for buffer in buffers]
+        base = _shm_align(_SHM.HEADER.size + _SHM.BUFFER.size * len(views) + len(stream))
+        size = base + sum([_shm_align(len(view)) for view in views])
+
+        if (size > self._slot_size):
+            try:
+                self._create(size)
+            except:
+                self._enable = False
+                return packet
+
+        slot = self._sequence % self._slots
+        offset = slot * self._slot_size
+        pose = packet.pose.tobytes() if (packet.pose is not None) else bytes(64)
+
+        _SHM.HEADER.pack_into(self._shm.buf, offset, _SHM.INVALID, packet.timestamp, 1 if (packet.pose is not None) else 0, len(stream), len(views), pose)
+        position = offset + _SHM.HEADER.size
+        for view in views:
+            _SHM.BUFFER.pack_into(self._shm.buf, position, len(view))
+            position += _SHM.BUFFER.size
+        self._shm.buf[position:(position + len(stream))] = stream
+        position = offset + base
+        for view in views:
+            self._shm.buf[position:(position + len(view))] = view
+            position += _shm_align(len(view))
+        _SHM.SEQUENCE.pack_into(self._shm.buf, offset, self._sequence)
+
+        sequence = self._sequence
+        self._sequence += 1
+        self._release(False)
+        return _shm_packet(packet.timestamp, self._shm.name, self._generation, self._get_live(), slot, self._slot_size, sequence)
+
+    def close(self):
+        if (self._shm is not None):
+            self._retired.append((self._sequence, self._generation, self._shm))
+            self._shm = None
+        self._release(True)
+
+
+class _shm_reader:
+    def __init__(self, zero_copy=False):
+        self._zero_copy = zero_copy
+        self._rings = dict()
+
+    def __getstate__(self):
+        return {'_zero_copy' : self._zero_copy}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._rings = dict()
+
+    def _attach(self, descriptor):
+        # Drop mappings of rings the writer has unlinked
+        for name in [name for name, (generation, _) in self._rings.items() if (generation < descriptor.live)]:
+            self._rings.pop(name)[1].release()
+        ring = self._rings.get(descriptor.name, None)
+        if (ring is None):
+            try:
+                ring = (descriptor.generation, _shm_attach(descriptor.name))
+            except FileNotFoundError:
+                return None
+            self._rings[descriptor.name] = ring
+        return ring[1]
+
+    def read(self, descriptor):
+        if (not isinstance(descriptor, _shm_packet)):
+            return descriptor
+
+        shm = self._attach(descriptor)
+        if (shm is None):
+            return None
+
+        offset = descriptor.slot * descriptor.slot_size
+        sequence, timestamp, pose_valid, stream_size, count, _ = _SHM.HEADER.unpack_from(shm.buf, offset)
+        if (sequence != descriptor.sequence):
+            return None
+
+        position = offset + _SHM.HEADER.size
+        sizes = []
+        for _ in range(0, count):
+            sizes.append(_SHM.BUFFER.unpack_from(shm.buf, position)[0])
+            position += _SHM.BUFFER.size
+        stream = bytes(shm.buf[position:(position + stream_size)])
+        position = offset + _shm_align(_SHM.HEADER.size + _SHM.BUFFER.size * count + stream_size)
+        buffers = []
+        for size in sizes:
+            buffer = shm.buf[position:(position + size)]
+            buffers.append(buffer if (self._zero_copy) else bytearray(buffer))
+            position += _shm_align(size)
+        pose = np.frombuffer(shm.buf, dtype=np.float32, count=16, offset=offset + _SHM.HEADER.size - 64).reshape((4, 4)) if (pose_valid) else None
+        if ((pose is not None) and (not self._zero_copy)):
+            pose = pose.copy()
+
+        if (_SHM.SEQUENCE.unpack_from(shm.buf, offset)[0] != descriptor.sequence):
+            return None
+
+        return hl2ss._packet(timestamp, pickle.loads(stream, buffers=buffers), pose)
+
+    def close(self):
+        for _, shm in self._rings.values():
+            shm.release()
+        self._rings.clear()
+
 
 #------------------------------------------------------------------------------
 # Source
@@ -17,8 +247,9 @@ class _net_source:
 
 
 class _source:
-    def __init__(self, receiver, event_stop, source_wires, interconnect_wires):
+    def __init__(self, receiver, slots, event_stop, source_wires, interconnect_wires):
         self._source = receiver
+        self._slots = slots
         self._event_stop = event_stop
         self._source_wires = source_wires
         self._interconnect_wires = interconnect_wires
@@ -27,22 +258,24 @@ class _source:
         self._event_stop.set()
 
     def run(self):
+        writer = _shm_writer(self._slots)
         try:
             with self._source as client:
                 while (not self._event_stop.is_set()):
-                    self._source_wires.dout.put(client.get_next_packet())
+                    self._source_wires.dout.put(writer.write(client.get_next_packet()))
                     self._interconnect_wires.semaphore.release()
         except:
             self._source_wires.dout.put(hl2ss._packet(None, traceback.format_exc(), None))
             self._interconnect_wires.semaphore.release()
             self._event_stop.wait()
         self._source_wires.dout.put(None)
+        writer.close()
 
 
 class _mp_source(mp.Process):
-    def __init__(self, receiver, event_stop, source_wires, interconnect_wires):
+    def __init__(self, receiver, slots, event_stop, source_wires, interconnect_wires):
         super().__init__()
-        self._source = _source(receiver, event_stop, source_wires, interconnect_wires)
+        self._source = _source(receiver, slots, event_stop, source_wires, interconnect_wires)
 
     def stop(self):
         self._source.stop()
@@ -52,9 +285,9 @@ class _mp_source(mp.Process):
 
 
 class _mt_source(mt.Thread):
-    def __init__(self, receiver, event_stop, source_wires, interconnect_wires):
+    def __init__(self, receiver, slots, event_stop, source_wires, interconnect_wires):
         super().__init__()
-        self._source = _source(receiver, event_stop, source_wires, interconnect_wires)
+        self._source = _source(receiver, slots, event_stop, source_wires, interconnect_wires)
 
     def stop(self):
         self._source.stop()
@@ -67,8 +300,9 @@ def _create_interface_source(source_kind):
     return _net_source(mp.Queue() if (source_kind == hl2ss_mx.SourceKind.MP) else queue.Queue() if (source_kind == hl2ss_mx.SourceKind.MT) else None)
 
 
-def _create_source(receiver, source_wires, interconnect_wires, source_kind):
-    return _mp_source(receiver, mp.Event(), source_wires, interconnect_wires) if (source_kind == hl2ss_mx.SourceKind.MP) else _mt_source(receiver, mt.Event(), source_wires, interconnect_wires) if (source_kind == hl2ss_mx.SourceKind.MT) else None
+def _create_source(receiver, buffer_size, source_wires, interconnect_wires, source_kind):
+    slots = buffer_size + _SHM.SLACK
+    return _mp_source(receiver, slots, mp.Event(), source_wires, interconnect_wires) if (source_kind == hl2ss_mx.SourceKind.MP) else _mt_source(receiver, slots, mt.Event(), source_wires, interconnect_wires) if (source_kind == hl2ss_mx.SourceKind.MT) else None
 
 
 #------------------------------------------------------------------------------
@@ -90,6 +324,8 @@ class _interconnect(mp.Process):
     IPC_SINK_GET_NEAREST = 1
     IPC_SINK_GET_BUFFERED_FRAME = 2
     IPC_SINK_GET_SOURCE_STRING = 3
+    IPC_SINK_GET_NEAREST_MANY = 4
+    IPC_SINK_GET_BUFFERED_FRAMES = 5
     
     def __init__(self, receiver, buffer_size, event_stop, source_kind, interconnect_wires, sink_wires):
         super().__init__()
@@ -122,16 +358,29 @@ class _interconnect(mp.Process):
         return None
 
     def _get_nearest(self, timestamp, time_preference, tiebreak_right, select_data):
-        buffer = self._buffer.get()
-        index = hl2ss_mx.get_nearest_packet(buffer, timestamp, time_preference, tiebreak_right)
-        return (-1, None) if (index is None) else (self._frame_stamp - self._buffer.length() + 1 + index, buffer[index] if (select_data) else None)
+        index = self._buffer.get_nearest(timestamp, time_preference, tiebreak_right)
+        return (-1, None) if (index is None) else (self._frame_stamp - self._buffer.length() + 1 + index, self._buffer.get_item(index) if (select_data) else None)
 
     def _get_buffered_frame(self, frame_stamp, select_data):
         if (frame_stamp < 0):
             frame_stamp = self._frame_stamp + frame_stamp + 1
         n = self._buffer.length()
         index = n - 1 - self._frame_stamp + frame_stamp
-        return (hl2ss_mx.Status.DISCARDED, frame_stamp, None) if (index < 0) else (hl2ss_mx.Status.WAIT, frame_stamp, None) if (index >= n) else (hl2ss_mx.Status.OK, frame_stamp, self._buffer.get()[index] if (select_data) else None)
+        return (hl2ss_mx.Status.DISCARDED, frame_stamp, None) if (index < 0) else (hl2ss_mx.Status.WAIT, frame_stamp, None) if (index >= n) else (hl2ss_mx.Status.OK, frame_stamp, self._buffer.get_item(index) if (select_data) else None)
+
+    def _get_nearest_many(self, timestamps, time_preference, tiebreak_right, select_data):
+        indices = self._buffer.get_nearest_many(timestamps, time_preference, tiebreak_right)
+        if (self._buffer.length() <= 0):
+            return (indices, None)
+        return (self._frame_stamp - self._buffer.length() + 1 + indices, self._buffer.get_items(indices) if (select_data) else None)
+
+    def _get_buffered_frames(self, frame_stamps, select_data):
+        n = self._buffer.length()
+        frame_stamps = np.array(frame_stamps, dtype=np.int64)
+        frame_stamps = np.where(frame_stamps < 0, self._frame_stamp + frame_stamps + 1, frame_stamps)
+        indices = n - 1 - self._frame_stamp + frame_stamps
+        states = np.where(indices < 0, hl2ss_mx.Status.DISCARDED, np.where(indices >= n, hl2ss_mx.Status.WAIT, hl2ss_mx.Status.OK))
+        return (states, frame_stamps, [self._buffer.get_item(int(index)) if (state == hl2ss_mx.Status.OK) else None for state, index in zip(states, indices)] if (select_data) else None)
 
     def _get_source_status(self):
         return self._source_status
@@ -181,6 +430,10 @@ class _interconnect(mp.Process):
             sink_wires.din.put(self._get_buffered_frame(*message[1:]))
         elif (message[0] == _interconnect.IPC_SINK_GET_SOURCE_STRING):
             sink_wires.din.put(self._get_source_string())
+        elif (message[0] == _interconnect.IPC_SINK_GET_NEAREST_MANY):
+            sink_wires.din.put(self._get_nearest_many(*message[1:]))
+        elif (message[0] == _interconnect.IPC_SINK_GET_BUFFERED_FRAMES):
+            sink_wires.din.put(self._get_buffered_frames(*message[1:]))
         self._interconnect_wires.semaphore.acquire()
 
     def _process_sink(self):
@@ -199,10 +452,10 @@ class _interconnect(mp.Process):
         self._source_string = None
 
         self._source_wires = _create_interface_source(self._source_kind)
-        self._source = _create_source(self._receiver, self._source_wires, self._interconnect_wires, self._source_kind)
+        self._source = _create_source(self._receiver, self._buffer_size, self._source_wires, self._interconnect_wires, self._source_kind)
         self._source.start()
 
-        self._buffer = hl2ss_mx.RingBuffer(self._buffer_size)
+        self._buffer = hl2ss_mx.TimestampRingBuffer(self._buffer_size)
         self._frame_stamp = -1
         
         self._sink = dict()
@@ -242,9 +495,15 @@ class _net_sink:
 
 
 class _sink:
-    def __init__(self, sink_wires, interconnect_wires):
+    def __init__(self, sink_wires, interconnect_wires, zero_copy=False):
         self._sink_wires = sink_wires
         self._interconnect_wires = interconnect_wires
+        self._reader = _shm_reader(zero_copy)
+
+    def _read(self, state, data):
+        # Packets overwritten in shared memory before they were read
+        packet = self._reader.read(data)
+        return (hl2ss_mx.Status.DISCARDED if ((data is not None) and (packet is None)) else state, packet)
 
     def acquire(self, block=True):
         return self._sink_wires.semaphore.acquire(block)
@@ -260,12 +519,14 @@ class _sink:
         self._sink_wires.dout.put((_interconnect.IPC_SINK_DETACH, self._key))
         self._interconnect_wires.semaphore.release()
         self._sink_wires.din.get()
+        self._reader.close()
 
     def get_nearest(self, timestamp, time_preference=hl2ss_mx.TimePreference.PREFER_NEAREST, tiebreak_right=False, select_data=True):
         self._sink_wires.dout.put((_interconnect.IPC_SINK_GET_NEAREST, timestamp, time_preference, tiebreak_right, select_data))
         self._interconnect_wires.semaphore.release()
         frame_stamp, data = self._sink_wires.din.get()
-        return frame_stamp, data
+        state, packet = self._read(hl2ss_mx.Status.OK, data)
+        return (frame_stamp, packet) if (state == hl2ss_mx.Status.OK) else (-1, None)
 
     def get_frame_stamp(self):
         _, frame_stamp, _ = self.get_buffered_frame(-1, False)
@@ -279,12 +540,41 @@ class _sink:
         self._sink_wires.dout.put((_interconnect.IPC_SINK_GET_BUFFERED_FRAME, frame_stamp, select_data))
         self._interconnect_wires.semaphore.release()
         state, frame_stamp, data = self._sink_wires.din.get() 
-        return state, frame_stamp, data
+        state, packet = self._read(state, data)
+        return state, frame_stamp, packet
     
     def get_nearest_frame_stamp(self, timestamp, time_preference=hl2ss_mx.TimePreference.PREFER_NEAREST, tiebreak_right=False):
         frame_stamp, _ = self.get_nearest(timestamp, time_preference, tiebreak_right, False)
         return frame_stamp
 
+    def get_nearest_many(self, timestamps, time_preference=hl2ss_mx.TimePreference.PREFER_NEAREST, tiebreak_right=False, select_data=True):
+        self._sink_wires.dout.put((_interconnect.IPC_SINK_GET_NEAREST_MANY, timestamps, time_preference, tiebreak_right, select_data))
+        self._interconnect_wires.semaphore.release()
+        frame_stamps, data = self._sink_wires.din.get()
+        if (data is None):
+            return frame_stamps, [None] * len(frame_stamps)
+        frame_stamps = np.array(frame_stamps)
+        packets = []
+        for index, descriptor in enumerate(data):
+            state, packet = self._read(hl2ss_mx.Status.OK, descriptor)
+            if (state != hl2ss_mx.Status.OK):
+                frame_stamps[index] = -1
+            packets.append(packet)
+        return frame_stamps, packets
+
+    def get_buffered_frames(self, frame_stamps, select_data=True):
+        self._sink_wires.dout.put((_interconnect.IPC_SINK_GET_BUFFERED_FRAMES, frame_stamps, select_data))
+        self._interconnect_wires.semaphore.release()
+        states, frame_stamps, data = self._sink_wires.din.get()
+        if (data is None):
+            return states, frame_stamps, [None] * len(frame_stamps)
+        states = np.array(states)
+        packets = []
+        for index, descriptor in enumerate(data):
+            states[index], packet = self._read(states[index], descriptor)
+            packets.append(packet)
+        return states, frame_stamps, packets
+
     def get_source_status(self):
         return not self._sink_wires.event.is_set()
     
@@ -303,8 +593,8 @@ def _create_interface_sink_default(semaphore):
     return _net_sink(mp.Queue(), mp.Queue(), mp.Semaphore(_interconnect.IPC_SEMAPHORE_VALUE) if (semaphore is ...) else None, mp.Event())
 
 
-def _create_sink(sink_wires, interconnect_wires):
-    return _sink(sink_wires, interconnect_wires)
+def _create_sink(sink_wires, interconnect_wires, zero_copy):
+    return _sink(sink_wires, interconnect_wires, zero_copy)
 
 
 #------------------------------------------------------------------------------
@@ -312,11 +602,18 @@ def _create_sink(sink_wires, interconnect_wires):
 #------------------------------------------------------------------------------
 
 class _module:
-    def __init__(self, receiver, buffer_size, source_kind, default_sink_semaphore):
+    def __init__(self, receiver, buffer_size, source_kind, default_sink_semaphore, lazy=False, cache_size=32, zero_copy=False):
+        self._lazy = lazy and hl2ss_mx._is_lazy_decodable(receiver)
+        self._receiver = receiver
+        self._cache_size = cache_size
+        self._zero_copy = zero_copy
         self._interconnect_wires = _create_interface_interconnect()
         self._default_sink_wires = _create_interface_sink_default(default_sink_semaphore)
-        self._interconnect = _create_interconnect(receiver, buffer_size, source_kind, self._interconnect_wires, self._default_sink_wires)
-        self._default_sink = _create_sink(self._default_sink_wires, self._interconnect_wires)
+        self._interconnect = _create_interconnect(hl2ss_mx._create_lazy_receiver(receiver) if (self._lazy) else receiver, buffer_size, source_kind, self._interconnect_wires, self._default_sink_wires)
+        self._default_sink = self._wrap_sink(_create_sink(self._default_sink_wires, self._interconnect_wires, self._zero_copy))
+
+    def _wrap_sink(self, sink):
+        return hl2ss_mx._lazy_sink(sink, hl2ss_mx._lazy_decoder(self._receiver, self._cache_size)) if (self._lazy) else sink
 
     def start(self):
         self._interconnect.start()
@@ -327,9 +624,9 @@ class _module:
 
     def attach_sink(self, sink_din, sink_dout, sink_semaphore, sink_event):
         sink_wires = _create_interface_sink(sink_din, sink_dout, sink_semaphore, sink_event)
-        sink = _create_sink(sink_wires, self._interconnect_wires)
+        sink = _create_sink(sink_wires, self._interconnect_wires, self._zero_copy)
         self._interconnect.attach_sink(sink_wires)
-        return sink
+        return self._wrap_sink(sink)
     
     def get_default_sink(self):
         return self._default_sink
@@ -347,8 +644,8 @@ class producer:
     def configure(self, port, receiver):
         self._rx[port] = receiver
 
-    def initialize(self, port, buffer_size=512, source_kind=hl2ss_mx.SourceKind.MP, default_sink_semaphore=None):
-        self._producer[port] = _module(self._rx[port], buffer_size, source_kind, default_sink_semaphore)
+    def initialize(self, port, buffer_size=512, source_kind=hl2ss_mx.SourceKind.MP, default_sink_semaphore=None, lazy=False, cache_size=32, zero_copy=False):
+        self._producer[port] = _module(self._rx[port], buffer_size, source_kind, default_sink_semaphore, lazy, cache_size, zero_copy)
 
     def start(self, port):        
         self._producer[port].start()
@@ -399,18 +696,21 @@ class consumer:
 #------------------------------------------------------------------------------
 
 class stream(hl2ss._context_manager):
-    def __init__(self, rx, buffer_size=512, source_kind=hl2ss_mx.SourceKind.MP, semaphore=None):
+    def __init__(self, rx, buffer_size=512, source_kind=hl2ss_mx.SourceKind.MP, semaphore=None, lazy=False, cache_size=32, zero_copy=False):
         self.rx = rx
         self.buffer_size = buffer_size
         self.source_kind = source_kind
         self.semaphore = semaphore
+        self.lazy = lazy
+        self.cache_size = cache_size
+        self.zero_copy = zero_copy
 
     def open(self):
         self._tag = self.rx.port
 
         self._producer = producer()
         self._producer.configure(self._tag, self.rx)
-        self._producer.initialize(self._tag, self.buffer_size, self.source_kind, self.semaphore)
+        self._producer.initialize(self._tag, self.buffer_size, self.source_kind, self.semaphore, self.lazy, self.cache_size, self.zero_copy)
         self._producer.start(self._tag)
 
         self._consumer = consumer()
@@ -447,6 +747,12 @@ class stream(hl2ss._context_manager):
     def get_nearest_frame_stamp(self, timestamp, time_preference=hl2ss_mx.TimePreference.PREFER_NEAREST, tiebreak_right=False):
         return self._sink.get_nearest_frame_stamp(timestamp, time_preference, tiebreak_right)
 
+    def get_nearest_many(self, timestamps, time_preference=hl2ss_mx.TimePreference.PREFER_NEAREST, tiebreak_right=False, select_data=True):
+        return self._sink.get_nearest_many(timestamps, time_preference, tiebreak_right, select_data)
+
+    def get_buffered_frames(self, frame_stamps, select_data=True):
+        return self._sink.get_buffered_frames(frame_stamps, select_data)
+
     def get_source_status(self):
         return self._sink.get_source_status()
     
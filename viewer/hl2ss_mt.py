@@ -429,6 +429,26 @@ class _sink:
         frame_stamp, _ = self.get_nearest(timestamp, time_preference, tiebreak_right, False)
         return frame_stamp
 
+    def get_nearest_many(self, timestamps, time_preference=hl2ss_mx.TimePreference.PREFER_NEAREST, tiebreak_right=False, select_data=True):
+        frame_stamps = []
+        data = []
+        for timestamp in timestamps:
+            frame_stamp, packet = self.get_nearest(int(timestamp), time_preference, tiebreak_right, select_data)
+            frame_stamps.append(frame_stamp)
+            data.append(packet)
+        return np.array(frame_stamps, dtype=np.int64), data
+
+    def get_buffered_frames(self, frame_stamps, select_data=True):
+        states = []
+        stamps = []
+        data = []
+        for frame_stamp in frame_stamps:
+            state, frame_stamp, packet = self.get_buffered_frame(int(frame_stamp), select_data)
+            states.append(state)
+            stamps.append(frame_stamp)
+            data.append(packet)
+        return np.array(states, dtype=np.int64), np.array(stamps, dtype=np.int64), data
+
     def get_source_status(self):
         return True
     
@@ -444,12 +464,16 @@ class producer:
     def __init__(self):
         self._rx = dict()
         self._producer = dict()
+        self._lazy = dict()
 
     def configure(self, port, receiver):
         self._rx[port] = receiver
 
-    def initialize(self, port, buffer_size=512, source_kind=None, default_sink_semaphore=None):
-        self._producer[port] = _translate(self._rx[port], buffer_size)
+    def initialize(self, port, buffer_size=512, source_kind=None, default_sink_semaphore=None, lazy=False, cache_size=32):
+        # In lazy mode the native stream buffers encoded packets and sinks
+        # decode them on access
+        self._lazy[port] = (lazy and hl2ss_mx._is_lazy_decodable(self._rx[port]), cache_size)
+        self._producer[port] = _translate(hl2ss_mx._create_lazy_receiver(self._rx[port]) if (self._lazy[port][0]) else self._rx[port], buffer_size)
 
     def start(self, port):        
         self._producer[port].open()
@@ -460,11 +484,15 @@ class producer:
     def get_receiver(self, port):
         return self._rx[port]
     
+    def _wrap_sink(self, port, sink):
+        lazy, cache_size = self._lazy[port]
+        return hl2ss_mx._lazy_sink(sink, hl2ss_mx._lazy_decoder(self._rx[port], cache_size)) if (lazy) else sink
+
     def _attach_sink(self, port):
-        return _sink(self._producer[port])
+        return self._wrap_sink(port, _sink(self._producer[port]))
 
     def _get_default_sink(self, port):
-        return _sink(self._producer[port])
+        return self._wrap_sink(port, _sink(self._producer[port]))
 
 
 #------------------------------------------------------------------------------
@@ -487,18 +515,20 @@ class consumer:
 #------------------------------------------------------------------------------
 
 class stream(hl2ss._context_manager):
-    def __init__(self, rx, buffer_size=512, source_kind=None, semaphore=None):
+    def __init__(self, rx, buffer_size=512, source_kind=None, semaphore=None, lazy=False, cache_size=32):
         self.rx = rx
         self.buffer_size = buffer_size
         self.source_kind = source_kind
         self.semaphore = semaphore
+        self.lazy = lazy
+        self.cache_size = cache_size
 
     def open(self):
         self._tag = self.rx.port
 
         self._producer = producer()
         self._producer.configure(self._tag, self.rx)
-        self._producer.initialize(self._tag, self.buffer_size, self.source_kind, self.semaphore)
+        self._producer.initialize(self._tag, self.buffer_size, self.source_kind, self.semaphore, self.lazy, self.cache_size)
         self._producer.start(self._tag)
 
         self._consumer = consumer()
@@ -535,6 +565,12 @@ class stream(hl2ss._context_manager):
     def get_nearest_frame_stamp(self, timestamp, time_preference=hl2ss_mx.TimePreference.PREFER_NEAREST, tiebreak_right=False):
         return self._sink.get_nearest_frame_stamp(timestamp, time_preference, tiebreak_right)
 
+    def get_nearest_many(self, timestamps, time_preference=hl2ss_mx.TimePreference.PREFER_NEAREST, tiebreak_right=False, select_data=True):
+        return self._sink.get_nearest_many(timestamps, time_preference, tiebreak_right, select_data)
+
+    def get_buffered_frames(self, frame_stamps, select_data=True):
+        return self._sink.get_buffered_frames(frame_stamps, select_data)
+
     def get_source_status(self):
         return self._sink.get_source_status()
     
@@ -1,4 +1,8 @@
 
+import numpy as np
+import collections
+import copy
+import time
 import hl2ss
 
 
@@ -65,6 +69,168 @@ class RingBuffer:
         return len(self.data)
 
 
+class TimestampRingBuffer:
+    '''
+    Implements a ring-buffer of packets with a parallel array of timestamps.
+    Lookups by timestamp and by index work on the physical layout and never
+    build the ordered list, get is provided for compatibility with RingBuffer.
+    Indices are logical: 0 is the oldest packet and length() - 1 the newest.
+    '''
+
+    def __init__(self, size_max=64):
+        self.max = size_max
+        self.data = [None] * size_max
+        self.timestamps = np.zeros(size_max, dtype=np.uint64)
+        self.cur = 0
+        self.count = 0
+
+    def append(self, x):
+        self.data[self.cur] = x
+        self.timestamps[self.cur] = x.timestamp
+        self.cur = (self.cur + 1) % self.max
+        if (self.count < self.max):
+            self.count += 1
+
+    def get(self):
+        return self.data[:self.count] if (self.count < self.max) else self.data[self.cur:] + self.data[:self.cur]
+
+    def last(self):
+        return self.data[(self.cur - 1) % self.max] if (self.count > 0) else None
+
+    def length(self):
+        return self.count
+
+    def _physical(self, index):
+        return (self.cur - self.count + index) % self.max
+
+    def get_item(self, index):
+        if (index < 0):
+            index += self.count
+        return self.data[self._physical(index)] if ((index >= 0) and (index < self.count)) else None
+
+    def get_items(self, indices):
+        return [self.get_item(int(index)) for index in indices]
+
+    def get_range(self, start, stop):
+        start = max(start, 0)
+        stop = min(stop, self.count)
+        return [self.data[self._physical(index)] for index in range(start, stop)]
+
+    def _searchsorted(self, queries):
+        begin = self._physical(0)
+        end = begin + self.count
+        a = self.timestamps[begin:min(end, self.max)]
+        b = self.timestamps[:max(end - self.max, 0)]
+        ia = np.searchsorted(a, queries, side='left')
+        ib = np.searchsorted(b, queries, side='left')
+        return np.where(ia < a.size, ia, a.size + ib)
+
+    def get_nearest_many(self, queries, time_preference=TimePreference.PREFER_NEAREST, tiebreak_right=False):
+        queries = np.asarray(queries, dtype=np.uint64)
+        n = self.count
+
+        if (n <= 0):
+            return np.full(queries.shape, -1, dtype=np.int64)
+
+        r = np.minimum(self._searchsorted(queries), n - 1)
+        l = np.maximum(r - 1, 0)
+
+        return _select_nearest(queries, l, r, self.timestamps[self._physical(l)], self.timestamps[self._physical(r)], time_preference, tiebreak_right)
+
+    def get_nearest(self, timestamp, time_preference=TimePreference.PREFER_NEAREST, tiebreak_right=False):
+        index = int(self.get_nearest_many([timestamp], time_preference, tiebreak_right)[0])
+        return None if (index < 0) else index
+
+
+class AudioRingBuffer:
+    '''
+    Implements a fixed-capacity ring-buffer of packed audio frames with a
+    parallel array of timestamps in hundreds of nanoseconds. Writes and reads
+    copy at most two contiguous segments and never reallocate, when full the
+    oldest frames are overwritten. Indices are logical: 0 is the oldest frame.
+    '''
+
+    def __init__(self, channels, sample_rate, capacity, dtype=np.float32):
+        self.channels = channels
+        self.unit_time = hl2ss.TimeBase.HUNDREDS_OF_NANOSECONDS // sample_rate
+        self.max = capacity
+        self.data = np.zeros((capacity, channels), dtype=dtype)
+        self.timestamps = np.zeros(capacity, dtype=np.int64)
+        self.offsets = np.arange(0, capacity, dtype=np.int64) * self.unit_time
+        self.cur = 0
+        self.count = 0
+
+    def _physical(self, index):
+        return (self.cur - self.count + index) % self.max
+
+    def write(self, timestamp, samples):
+        frames = samples.reshape((-1, self.channels))
+        n = frames.shape[0]
+        if (n > self.max):
+            timestamp += (n - self.max) * self.unit_time
+            frames = frames[(n - self.max):, :]
+            n = self.max
+        a = min(n, self.max - self.cur)
+        self.data[self.cur:(self.cur + a), :] = frames[:a, :]
+        np.add(timestamp, self.offsets[:a], out=self.timestamps[self.cur:(self.cur + a)])
+        if (a < n):
+            self.data[:(n - a), :] = frames[a:, :]
+            np.add(timestamp + a * self.unit_time, self.offsets[:(n - a)], out=self.timestamps[:(n - a)])
+        self.cur = (self.cur + n) % self.max
+        self.count = min(self.count + n, self.max)
+
+    def length(self):
+        return self.count
+
+    def get_timestamp(self, index=0):
+        if (index < 0):
+            index += self.count
+        return int(self.timestamps[self._physical(index)]) if ((index >= 0) and (index < self.count)) else None
+
+    def peek(self, start, stop, out=None):
+        start = max(start, 0)
+        stop = min(stop, self.count)
+        n = max(stop - start, 0)
+        data = np.empty((n, self.channels), dtype=self.data.dtype) if (out is None) else out.reshape((-1, self.channels))
+        p = self._physical(start)
+        a = min(n, self.max - p)
+        data[:a, :] = self.data[p:(p + a), :]
+        data[a:n, :] = self.data[:(n - a), :]
+        return data
+
+    def discard(self, count):
+        self.count -= min(max(count, 0), self.count)
+
+    def read(self, count, out=None):
+        if (count > self.count):
+            return None, None
+        timestamp = self.get_timestamp(0)
+        data = self.peek(0, count, out)
+        self.discard(count)
+        return timestamp, data
+
+    def _searchsorted(self, timestamp):
+        begin = self._physical(0)
+        end = begin + self.count
+        a = self.timestamps[begin:min(end, self.max)]
+        b = self.timestamps[:max(end - self.max, 0)]
+        ia = int(np.searchsorted(a, timestamp, side='left'))
+        return ia if (ia < a.size) else (a.size + int(np.searchsorted(b, timestamp, side='left')))
+
+    def get_nearest(self, timestamp, time_preference=TimePreference.PREFER_NEAREST, tiebreak_right=False):
+        if (self.count <= 0):
+            return None
+        r = min(self._searchsorted(timestamp), self.count - 1)
+        l = max(r - 1, 0)
+        return int(_select_nearest(np.array([timestamp], dtype=np.int64), l, r, self.timestamps[self._physical(l)], self.timestamps[self._physical(r)], time_preference, tiebreak_right)[0])
+
+    def get_range(self, start_timestamp, stop_timestamp, out=None):
+        # Frames with start_timestamp <= timestamp < stop_timestamp
+        l = self._searchsorted(start_timestamp)
+        r = self._searchsorted(stop_timestamp)
+        return self.get_timestamp(l), self.peek(l, r, out)
+
+
 def _get_packet_interval(data, timestamp, l, r):
     while ((r - l) > 1):
         i = (r + l) // 2
@@ -114,6 +280,650 @@ def get_nearest_packet(data, timestamp, time_preference=TimePreference.PREFER_NE
     return si[1 if (tiebreak_right) else 0] 
 
 
+def _select_nearest(queries, l, r, t0, t1, time_preference, tiebreak_right):
+    if (time_preference == TimePreference.PREFER_PAST):
+        select_right = np.zeros(queries.shape, dtype=bool)
+    elif (time_preference == TimePreference.PREFER_FUTURE):
+        select_right = np.ones(queries.shape, dtype=bool)
+    else:
+        d0 = queries - t0
+        d1 = t1 - queries
+        select_right = (d1 < d0) | ((d1 == d0) & tiebreak_right)
+
+    select_right |= (queries >= t1) | (queries <= t0)
+
+    return np.where(select_right, r, l)
+
+
+def get_nearest_indices(timestamps, queries, time_preference=TimePreference.PREFER_NEAREST, tiebreak_right=False):
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    queries = np.asarray(queries, dtype=np.int64)
+    n = timestamps.size
+
+    if (n <= 0):
+        return np.full(queries.shape, -1, dtype=np.int64)
+
+    r = np.minimum(np.searchsorted(timestamps, queries, side='left'), n - 1)
+    l = np.maximum(r - 1, 0)
+
+    return _select_nearest(queries, l, r, timestamps[l], timestamps[r], time_preference, tiebreak_right)
+
+
+def get_nearest_packets(data, queries, time_preference=TimePreference.PREFER_NEAREST, tiebreak_right=False):
+    return get_nearest_indices(np.fromiter((packet.timestamp for packet in data), dtype=np.int64, count=len(data)), queries, time_preference, tiebreak_right)
+
+
+#------------------------------------------------------------------------------
+# Synchronizer
+#------------------------------------------------------------------------------
+
+class _sync_source_sink:
+    def __init__(self, sink):
+        self._sink = sink
+
+    def get_reference(self):
+        frame_stamp, data = self._sink.get_most_recent_frame()
+        return (Status.WAIT, frame_stamp, None) if (data is None) else (Status.OK, frame_stamp, data)
+
+    def get_nearest(self, timestamp, time_preference, tiebreak_right):
+        _, data = self._sink.get_nearest(timestamp, time_preference, tiebreak_right)
+        return (Status.WAIT, None) if (data is None) else (Status.OK, data)
+
+
+class _sync_source_sequencer:
+    def __init__(self, sequencer):
+        self._sequencer = sequencer
+        self._frame_stamp = -1
+
+    def get_reference(self):
+        data = self._sequencer.get_left()
+        if (data is None):
+            return (None, self._frame_stamp, None)
+        self._sequencer.advance()
+        self._frame_stamp += 1
+        return (Status.OK, self._frame_stamp, data)
+
+    def get_nearest(self, timestamp, time_preference, tiebreak_right):
+        status, data = self._sequencer.get_next_packet(timestamp, time_preference, tiebreak_right)
+        return (status, data if (status == Status.OK) else None)
+
+
+def _create_sync_source(source):
+    return _sync_source_sink(source) if (hasattr(source, 'get_most_recent_frame')) else _sync_source_sequencer(source)
+
+
+class _sync_statistics:
+    def __init__(self):
+        self.matched = 0
+        self.dropped = 0
+        self.waits = 0
+        self.skew_sum = 0
+        self.skew_min = None
+        self.skew_max = None
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.latency_count = 0
+
+    def add_skew(self, skew):
+        self.matched += 1
+        self.skew_sum += skew
+        self.skew_min = skew if (self.skew_min is None) else min(self.skew_min, skew)
+        self.skew_max = skew if (self.skew_max is None) else max(self.skew_max, skew)
+
+    def add_latency(self, latency):
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.latency_count += 1
+
+    def get(self):
+        return {
+            'matched'      : self.matched,
+            'dropped'      : self.dropped,
+            'waits'        : self.waits,
+            'skew_mean'    : (self.skew_sum / self.matched) if (self.matched > 0) else None,
+            'skew_min'     : self.skew_min,
+            'skew_max'     : self.skew_max,
+            'latency_mean' : (self.latency_sum / self.latency_count) if (self.latency_count > 0) else None,
+            'latency_max'  : self.latency_max,
+        }
+
+
+class synchronizer:
+    '''
+    Aligns the frames of several streams to the frames of a reference stream.
+    Sources are hl2ss_mp/hl2ss_mt sinks or streams (live) or hl2ss_io
+    sequencers (offline), given as a dict keyed by port or any name.
+    Live: the reference is the most recent frame of its sink. A set whose
+    match is older than the tolerance window is retried (WAIT) since the
+    matching frame may not have arrived yet, a set whose match is newer is
+    dropped (DISCARDED). Offline: every reference frame is visited in order,
+    sets outside the tolerance are dropped and the end of any file ends the
+    synchronization (None).
+    Skew is the timestamp offset (hundreds of nanoseconds) of each matched
+    frame with respect to the reference frame. Latency is the time
+    (seconds) from the first query for a reference frame until the matching
+    frame of each stream was available.
+    '''
+
+    def __init__(self, sources, reference, tolerance=None, time_preferences=None, tiebreak_right=False, require_valid_pose=False):
+        self._reference = reference
+        self._tolerance = tolerance
+        self._tiebreak_right = tiebreak_right
+        self._require_valid_pose = require_valid_pose
+        self._sources = { key : _create_sync_source(source) for key, source in sources.items() }
+        self._time_preferences = { key : TimePreference.PREFER_NEAREST for key in sources.keys() }
+        if (time_preferences is not None):
+            self._time_preferences.update(time_preferences)
+        self._order = [key for key in sources.keys() if (key != reference)]
+        self._statistics = { key : _sync_statistics() for key in sources.keys() }
+        self._sets_emitted = 0
+        self._sets_dropped = 0
+        self._sets_waits = 0
+        self._last_frame_stamp = None
+        self._pending_frame_stamp = None
+        self._pending_time = None
+        self._pending_ready = set()
+
+    def _valid(self, data):
+        return (not self._require_valid_pose) or ((data.pose is not None) and hl2ss.is_valid_pose(data.pose))
+
+    def _drop(self, key):
+        self._statistics[key].dropped += 1
+        self._sets_dropped += 1
+        if (key != self._reference):
+            # Query the stream that rejected this set first next time
+            self._order.remove(key)
+            self._order.insert(0, key)
+        return (Status.DISCARDED, None)
+
+    def _wait(self, key):
+        self._statistics[key].waits += 1
+        self._sets_waits += 1
+        return (Status.WAIT, None)
+
+    def get_next(self):
+        status, frame_stamp, data_ref = self._sources[self._reference].get_reference()
+        if (status is None):
+            return (None, None)
+        if ((status != Status.OK) or (frame_stamp == self._last_frame_stamp)):
+            return (Status.WAIT, None)
+
+        now = time.perf_counter()
+        if (frame_stamp != self._pending_frame_stamp):
+            self._pending_frame_stamp = frame_stamp
+            self._pending_time = now
+            self._pending_ready = set()
+
+        if (not self._valid(data_ref)):
+            self._last_frame_stamp = frame_stamp
+            return self._drop(self._reference)
+
+        timestamp = data_ref.timestamp
+        frames = { self._reference : data_ref }
+        skews = dict()
+
+        for key in self._order:
+            status, data = self._sources[key].get_nearest(timestamp, self._time_preferences[key], self._tiebreak_right)
+            if (status is None):
+                return (None, None)
+            if (status == Status.WAIT):
+                return self._wait(key)
+            if (status != Status.OK):
+                self._last_frame_stamp = frame_stamp
+                return self._drop(key)
+            
+            skew = data.timestamp - timestamp
+            if ((self._tolerance is not None) and (skew < -self._tolerance) and isinstance(self._sources[key], _sync_source_sink)):
+                return self._wait(key)
+
+            if (key not in self._pending_ready):
+                self._pending_ready.add(key)
+                self._statistics[key].add_latency(now - self._pending_time)
+
+            if (((self._tolerance is not None) and (abs(skew) > self._tolerance)) or (not self._valid(data))):
+                self._last_frame_stamp = frame_stamp
+                return self._drop(key)
+
+            frames[key] = data
+            skews[key] = skew
+
+        for key, skew in skews.items():
+            self._statistics[key].add_skew(skew)
+        self._statistics[self._reference].add_skew(0)
+
+        self._last_frame_stamp = frame_stamp
+        self._sets_emitted += 1
+
+        return (Status.OK, frames)
+
+    def get_statistics(self):
+        return {
+            'emitted' : self._sets_emitted,
+            'dropped' : self._sets_dropped,
+            'waits'   : self._sets_waits,
+            'streams' : { key : statistics.get() for key, statistics in self._statistics.items() },
+        }
+
+
+#------------------------------------------------------------------------------
+# Lazy Decoding
+#------------------------------------------------------------------------------
+
+# In lazy mode the source receives encoded packets and sinks decode them on
+# access, so frames that are never read are never decoded
+# Decoded payloads are cached (LRU) together with the packet that holds their
+# memory, H26x streams are decoded forward from the last decoded frame or
+# from the keyframe at or before the requested frame
+
+def _lazy_thread_type(rx):
+    # Frame threading holds frames back but each frame must be returned by
+    # the call that decodes it, for the same reason latency is always 0
+    return None if ((rx.thread_type is None) or any([kind in str(rx.thread_type).upper() for kind in ('FRAME', 'AUTO')])) else rx.thread_type
+
+
+def _lazy_keyframe_period(rx):
+    return hl2ss.get_video_keyframe_period(rx.options, rx.keyframe_only)
+
+
+def _lazy_codec_rm_vlc(rx):
+    return hl2ss.decode_rm_vlc(rx.profile, _lazy_thread_type(rx), rx.thread_count, 0, rx.skip_frame, _lazy_keyframe_period(rx), rx.downscale)
+
+
+class _lazy_codec_pv:
+    def __init__(self, rx):
+        self._codec = hl2ss.decode_pv(rx.profile, _lazy_thread_type(rx), rx.thread_count, 0, rx.pool, rx.skip_frame, _lazy_keyframe_period(rx), rx.downscale)
+        self._format = rx.format
+
+    def decode(self, payload):
+        return self._codec.decode(payload, self._format)
+
+
+class _lazy_tlb:
+    registry = [
+        (hl2ss.rx_decoded_rm_vlc,             hl2ss.rx_rm_vlc,             lambda rx : _lazy_codec_rm_vlc(rx),                             lambda rx : rx.profile    != hl2ss.VideoProfile.RAW),
+        (hl2ss.rx_decoded_rm_depth_ahat,      hl2ss.rx_rm_depth_ahat,      lambda rx : hl2ss.decode_rm_depth_ahat(rx.profile_z, rx.profile_ab, skip_frame=rx.skip_frame, keyframe_period=_lazy_keyframe_period(rx)), lambda rx : rx.profile_ab != hl2ss.VideoProfile.RAW),
+        (hl2ss.rx_decoded_rm_depth_longthrow, hl2ss.rx_rm_depth_longthrow, lambda rx : hl2ss.decode_rm_depth_longthrow(rx.png_filter),     lambda rx : False),
+        (hl2ss.rx_decoded_rm_imu,             hl2ss.rx_rm_imu,             lambda rx : hl2ss.decode_rm_imu(),                              lambda rx : False),
+        (hl2ss.rx_decoded_pv,                 hl2ss.rx_pv,                 lambda rx : _lazy_codec_pv(rx),                                 lambda rx : rx.profile    != hl2ss.VideoProfile.RAW),
+        (hl2ss.rx_decoded_microphone,         hl2ss.rx_microphone,         lambda rx : hl2ss.decode_microphone(rx.profile, rx.level),      lambda rx : False),
+        (hl2ss.rx_decoded_si,                 hl2ss.rx_si,                 lambda rx : hl2ss.decode_si(),                                  lambda rx : False),
+        (hl2ss.rx_decoded_eet,                hl2ss.rx_eet,                lambda rx : hl2ss.decode_eet(),                                 lambda rx : False),
+        (hl2ss.rx_decoded_extended_audio,     hl2ss.rx_extended_audio,     lambda rx : hl2ss.decode_extended_audio(rx.profile, rx.level),  lambda rx : False),
+        (hl2ss.rx_decoded_extended_depth,     hl2ss.rx_extended_depth,     lambda rx : hl2ss.decode_extended_depth(rx.profile_z),          lambda rx : False),
+    ]
+
+    @staticmethod
+    def find(rx):
+        for entry in _lazy_tlb.registry:
+            if (isinstance(rx, entry[0])):
+                return entry
+        return None
+
+
+def _is_lazy_decodable(receiver):
+    return _lazy_tlb.find(receiver) is not None
+
+
+def _create_lazy_receiver(receiver):
+    # Same configuration, undecoded class
+    entry = _lazy_tlb.find(receiver)
+    if (entry is None):
+        return receiver
+    rx = copy.copy(receiver)
+    rx.__class__ = entry[1]
+    return rx
+
+
+def _lazy_packet(packet, payload):
+    decoded = copy.copy(packet)
+    decoded.payload = payload
+    return decoded
+
+
+class _lazy_decoder:
+    def __init__(self, receiver, cache_size=32):
+        self.receiver = receiver
+        self.cache_size = cache_size
+        self._reset()
+
+    def __getstate__(self):
+        return {'receiver' : self.receiver, 'cache_size' : self.cache_size}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._reset()
+
+    def _reset(self):
+        self._codec = None
+        self._cache = collections.OrderedDict()
+        self._last = None
+        self.decoded = 0
+
+    def _open(self):
+        _, _, self._create, stateful = _lazy_tlb.find(self.receiver)
+        self._stateful = stateful(self.receiver)
+        self._sync_period = get_sync_period(self.receiver) if (self._stateful) else 1
+        self._codec = self._create(self.receiver)
+
+    def _decode(self, frame_stamp, packet):
+        # The packet keeps the memory of the encoded payload alive
+        # Packets are shared with the buffer and other sinks, the decoded
+        # payload is returned in a copy
+        # Frames that produce no image (skip_frame, keyframe_only) are not
+        # cached and decoder errors restart the chain on the next access
+        self._last = None
+        payload = self._codec.decode(packet.payload)
+        self._last = frame_stamp
+        self.decoded += 1
+        if (payload is None):
+            return None
+        self._cache[frame_stamp] = (payload, packet)
+        if (len(self._cache) > self.cache_size):
+            self._cache.popitem(last=False)
+        return _lazy_packet(packet, payload)
+
+    def _decode_chain(self, source, frame_stamp):
+        # Fails if a frame of the chain, such as the keyframe, has left the
+        # buffer, decoding without it gives corrupt images
+        keyframe = frame_stamp - (frame_stamp % self._sync_period)
+        if ((self._last is None) or (self._last < keyframe) or (self._last >= frame_stamp)):
+            self._codec = self._create(self.receiver)
+            self._last = None
+            start = keyframe
+        else:
+            start = self._last + 1
+        if (start >= frame_stamp):
+            return True
+        states, stamps, packets = source.get_buffered_frames(list(range(start, frame_stamp)), True)
+        for state, stamp, packet in zip(states, stamps, packets):
+            if ((state != Status.OK) or (packet is None)):
+                self._last = None
+                return False
+            self._decode(int(stamp), packet)
+        return True
+
+    def decode(self, source, frame_stamp, packet):
+        if (packet is None):
+            return None
+        cached = self._cache.get(frame_stamp, None)
+        if (cached is not None):
+            self._cache.move_to_end(frame_stamp)
+            return _lazy_packet(packet, cached[0])
+        if (self._codec is None):
+            self._open()
+        if (self._stateful and (not self._decode_chain(source, frame_stamp))):
+            return None
+        return self._decode(frame_stamp, packet)
+
+    def decode_many(self, source, frame_stamps, packets):
+        # Ascending order so chains are decoded once
+        for index in np.argsort(frame_stamps, kind='stable'):
+            packets[index] = self.decode(source, int(frame_stamps[index]), packets[index])
+        return packets
+
+
+def _lazy_status(state, data, packet):
+    # Frames that decode to nothing are reported as discarded
+    return Status.DISCARDED if ((data is not None) and (packet is None)) else state
+
+
+class _lazy_sink:
+    def __init__(self, sink, decoder):
+        self._sink = sink
+        self._decoder = decoder
+
+    def acquire(self, block=True):
+        return self._sink.acquire(block)
+
+    def release(self):
+        self._sink.release()
+
+    def get_attach_response(self):
+        return self._sink.get_attach_response()
+
+    def detach(self):
+        self._sink.detach()
+
+    def get_nearest(self, timestamp, time_preference=TimePreference.PREFER_NEAREST, tiebreak_right=False, select_data=True):
+        frame_stamp, data = self._sink.get_nearest(timestamp, time_preference, tiebreak_right, select_data)
+        packet = self._decoder.decode(self._sink, frame_stamp, data)
+        return (frame_stamp, packet) if (_lazy_status(Status.OK, data, packet) == Status.OK) else (-1, None)
+
+    def get_frame_stamp(self):
+        return self._sink.get_frame_stamp()
+
+    def get_most_recent_frame(self):
+        _, frame_stamp, data = self.get_buffered_frame(-1, True)
+        return frame_stamp, data
+
+    def get_buffered_frame(self, frame_stamp, select_data=True):
+        state, frame_stamp, data = self._sink.get_buffered_frame(frame_stamp, select_data)
+        packet = self._decoder.decode(self._sink, frame_stamp, data)
+        return _lazy_status(state, data, packet), frame_stamp, packet
+
+    def get_nearest_frame_stamp(self, timestamp, time_preference=TimePreference.PREFER_NEAREST, tiebreak_right=False):
+        return self._sink.get_nearest_frame_stamp(timestamp, time_preference, tiebreak_right)
+
+    def get_nearest_many(self, timestamps, time_preference=TimePreference.PREFER_NEAREST, tiebreak_right=False, select_data=True):
+        frame_stamps, data = self._sink.get_nearest_many(timestamps, time_preference, tiebreak_right, select_data)
+        packets = self._decoder.decode_many(self._sink, frame_stamps, list(data))
+        frame_stamps = np.array(frame_stamps)
+        for index in range(0, len(packets)):
+            if (_lazy_status(Status.OK, data[index], packets[index]) != Status.OK):
+                frame_stamps[index] = -1
+        return frame_stamps, packets
+
+    def get_buffered_frames(self, frame_stamps, select_data=True):
+        states, frame_stamps, data = self._sink.get_buffered_frames(frame_stamps, select_data)
+        packets = self._decoder.decode_many(self._sink, frame_stamps, list(data))
+        states = np.array([_lazy_status(state, item, packet) for state, item, packet in zip(states, data, packets)])
+        return states, frame_stamps, packets
+
+    def get_source_status(self):
+        return self._sink.get_source_status()
+
+    def get_source_string(self):
+        return self._sink.get_source_string()
+
+    def get_decoded_count(self):
+        return self._decoder.decoded
+
+
+#------------------------------------------------------------------------------
+# IMU Fusion
+#------------------------------------------------------------------------------
+
+class ImuBuffer:
+    '''
+    Growable columns of IMU samples ordered by soc_ticks. Batches are appended
+    with vectorised copies, capacity doubles when full and, if size_max is
+    set, only the most recent size_max samples are kept. Returned arrays are
+    views and are only valid until the next append or discard.
+    '''
+
+    def __init__(self, capacity=4096, size_max=None):
+        self.size_max = size_max
+        self.timestamps = np.zeros(capacity, dtype=np.uint64)
+        self.values = np.zeros((capacity, 3), dtype=np.float32)
+        self.temperature = np.zeros(capacity, dtype=np.float32)
+        self.begin = 0
+        self.end = 0
+
+    def _reserve(self, count):
+        size = self.end - self.begin
+        if ((self.end + count) <= self.timestamps.shape[0]):
+            return
+        capacity = self.timestamps.shape[0]
+        while ((size + count) > capacity):
+            capacity *= 2
+        if (capacity != self.timestamps.shape[0]):
+            timestamps = np.zeros(capacity, dtype=np.uint64)
+            values = np.zeros((capacity, 3), dtype=np.float32)
+            temperature = np.zeros(capacity, dtype=np.float32)
+        else:
+            timestamps = self.timestamps
+            values = self.values
+            temperature = self.temperature
+        timestamps[:size] = self.timestamps[self.begin:self.end]
+        values[:size, :] = self.values[self.begin:self.end, :]
+        temperature[:size] = self.temperature[self.begin:self.end]
+        self.timestamps = timestamps
+        self.values = values
+        self.temperature = temperature
+        self.begin = 0
+        self.end = size
+
+    def append_samples(self, timestamps, x, y, z, temperature):
+        count = timestamps.shape[0]
+        if ((count <= 0) or ((self.end > self.begin) and (timestamps[-1] <= self.timestamps[self.end - 1]))):
+            return 0
+        if ((self.end > self.begin) and (timestamps[0] <= self.timestamps[self.end - 1])):
+            skip = int(np.searchsorted(timestamps, self.timestamps[self.end - 1], side='right'))
+            return self.append_samples(timestamps[skip:], x[skip:], y[skip:], z[skip:], temperature[skip:])
+        self._reserve(count)
+        self.timestamps[self.end:(self.end + count)] = timestamps
+        self.values[self.end:(self.end + count), 0] = x
+        self.values[self.end:(self.end + count), 1] = y
+        self.values[self.end:(self.end + count), 2] = z
+        self.temperature[self.end:(self.end + count)] = temperature
+        self.end += count
+        if ((self.size_max is not None) and ((self.end - self.begin) > self.size_max)):
+            self.begin = self.end - self.size_max
+        return count
+
+    def append(self, frame):
+        return self.append_samples(frame.soc_ticks, frame.x, frame.y, frame.z, frame.temperature)
+
+    def length(self):
+        return self.end - self.begin
+
+    def get_timestamps(self):
+        return self.timestamps[self.begin:self.end]
+
+    def get_values(self):
+        return self.values[self.begin:self.end, :]
+
+    def get_temperature(self):
+        return self.temperature[self.begin:self.end]
+
+    def first(self):
+        return int(self.timestamps[self.begin]) if (self.end > self.begin) else None
+
+    def last(self):
+        return int(self.timestamps[self.end - 1]) if (self.end > self.begin) else None
+
+    def get_window(self, start, stop):
+        timestamps = self.get_timestamps()
+        l = int(np.searchsorted(timestamps, np.uint64(start), side='left'))
+        r = int(np.searchsorted(timestamps, np.uint64(stop), side='left'))
+        return timestamps[l:r], self.values[(self.begin + l):(self.begin + r), :]
+
+    def discard(self, timestamp):
+        # Keeps the last sample before timestamp so interpolation at
+        # timestamp remains possible
+        index = int(np.searchsorted(self.get_timestamps(), np.uint64(timestamp), side='right'))
+        self.begin += max(index - 1, 0)
+
+    def interpolate(self, queries):
+        timestamps = self.get_timestamps()
+        values = self.get_values()
+        queries = np.asarray(queries, dtype=np.uint64)
+        out = np.zeros((queries.shape[0], 3), dtype=np.float32)
+        if (timestamps.shape[0] <= 0):
+            return out
+        base = timestamps[0]
+        xp = (timestamps - base).astype(np.float64)
+        xq = queries.astype(np.float64) - float(base)
+        for i in range(0, 3):
+            out[:, i] = np.interp(xq, xp, values[:, i])
+        return out
+
+
+class ImuResampler:
+    '''
+    Resamples several IMU streams (e.g. accelerometer, gyroscope and
+    magnetometer) onto one time grid by linear interpolation. Batches are
+    pushed per port and pull returns the grid points covered by all streams
+    since the previous pull, so it can run incrementally on live data.
+    Grid timestamps are in hundreds of nanoseconds (soc_ticks).
+    '''
+
+    def __init__(self, ports, rate=1000, size_max=None):
+        self.ports = list(ports)
+        self.period = hl2ss.TimeBase.HUNDREDS_OF_NANOSECONDS / rate
+        self.buffers = {port : ImuBuffer(size_max=size_max) for port in self.ports}
+        self.next = None
+
+    def push(self, port, frame):
+        return self.buffers[port].append(frame)
+
+    def get_range(self):
+        firsts = [buffer.first() for buffer in self.buffers.values()]
+        lasts = [buffer.last() for buffer in self.buffers.values()]
+        if (any([t is None for t in firsts])):
+            return None
+        return (max(firsts), min(lasts))
+
+    def get_grid(self, start, stop):
+        count = int(np.floor((stop - start) / self.period)) + 1 if (stop >= start) else 0
+        return (start + np.round(np.arange(count) * self.period)).astype(np.uint64)
+
+    def resample(self, timestamps):
+        return {port : buffer.interpolate(timestamps) for port, buffer in self.buffers.items()}
+
+    def pull(self, discard=True):
+        span = self.get_range()
+        if (span is None):
+            return None, None
+        start, stop = span
+        if (self.next is None):
+            self.next = start
+        if (self.next > stop):
+            return np.zeros(0, dtype=np.uint64), {port : np.zeros((0, 3), dtype=np.float32) for port in self.ports}
+        grid = self.get_grid(self.next, stop)
+        values = self.resample(grid)
+        self.next = int(grid[-1] + np.uint64(round(self.period)))
+        if (discard):
+            for buffer in self.buffers.values():
+                buffer.discard(self.next)
+        return grid, values
+
+
+class ImuIntegrator:
+    '''
+    Cumulative trapezoidal integration of resampled IMU values over time
+    (e.g. gyroscope to angle, accelerometer to velocity). State is kept
+    between calls so consecutive pulls of a ImuResampler integrate as one
+    sequence. Time is converted from hundreds of nanoseconds to seconds.
+    '''
+
+    def __init__(self, initial=None):
+        self.reset(initial)
+
+    def reset(self, initial=None):
+        self.integral = np.zeros(3, dtype=np.float64) if (initial is None) else np.array(initial, dtype=np.float64)
+        self.last_timestamp = None
+        self.last_value = None
+
+    def push(self, timestamps, values):
+        if (timestamps.shape[0] <= 0):
+            return np.zeros((0, 3), dtype=np.float64)
+        t = timestamps.astype(np.float64)
+        v = values.astype(np.float64)
+        if (self.last_timestamp is not None):
+            t = np.concatenate(([float(self.last_timestamp)], t))
+            v = np.concatenate((self.last_value[np.newaxis, :], v))
+        dt = np.diff(t)[:, np.newaxis] / hl2ss.TimeBase.HUNDREDS_OF_NANOSECONDS
+        steps = 0.5 * (v[1:, :] + v[:-1, :]) * dt
+        integral = self.integral + np.cumsum(steps, axis=0)
+        if (self.last_timestamp is None):
+            integral = np.vstack((self.integral[np.newaxis, :], integral))
+        self.integral = integral[-1, :].copy()
+        self.last_timestamp = timestamps[-1]
+        self.last_value = v[-1, :].copy()
+        return integral
+
+
 #------------------------------------------------------------------------------
 # Stream Sync Period
 #------------------------------------------------------------------------------
@@ -1,6 +1,8 @@
 
 import multiprocessing as mp
 import threading as mt
+import collections
+import os
 import numpy as np
 import open3d as o3d
 import traceback
@@ -42,21 +44,161 @@ def open3d_triangle_mesh_swap_winding(open3d_mesh):
 #------------------------------------------------------------------------------
 
 class _sm_manager_entry:
-    def __init__(self, update_time, mesh, rcs):
+    def __init__(self, update_time, settings, mesh):
         self.update_time = update_time
+        self.settings = settings
         self.mesh = mesh
-        self.rcs = rcs
+        self.geometry = o3d.t.geometry.TriangleMesh()
+        self.geometry.vertex.positions = o3d.core.Tensor.from_numpy(np.ascontiguousarray(mesh.vertex_positions[:, 0:3]))
+        self.geometry.triangle.indices = o3d.core.Tensor.from_numpy(mesh.triangle_indices)
+        self.center = np.mean(mesh.vertex_positions[:, 0:3], axis=0) if (mesh.vertex_positions.shape[0] > 0) else None
+        self.nbytes = mesh.vertex_positions.nbytes + mesh.triangle_indices.nbytes + mesh.vertex_normals.nbytes + self.geometry.vertex.positions.numpy().nbytes
+
+
+class sm_mesh_cache:
+    '''
+    Normalized spatial mapping surfaces keyed by surface id and update time.
+    Meshes are kept as float32 in an LRU of at most memory_budget bytes and,
+    if path is not None, saved as one npz file per surface so that surfaces
+    that did not change are not downloaded again after a restart or when the
+    same area is observed again. The last known center of every surface is
+    kept in a small in-memory index, built from the files on construction.
+    '''
+
+    def __init__(self, memory_budget=256*1024*1024, path=None):
+        self._memory_budget = memory_budget
+        self._path = path
+        self._entries = collections.OrderedDict()
+        self._centers = dict()
+        self._size = 0
+        if (path is not None):
+            os.makedirs(path, exist_ok=True)
+            self._load_centers()
+
+    def _get_filename(self, id):
+        return os.path.join(self._path, id + '.npz')
+
+    def _load_centers(self):
+        # Only the center member of each file is read
+        for name in os.listdir(self._path):
+            if (not name.endswith('.npz')):
+                continue
+            try:
+                with np.load(os.path.join(self._path, name)) as data:
+                    center = data['center']
+            except:
+                continue
+            self._centers[name[:-4]] = center if (np.all(np.isfinite(center))) else None
+
+    def _insert(self, id, entry):
+        previous = self._entries.pop(id, None)
+        if (previous is not None):
+            self._size -= previous.nbytes
+        self._entries[id] = entry
+        self._centers[id] = entry.center
+        self._size += entry.nbytes
+        while ((self._size > self._memory_budget) and (len(self._entries) > 1)):
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.nbytes
+
+    def _load(self, id, update_time, settings):
+        filename = self._get_filename(id)
+        if (not os.path.isfile(filename)):
+            return None
+        with np.load(filename) as data:
+            if ((int(data['update_time']) != update_time) or (tuple(data['settings'].tolist()) != settings)):
+                return None
+            mesh = hl2ss._sm_mesh(data['vertex_position_scale'], data['pose'], data['bounds'], data['vertex_positions'], data['triangle_indices'], data['vertex_normals'])
+        return _sm_manager_entry(update_time, settings, mesh)
+
+    def _save(self, id, entry):
+        filename = self._get_filename(id)
+        mesh = entry.mesh
+        with open(filename + '.tmp', 'wb') as file:
+            np.savez(file, update_time=np.int64(entry.update_time), settings=np.array(entry.settings, dtype=np.float64), center=np.full(3, np.nan) if (entry.center is None) else entry.center, vertex_position_scale=mesh.vertex_position_scale, pose=mesh.pose, bounds=mesh.bounds, vertex_positions=mesh.vertex_positions, triangle_indices=mesh.triangle_indices, vertex_normals=mesh.vertex_normals)
+        os.replace(filename + '.tmp', filename)
+
+    def get(self, id, update_time, settings):
+        entry = self._entries.get(id, None)
+        if ((entry is not None) and (entry.update_time == update_time) and (entry.settings == settings)):
+            self._entries.move_to_end(id)
+            return entry
+        entry = None if (self._path is None) else self._load(id, update_time, settings)
+        if (entry is not None):
+            self._insert(id, entry)
+        return entry
+
+    def get_center(self, id):
+        # Last known location of the surface, any version
+        return self._centers.get(id, None)
+
+    def put(self, id, update_time, settings, mesh):
+        entry = _sm_manager_entry(update_time, settings, mesh)
+        self._insert(id, entry)
+        if (self._path is not None):
+            self._save(id, entry)
+        return entry
+
+    def get_memory_usage(self):
+        return self._size
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+        if (self._path is None):
+            self._centers.clear()
+
+
+class _sm_manager_scene:
+    # All surfaces in a single RaycastingScene, the geometry id of a hit is the
+    # index of its surface in ids
+    # RaycastingScene cannot remove geometry so the scene is rebuilt from the
+    # cached tensor meshes when the surfaces change, a dummy ray builds the BVH
+    # here instead of on the first query
+    def __init__(self, surfaces):
+        self.ids = list(surfaces.keys())
+        self._rcs = o3d.t.geometry.RaycastingScene()
+        for entry in surfaces.values():
+            self._rcs.add_triangles(entry.geometry)
+        self._table = np.array(self.ids + [None], dtype=object)
+        self._rcs.cast_rays(o3d.core.Tensor(np.zeros((1, 6), dtype=np.float32)))
+
+    def cast_rays(self, rays, return_ids=False):
+        result = self._rcs.cast_rays(rays)
+        distances = result['t_hit'].numpy().astype(np.float64)
+        if (not return_ids):
+            return distances
+        geometry_ids = result['geometry_ids'].numpy()
+        surface_ids = self._table[np.where(geometry_ids == o3d.t.geometry.RaycastingScene.INVALID_ID, len(self.ids), geometry_ids)]
+        return distances, surface_ids, result['primitive_ids'].numpy()
+
+
+def _sm_manager_cast_rays_empty(rays, return_ids=False):
+    distances = np.ones(rays.shape[0:-1]) * np.inf
+    if (not return_ids):
+        return distances
+    return distances, np.full(rays.shape[0:-1], None, dtype=object), np.full(rays.shape[0:-1], o3d.t.geometry.RaycastingScene.INVALID_ID, dtype=np.uint32)
 
 
 class sm_manager(hl2ss._context_manager):
-    def __init__(self, host, port, sockopt=None, triangles_per_cubic_meter=1000, vpf=hl2ss.SM_VertexPositionFormat.R16G16B16A16IntNormalized, tif=hl2ss.SM_TriangleIndexFormat.R16UInt, vnf=hl2ss.SM_VertexNormalFormat.R8G8B8A8IntNormalized):
+    # Surfaces that changed are looked up in the cache first, the rest are
+    # downloaded nearest first (from the last known location of the surface to
+    # the head position, surfaces never seen go first), at most fetch_limit per
+    # call if fetch_limit > 0 with the others kept at their previous version
+    # Without a cache (cache=None) only the observed surfaces are kept
+    def __init__(self, host, port, sockopt=None, triangles_per_cubic_meter=1000, vpf=hl2ss.SM_VertexPositionFormat.R16G16B16A16IntNormalized, tif=hl2ss.SM_TriangleIndexFormat.R16UInt, vnf=hl2ss.SM_VertexNormalFormat.R8G8B8A8IntNormalized, cache=None, fetch_limit=0):
         self._tpcm = triangles_per_cubic_meter
         self._vpf = vpf
         self._tif = tif
         self._vnf = vnf
+        self._settings = (float(triangles_per_cubic_meter), float(vpf), float(tif), float(vnf))
         self._ipc = hl2ss_lnm.ipc_sm(host, port, sockopt)
+        self._cache = cache
+        self._fetch_limit = fetch_limit
         self._surfaces = {}
+        self._scene = None
         self._volumes = None
+        self._head_position = None
         self._updated = False
 
     def open(self):
@@ -72,13 +214,32 @@ class sm_manager(hl2ss._context_manager):
         v, self._volumes = self._volumes, None
         return v
 
-    def _set_surfaces(self, surfaces):
+    def set_head_position(self, position):
+        self._set_head_position(position)
+
+    def _set_head_position(self, position):
+        self._head_position = None if (position is None) else np.array(position, dtype=np.float32).reshape((-1,))[0:3]
+
+    def _get_head_position(self):
+        return self._head_position
+
+    def _get_fetch_priority(self, id, previous_entry, head_position):
+        if (head_position is None):
+            return 0
+        center = previous_entry.center if (previous_entry is not None) else self._cache.get_center(id) if (self._cache is not None) else None
+        return 0 if (center is None) else float(np.linalg.norm(center - head_position))
+
+    def _set_surfaces(self, surfaces, scene):
         self._surfaces = surfaces
+        self._scene = scene
         self._updated = True
 
     def _get_surfaces(self):
         return self._surfaces.values()
 
+    def _get_scene(self):
+        return self._scene
+
     def _get_updated_flag(self):
         f, self._updated = self._updated, False
         return f
@@ -87,37 +248,51 @@ class sm_manager(hl2ss._context_manager):
         next_surfaces = {}
         tasks = hl2ss.sm_mesh_task()        
         updated_surfaces = []
+        pending_surfaces = []
+        cached = 0
 
         next_volumes = self._get_volumes()
         if (next_volumes is not None):
             self._ipc.set_volumes(next_volumes)
+
+        head_position = self._get_head_position()
         
         for surface_info in self._ipc.get_observed_surfaces():
             id = surface_info.id
             surface_info.id = surface_info.id.hex()
-            if (surface_info.id in self._surfaces):
-                previous_entry = self._surfaces[surface_info.id]
-                if (surface_info.update_time <= previous_entry.update_time):
+            previous_entry = self._surfaces.get(surface_info.id, None)
+            if ((previous_entry is not None) and (surface_info.update_time <= previous_entry.update_time)):
+                next_surfaces[surface_info.id] = previous_entry
+                continue
+            cached_entry = None if (self._cache is None) else self._cache.get(surface_info.id, surface_info.update_time, self._settings)
+            if (cached_entry is not None):
+                next_surfaces[surface_info.id] = cached_entry
+                cached += 1
+                continue
+            pending_surfaces.append((self._get_fetch_priority(surface_info.id, previous_entry, head_position), id, surface_info, previous_entry))
+
+        pending_surfaces.sort(key=lambda pending : pending[0])
+        for index, (_, id, surface_info, previous_entry) in enumerate(pending_surfaces):
+            if ((self._fetch_limit > 0) and (index >= self._fetch_limit)):
+                if (previous_entry is not None):
                     next_surfaces[surface_info.id] = previous_entry
-                    continue
+                continue
             tasks.add_task(id, self._tpcm, self._vpf, self._tif, self._vnf)
             updated_surfaces.append(surface_info)
 
         count = len(updated_surfaces)
-        if (count <= 0):
+        if ((count <= 0) and (cached <= 0)):
             return
 
-        for index, mesh in self._ipc.get_meshes(tasks).items():
+        for index, mesh in (self._ipc.get_meshes(tasks).items() if (count > 0) else []):
             if (mesh is None):
                 continue
-            hl2ss_3dcv.sm_mesh_cast(mesh, np.float64, np.uint32, np.float64)
+            hl2ss_3dcv.sm_mesh_cast(mesh, np.float32, np.uint32, np.float32)
             hl2ss_3dcv.sm_mesh_normalize(mesh)
-            rcs = o3d.t.geometry.RaycastingScene()
-            rcs.add_triangles(o3d.t.geometry.TriangleMesh.from_legacy(sm_mesh_to_open3d_triangle_mesh(mesh)))
             surface_info = updated_surfaces[index]
-            next_surfaces[surface_info.id] = _sm_manager_entry(surface_info.update_time, mesh, rcs)
+            next_surfaces[surface_info.id] = _sm_manager_entry(surface_info.update_time, self._settings, mesh) if (self._cache is None) else self._cache.put(surface_info.id, surface_info.update_time, self._settings, mesh)
             
-        self._set_surfaces(next_surfaces)
+        self._set_surfaces(next_surfaces, _sm_manager_scene(next_surfaces) if (len(next_surfaces) > 0) else None)
     
     def close(self):
         self._ipc.close()
@@ -126,14 +301,9 @@ class sm_manager(hl2ss._context_manager):
         surfaces = self._get_surfaces()
         return [surface.mesh for surface in surfaces]
 
-    def cast_rays(self, rays):
-        surfaces = self._get_surfaces()
-        n = len(surfaces)
-        distances = np.ones(rays.shape[0:-1] + (n if (n > 0) else 1,)) * np.inf
-        for index, entry in enumerate(surfaces):
-            distances[..., index] = entry.rcs.cast_rays(rays)['t_hit'].numpy()
-        distances = np.min(distances, axis=-1)
-        return distances
+    def cast_rays(self, rays, return_ids=False):
+        scene = self._get_scene()
+        return _sm_manager_cast_rays_empty(rays, return_ids) if (scene is None) else scene.cast_rays(rays, return_ids)
     
     def get_updated_flag(self):
         return self._get_updated_flag()
@@ -155,14 +325,26 @@ class sm_manager_mt(sm_manager):
         with self._lock:
             return super()._get_volumes()
 
-    def _set_surfaces(self, surfaces):
+    def _set_head_position(self, position):
+        with self._lock:
+            super()._set_head_position(position)
+
+    def _get_head_position(self):
         with self._lock:
-            super()._set_surfaces(surfaces)
+            return super()._get_head_position()
+
+    def _set_surfaces(self, surfaces, scene):
+        with self._lock:
+            super()._set_surfaces(surfaces, scene)
 
     def _get_surfaces(self):
         with self._lock:
             return super()._get_surfaces()
 
+    def _get_scene(self):
+        with self._lock:
+            return super()._get_scene()
+
     def _get_updated_flag(self):
         with self._lock:
             return super()._get_updated_flag()
@@ -199,7 +381,7 @@ class sm_manager_mt(sm_manager):
 
 
 class _sm_manager_stub:
-    def __init__(self, host=None, port=None, sockopt=None, triangles_per_cubic_meter=1000, vpf=hl2ss.SM_VertexPositionFormat.R16G16B16A16IntNormalized, tif=hl2ss.SM_TriangleIndexFormat.R16UInt, vnf=hl2ss.SM_VertexNormalFormat.R8G8B8A8IntNormalized):
+    def __init__(self, host=None, port=None, sockopt=None, triangles_per_cubic_meter=1000, vpf=hl2ss.SM_VertexPositionFormat.R16G16B16A16IntNormalized, tif=hl2ss.SM_TriangleIndexFormat.R16UInt, vnf=hl2ss.SM_VertexNormalFormat.R8G8B8A8IntNormalized, cache=None, fetch_limit=0):
         pass
 
     def open(self):
@@ -208,6 +390,9 @@ class _sm_manager_stub:
     def set_volumes(self, volumes):
         pass
 
+    def set_head_position(self, position):
+        pass
+
     def get_observed_surfaces(self):
         pass
 
@@ -217,11 +402,8 @@ class _sm_manager_stub:
     def get_meshes(self):
         return []
 
-    def cast_rays(self, rays):
-        n = 0
-        distances = np.ones(rays.shape[0:-1] + (n if (n > 0) else 1,)) * np.inf
-        distances = np.min(distances, axis=-1)
-        return distances
+    def cast_rays(self, rays, return_ids=False):
+        return _sm_manager_cast_rays_empty(rays, return_ids)
     
     def get_updated_flag(self):
         return False
@@ -245,8 +427,9 @@ class _sm_manager_mp(mp.Process):
     IPC_CAST_RAYS = 4
     IPC_GET_IPC_STRING = 5
     IPC_GET_UPDATED_FLAG = 6
+    IPC_SET_HEAD_POSITION = 7
 
-    def __init__(self, host, port, sockopt=None, triangles_per_cubic_meter=1000, vpf=hl2ss.SM_VertexPositionFormat.R16G16B16A16IntNormalized, tif=hl2ss.SM_TriangleIndexFormat.R16UInt, vnf=hl2ss.SM_VertexNormalFormat.R8G8B8A8IntNormalized):
+    def __init__(self, host, port, sockopt=None, triangles_per_cubic_meter=1000, vpf=hl2ss.SM_VertexPositionFormat.R16G16B16A16IntNormalized, tif=hl2ss.SM_TriangleIndexFormat.R16UInt, vnf=hl2ss.SM_VertexNormalFormat.R8G8B8A8IntNormalized, cache=None, fetch_limit=0):
         super().__init__()
         self._din = mp.Queue()
         self._dout = mp.Queue()        
@@ -258,6 +441,8 @@ class _sm_manager_mp(mp.Process):
         self._vpf = vpf
         self._tif = tif
         self._vnf = vnf
+        self._cache = cache
+        self._fetch_limit = fetch_limit
 
     def stop(self):
         self._din.put((_sm_manager_mp.IPC_STOP,))
@@ -265,6 +450,9 @@ class _sm_manager_mp(mp.Process):
     def set_volumes(self, volumes):
         self._din.put((_sm_manager_mp.IPC_SET_VOLUMES, volumes))
 
+    def set_head_position(self, position):
+        self._din.put((_sm_manager_mp.IPC_SET_HEAD_POSITION, position))
+
     def get_observed_surfaces(self):
         self._din.put((_sm_manager_mp.IPC_GET_OBSERVED_SURFACES,))
 
@@ -272,8 +460,8 @@ class _sm_manager_mp(mp.Process):
         self._din.put((_sm_manager_mp.IPC_GET_MESHES,))
         return self._dout.get()
 
-    def cast_rays(self, rays):
-        self._din.put((_sm_manager_mp.IPC_CAST_RAYS, rays))
+    def cast_rays(self, rays, return_ids=False):
+        self._din.put((_sm_manager_mp.IPC_CAST_RAYS, rays, return_ids))
         return self._dout.get()
     
     def get_updated_flag(self):
@@ -290,6 +478,9 @@ class _sm_manager_mp(mp.Process):
     def _set_volumes(self, volumes):
         self._ipc.set_volumes(volumes)
 
+    def _set_head_position(self, position):
+        self._ipc.set_head_position(position)
+
     def _get_observed_surfaces(self):
         self._ipc.get_observed_surfaces()
         if (self._event.is_set() or self._ipc.get_ipc_status()):
@@ -299,8 +490,8 @@ class _sm_manager_mp(mp.Process):
     def _get_meshes(self):
         return self._ipc.get_meshes()
 
-    def _cast_rays(self, rays):
-        return self._ipc.cast_rays(rays)        
+    def _cast_rays(self, rays, return_ids):
+        return self._ipc.cast_rays(rays, return_ids)
     
     def _get_updated_flag(self):
         return self._ipc.get_updated_flag()
@@ -325,11 +516,13 @@ class _sm_manager_mp(mp.Process):
             self._dout.put(self._get_updated_flag())
         elif (message[0] == _sm_manager_mp.IPC_GET_IPC_STRING):
             self._dout.put(self._get_ipc_string())
+        elif (message[0] == _sm_manager_mp.IPC_SET_HEAD_POSITION):
+            self._set_head_position(*message[1:])
 
         return True
         
     def run(self):
-        self._ipc = sm_manager_mt(self._host, self._port, self._sockopt, self._tpcm, self._vpf, self._tif, self._vnf)
+        self._ipc = sm_manager_mt(self._host, self._port, self._sockopt, self._tpcm, self._vpf, self._tif, self._vnf, self._cache, self._fetch_limit)
 
         try:
             self._ipc.open()
@@ -346,8 +539,8 @@ class _sm_manager_mp(mp.Process):
 
 
 class sm_manager_mp:
-    def __init__(self, host, port, sockopt=None, triangles_per_cubic_meter=1000, vpf=hl2ss.SM_VertexPositionFormat.R16G16B16A16IntNormalized, tif=hl2ss.SM_TriangleIndexFormat.R16UInt, vnf=hl2ss.SM_VertexNormalFormat.R8G8B8A8IntNormalized):
-        self._ipc = _sm_manager_mp(host, port, sockopt, triangles_per_cubic_meter, vpf, tif, vnf)
+    def __init__(self, host, port, sockopt=None, triangles_per_cubic_meter=1000, vpf=hl2ss.SM_VertexPositionFormat.R16G16B16A16IntNormalized, tif=hl2ss.SM_TriangleIndexFormat.R16UInt, vnf=hl2ss.SM_VertexNormalFormat.R8G8B8A8IntNormalized, cache=None, fetch_limit=0):
+        self._ipc = _sm_manager_mp(host, port, sockopt, triangles_per_cubic_meter, vpf, tif, vnf, cache, fetch_limit)
 
     def open(self):
         self._ipc.start()
@@ -355,14 +548,17 @@ class sm_manager_mp:
     def set_volumes(self, volumes):
         self._ipc.set_volumes(volumes)
 
+    def set_head_position(self, position):
+        self._ipc.set_head_position(position)
+
     def get_observed_surfaces(self):
         self._ipc.get_observed_surfaces()
 
     def get_meshes(self):
         return self._ipc.get_meshes()
 
-    def cast_rays(self, rays):
-        return self._ipc.cast_rays(rays)
+    def cast_rays(self, rays, return_ids=False):
+        return self._ipc.cast_rays(rays, return_ids)
     
     def get_updated_flag(self):
         return self._ipc.get_updated_flag()
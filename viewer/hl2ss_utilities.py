@@ -8,6 +8,7 @@ import cv2
 import av
 import pyaudio
 import hl2ss
+import hl2ss_mx
 
 
 #------------------------------------------------------------------------------
@@ -101,9 +102,8 @@ class _audio_process(mp.Process):
         self._semaphore.acquire()
 
     def run(self):
-        self._unit_time        = hl2ss.TimeBase.HUNDREDS_OF_NANOSECONDS // self._sample_rate
-        self._pcm_audio_buffer = np.empty((1, 0), dtype=self._subtype)
-        self._pcm_ts_buffer    = np.empty((1, 0), dtype=np.int64)
+        self._pcm_ring         = hl2ss_mx.AudioRingBuffer(self._channels, self._sample_rate, self._sample_rate, self._subtype)
+        self._out_samples      = np.empty((0, self._channels), dtype=self._subtype)
         self._presentation_clk = 0
         self._audio_format     = pyaudio.paFloat32 if (self._subtype == np.float32) else pyaudio.paInt16 if (self._subtype == np.int16) else None
         self._p                = pyaudio.PyAudio()
@@ -116,9 +116,7 @@ class _audio_process(mp.Process):
         self._stream.close()
 
     def _pcm_callback(self, in_data, frame_count, time_info, status):
-        samples = self._channels * frame_count
-
-        while (self._pcm_ts_buffer.size < frame_count):
+        while (self._pcm_ring.length() < frame_count):
             pcm_data = self._pcm_queue.get()
 
             if (pcm_data is None):
@@ -128,17 +126,14 @@ class _audio_process(mp.Process):
             
             pcm_timestamp, pcm_payload = pcm_data
 
-            pcm_samples    = hl2ss.microphone_planar_to_packed(pcm_payload, self._channels) if (self._planar) else pcm_payload
-            pcm_group_size = pcm_samples.size // self._channels
-            pcm_ts         = (pcm_timestamp + (np.arange(0, pcm_group_size, 1, dtype=np.int64) * self._unit_time)).reshape((1, -1))
-            
-            self._pcm_audio_buffer = np.hstack((self._pcm_audio_buffer, pcm_samples))
-            self._pcm_ts_buffer    = np.hstack((self._pcm_ts_buffer,    pcm_ts))
+            pcm_samples = hl2ss.microphone_planar_to_packed(pcm_payload, self._channels) if (self._planar) else pcm_payload
+
+            self._pcm_ring.write(pcm_timestamp, pcm_samples)
+
+        if (self._out_samples.shape[0] != frame_count):
+            self._out_samples = np.empty((frame_count, self._channels), dtype=self._subtype)
 
-        self._out_samples      = self._pcm_audio_buffer[:, :samples]
-        self._pcm_audio_buffer = self._pcm_audio_buffer[:, samples:]
-        self._presentation_clk = self._pcm_ts_buffer[0, 0]
-        self._pcm_ts_buffer    = self._pcm_ts_buffer[:, frame_count:]
+        self._presentation_clk, _ = self._pcm_ring.read(frame_count, self._out_samples)
 
         return (self._out_samples.tobytes(), pyaudio.paContinue)
 
@@ -12,6 +12,7 @@ import hl2ss_imshow
 import hl2ss
 import hl2ss_lnm
 import hl2ss_mp
+import hl2ss_mx
 import hl2ss_3dcv
 import hl2ss_utilities
 
@@ -67,6 +68,8 @@ if __name__ == '__main__':
     sink_pv.open()
     sink_lt.open()
 
+    sync = hl2ss_mx.synchronizer({ hl2ss.StreamPort.RM_DEPTH_LONGTHROW : sink_lt, hl2ss.StreamPort.PERSONAL_VIDEO : sink_pv }, hl2ss.StreamPort.RM_DEPTH_LONGTHROW, require_valid_pose=True)
+
     # Initialize PV intrinsics and extrinsics ---------------------------------
     pv_intrinsics = hl2ss_3dcv.pv_create_intrinsics_placeholder()
     pv_extrinsics = np.eye(4, 4, dtype=np.float32)
@@ -82,13 +85,12 @@ if __name__ == '__main__':
         cv2.waitKey(1)
 
         # Get RM Depth Long Throw frame and nearest (in time) PV frame --------
-        _, data_lt = sink_lt.get_most_recent_frame()
-        if ((data_lt is None) or (not hl2ss.is_valid_pose(data_lt.pose))):
+        status, frames = sync.get_next()
+        if (status != hl2ss_mx.Status.OK):
             continue
 
-        _, data_pv = sink_pv.get_nearest(data_lt.timestamp)
-        if ((data_pv is None) or (not hl2ss.is_valid_pose(data_pv.pose))):
-            continue
+        data_lt = frames[hl2ss.StreamPort.RM_DEPTH_LONGTHROW]
+        data_pv = frames[hl2ss.StreamPort.PERSONAL_VIDEO]
         
         # Preprocess frames ---------------------------------------------------
         depth = data_lt.payload.depth
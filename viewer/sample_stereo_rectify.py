@@ -56,6 +56,14 @@ if __name__ == '__main__':
     # stereo_calibration = hl2ss_3dcv.load_stereo_calibration(port_left, port_right, calibration_path)
     # stereo_rectification = hl2ss_3dcv.load_stereo_rectification(port_left, port_right, calibration_path)
 
+    # Compose undistort, rotate and rectify maps -----------------------------
+    remap_lf = hl2ss_3dcv.rm_vlc_get_remap_pipeline(port_left, calibration_lf.undistort_map, rectify_map=stereo_rectification.map1)
+    remap_rf = hl2ss_3dcv.rm_vlc_get_remap_pipeline(port_right, calibration_rf.undistort_map, rectify_map=stereo_rectification.map2)
+
+    image_lr = np.empty((shape[1], shape[0] * 2, 3), dtype=np.uint8)
+    image_l  = image_lr[:, :shape[0], :]
+    image_r  = image_lr[:, shape[0]:, :]
+
     # Start streams -----------------------------------------------------------
     sink_left = hl2ss_mp.stream(hl2ss_lnm.rx_rm_vlc(host, port_left))
     sink_right = hl2ss_mp.stream(hl2ss_lnm.rx_rm_vlc(host, port_right))
@@ -76,21 +84,12 @@ if __name__ == '__main__':
         if (data_right is None):
             continue
 
-        # Undistort and rectify frames ----------------------------------------
-        lf_u = hl2ss_3dcv.rm_vlc_undistort(data_left.payload.image, calibration_lf.undistort_map)
-        rf_u = hl2ss_3dcv.rm_vlc_undistort(data_right.payload.image, calibration_rf.undistort_map)
-
-        lf_ru = hl2ss_3dcv.rm_vlc_rotate_image(lf_u, rotation_lf)
-        rf_ru = hl2ss_3dcv.rm_vlc_rotate_image(rf_u, rotation_rf)
-
-        r1 = cv2.remap(lf_ru, stereo_rectification.map1[:, :, 0], stereo_rectification.map1[:, :, 1], cv2.INTER_LINEAR)
-        r2 = cv2.remap(rf_ru, stereo_rectification.map2[:, :, 0], stereo_rectification.map2[:, :, 1], cv2.INTER_LINEAR)
+        # Undistort, rotate and rectify frames (single remap) ----------------
+        remap_lf.remap_rgb(data_left.payload.image, image_l)
+        remap_rf.remap_rgb(data_right.payload.image, image_r)
 
         # Display frames ------------------------------------------------------
-        image_l = hl2ss_3dcv.rm_vlc_to_rgb(r1)
-        image_r = hl2ss_3dcv.rm_vlc_to_rgb(r2)
-
-        image = np.hstack((image_l, image_r))
+        image = image_lr.copy()
 
         for y in range(line_start, shape[1], line_offset):
             cv2.line(image, (0, y), ((shape[0] * 2) - 1, y), line_color, line_thickness)
@@ -86,6 +86,12 @@ ez_stride_mask = 63
 # User data
 user_data = 'created by hl2ss simple recorder'.encode()
 
+# Writer parameters
+# Maximum number of packets written per port in a single write call
+# Interval in seconds between fsync calls or None to let the OS flush
+writer_batch_size = 64
+writer_fsync_period = None
+
 #------------------------------------------------------------------------------
 
 if __name__ == '__main__':
@@ -183,11 +189,9 @@ if __name__ == '__main__':
             pass
         print(f'Started stream {hl2ss.get_port_name(port)}')
     
-    writers = {port : hl2ss_ds.wr(filenames[port], producer, port, user_data) for port in ports}
-
-    for port in ports:
-        writers[port].open()
-        print(f'Started writer {hl2ss.get_port_name(port)}')
+    writer = hl2ss_ds.wr_batch(filenames, producer, ports, user_data, batch_size=writer_batch_size, fsync_period=writer_fsync_period)
+    writer.open()
+    print('Started writer')
 
     # Wait for stop signal ----------------------------------------------------
     print('Recording started.')
@@ -196,16 +200,20 @@ if __name__ == '__main__':
     listener.open()
 
     print('Press esc to stop recording...')
+    report_start = time.perf_counter()
     while (not listener.pressed()):
         time.sleep(1/60)
+        report_stop = time.perf_counter()
+        if ((report_stop - report_start) >= 1):
+            report_start = report_stop
+            print(' '.join([f'{hl2ss.get_port_name(port)}: {statistics["throughput"] / (1024 * 1024):.2f} MB/s ({statistics["backlog"]})' for port, statistics in writer.get_statistics().items()]))
     print('Stopping...')
 
     listener.close()
 
     # Stop writers and receivers ----------------------------------------------
-    for port in ports:
-        writers[port].close()
-        print(f'Stopped writer {hl2ss.get_port_name(port)}')
+    writer.close()
+    print('Stopped writer')
 
     for port in ports:
         sinks[port].detach()